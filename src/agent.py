@@ -1,13 +1,21 @@
 """Core agent execution loop."""
 
+import asyncio
 import json
+import time
+import tracemalloc
+from contextlib import nullcontext
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
 from pathlib import Path
 from typing import Any
 
-from .approval import prompt_approval, ApprovalResult
+from .approval import approval_scope, prompt_approval, ApprovalResult
 from .logger import (
     log_step,
     log_tool_call,
+    log_preview,
+    log_output,
     log_success,
     log_error,
     log_skipped,
@@ -15,15 +23,43 @@ from .logger import (
     log_plan_complete,
     logger,
 )
-from .tools import execute_tool, get_tool_names
+from .compiler import CompiledPlan, CompiledStep, compile_plan, ready_steps, resolve_params
+from .profiler import measure, timed
+from .session_store import SessionJournal, load_session, write_snapshot
+from .tools import ResultCache, aexecute_tool, execute_tool, output_sink, plan_scope, preview_tool
+from .worktrees import Worktree, get_pool
+
+
+DEFAULT_MAX_WORKERS = 4
+
+# Step states that are carried over as-is when a session is resumed
+FINISHED_STATES = ("COMPLETED", "SKIPPED")
+
+# Fields the agent adds to plan steps in the session log
+STEP_RUNTIME_FIELDS = ("status", "output", "error", "blocked_by", "profile")
 
 
 class Agent:
     """Agent that executes plans with user approval."""
     
-    def __init__(self, auto_approve: bool = False):
+    def __init__(
+        self,
+        auto_approve: bool = False,
+        max_workers: int = DEFAULT_MAX_WORKERS,
+        use_cache: bool = True,
+        strict_cache: bool = False,
+        profile: bool = False,
+        worktree: str = None,
+    ):
         self.auto_approve = auto_approve
         self.approve_all = False
+        self.max_workers = max(1, max_workers)
+        self.use_cache = use_cache
+        self.strict_cache = strict_cache
+        self.profile = profile
+        # Run each plan in its own git worktree; the value is what to do with
+        # its branch afterwards (see worktrees.MERGE_MODES), None to disable
+        self.worktree = worktree
     
     def load_plan(self, plan_path: str) -> dict:
         """Load a plan from a JSON file."""
@@ -43,33 +79,126 @@ class Agent:
         self._validate_plan(plan)
         return plan
     
-    def _validate_plan(self, plan: dict):
-        """Validate plan structure."""
-        if "steps" not in plan:
-            raise ValueError("Plan must have 'steps' array")
-        
-        valid_tools = get_tool_names()
-        for i, step in enumerate(plan["steps"]):
-            if "tool" not in step:
-                raise ValueError(f"Step {i+1} missing 'tool' field")
-            if step["tool"] not in valid_tools:
-                raise ValueError(
-                    f"Step {i+1} has unknown tool '{step['tool']}'. "
-                    f"Valid tools: {', '.join(valid_tools)}"
-                )
-            if "params" not in step:
-                raise ValueError(f"Step {i+1} missing 'params' field")
-    
-
-    def execute_plan(self, plan: dict, session_id: str = None, plan_only: bool = False) -> dict:
+    def _validate_plan(self, plan: dict) -> CompiledPlan:
+        """
+        Validate plan structure, tools, params and dependencies.
+        
+        Compilation is cached by plan hash, so validating the same plan
+        again is a lookup.
+        """
+        return compile_plan(plan)
+    
+    def resume(self, session_id: str) -> dict:
         """
-        Execute a plan step by step with approval.
+        Resume an interrupted session from its persisted checkpoint.
+        
+        Steps already COMPLETED or SKIPPED by the user are kept; every other
+        step (PENDING, RUNNING, ERROR, or skipped because of a dependency)
+        runs again with the original plan and meta.
+        """
+        session, plan = self._load_resumable(session_id)
+        return self.execute_plan(plan, session_id=session_id, resume_from=session)
+
+    async def aresume(self, session_id: str) -> dict:
+        """Async version of ``resume``."""
+        session, plan = self._load_resumable(session_id)
+        return await self.aexecute_plan(plan, session_id=session_id, resume_from=session)
+
+    def _load_resumable(self, session_id: str) -> tuple[dict, dict]:
+        """Load a persisted session and rebuild its original plan."""
+        session = load_session(session_id)
+        if session is None:
+            raise FileNotFoundError(f"Session not found: {session_id}")
+        
+        plan = {
+            "name": session.get("objective", "Unnamed Plan"),
+            "steps": [
+                {k: v for k, v in step.items() if k not in STEP_RUNTIME_FIELDS}
+                for step in session.get("steps", [])
+            ],
+            "meta": session.get("meta", {}),
+        }
+        self._validate_plan(plan)
+        return session, plan
+
+    def execute_plan(
+        self,
+        plan: dict,
+        session_id: str = None,
+        plan_only: bool = False,
+        resume_from: dict = None,
+    ) -> dict:
+        """
+        Execute a plan with approval, running independent steps concurrently.
+        
+        The plan is compiled first (see ``compile_plan``), so invalid plans
+        fail before any step runs. Steps become ready once their dependencies
+        have finished. Approval is requested for each ready step in
+        plan order, and approved steps run on a pool of ``max_workers`` threads.
+        
+        If ``resume_from`` holds a previously persisted session, its finished
+        steps are carried over instead of being executed again.
         
         Returns a summary of execution results.
         """
+        run = self._start_run(plan, session_id, plan_only, resume_from)
+        if run is None:
+            return {"succeeded": 0, "failed": 0, "skipped": 0, "step_results": []}
+        
+        # Keeps pooled HTTP connections open across steps
+        with plan_scope():
+            try:
+                self._run_steps(run)
+            except KeyboardInterrupt:
+                run.interrupt()
+                raise
+            finally:
+                run.stop_tracing()
+            
+            return run.finish()
+
+    async def aexecute_plan(
+        self,
+        plan: dict,
+        session_id: str = None,
+        plan_only: bool = False,
+        resume_from: dict = None,
+    ) -> dict:
+        """
+        Async version of ``execute_plan``.
+        
+        Steps run as tasks on the current event loop, at most ``max_workers``
+        at a time. Tools with a coroutine implementation run natively; sync
+        tools and interactive approval prompts are offloaded to threads.
+        """
+        run = self._start_run(plan, session_id, plan_only, resume_from)
+        if run is None:
+            return {"succeeded": 0, "failed": 0, "skipped": 0, "step_results": []}
+        
+        async with plan_scope():
+            try:
+                await self._arun_steps(run)
+            except (KeyboardInterrupt, asyncio.CancelledError):
+                run.interrupt()
+                raise
+            finally:
+                run.stop_tracing()
+            
+            return run.finish()
+
+    def _start_run(
+        self,
+        plan: dict,
+        session_id: str,
+        plan_only: bool,
+        resume_from: dict,
+    ) -> "_PlanRun":
+        """Create the session for a plan. Returns None in plan-only mode."""
         import uuid
         from datetime import datetime
         
+        compiled = self._validate_plan(plan)
+        
         # Initialize session
         if not session_id:
             session_id = str(uuid.uuid4())
@@ -90,133 +219,400 @@ class Agent:
             "meta": plan.get("meta", {})
         }
         
-        self._save_session(session_data)
+        if resume_from:
+            session_data["timestamp"] = resume_from.get("timestamp", timestamp)
+            for i, previous in enumerate(resume_from.get("steps", [])):
+                if previous.get("status") in FINISHED_STATES and "blocked_by" not in previous:
+                    session_data["steps"][i] = previous
         
         if plan_only:
+            self._save_session(session_data)
             log_plan_start(name + " (Planning Only)", len(steps))
             log_success(f"Plan saved to logs/sessions/{session_id}.json")
-            return {"succeeded": 0, "failed": 0, "skipped": 0, "step_results": []}
+            return None
         
-        log_plan_start(name, len(steps))
+        worktree = None
+        if self.worktree:
+            worktree = get_pool().acquire(session_id)
+            session_data["meta"] = {**session_data["meta"], "worktree": worktree.info()}
+            log_success(f"Running in worktree {worktree.path} on branch {worktree.branch}")
         
-        results = {
-            "succeeded": 0,
-            "failed": 0,
-            "skipped": 0,
-            "step_results": [],
-        }
+        # Writes the initial snapshot; step updates are journaled from here on
+        run = _PlanRun(self, compiled, session_data, worktree)
         
-        for i, step in enumerate(steps):
-            # Check if this step was already completed (if resuming)
-            # For now, we assume linear execution from start
-            
-            step_num = i + 1
-            tool = step["tool"]
-            params = step["params"]
-            description = step.get("description", f"Execute {tool}")
-            
-            # Update step status to RUNNING in session log
-            session_data["steps"][i]["status"] = "RUNNING"
-            self._save_session(session_data)
-            
-            # Show pending action
-            log_step(step_num, len(steps), description)
-            log_tool_call(tool, params)
-            
-            # Get approval
-            should_auto = self.auto_approve or self.approve_all
-            approval = prompt_approval(auto_approve=should_auto)
-            
-            if approval == ApprovalResult.ABORT:
-                logger.info("Plan execution aborted by user")
-                session_data["status"] = "ABORTED"
-                self._save_session(session_data)
-                break
-            
-            if approval == ApprovalResult.APPROVE_ALL:
-                self.approve_all = True
-                approval = ApprovalResult.APPROVE
-            
-            if approval == ApprovalResult.SKIP:
-                log_skipped()
-                results["skipped"] += 1
-                result_entry = {
-                    "step": step_num,
-                    "tool": tool,
-                    "status": "skipped",
-                }
-                results["step_results"].append(result_entry)
-                
-                # Update session log
-                session_data["steps"][i].update({
-                    "status": "SKIPPED",
-                    "output": "Skipped by user"
-                })
-                self._save_session(session_data)
-                continue
-            
-            # Execute the tool
-            try:
-                result = execute_tool(tool, params)
-                log_success(f"Completed: {result.get('message', 'OK')}")
-                results["succeeded"] += 1
-                result_entry = {
-                    "step": step_num,
-                    "tool": tool,
-                    "status": "success",
-                    "result": result,
-                }
-                results["step_results"].append(result_entry)
-                
-                # Update session log
-                session_data["steps"][i].update({
-                    "status": "COMPLETED",
-                    "output": result
-                })
+        if run.resumed:
+            log_plan_start(f"{name} (Resumed)", len(steps) - run.resumed)
+            log_success(f"{run.resumed} of {len(steps)} steps already finished")
+        else:
+            log_plan_start(name, len(steps))
+        
+        return run
+
+    def _run_steps(self, run: "_PlanRun"):
+        """Drive a plan run on a worker pool until no step can make progress."""
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            running = {}
+            while not run.aborted:
+                ready = run.ready_steps()
+                for i in ready:
+                    if run.approve(i):
+                        running[pool.submit(run.execute, i)] = i
+                    if run.aborted:
+                        break
                 
-            except Exception as e:
-                log_error(f"Failed: {str(e)}")
-                logger.exception("Tool execution failed")
-                results["failed"] += 1
-                result_entry = {
-                    "step": step_num,
-                    "tool": tool,
-                    "status": "error",
-                    "error": str(e),
-                }
-                results["step_results"].append(result_entry)
+                if not running:
+                    if ready:
+                        # Skipped steps may have unblocked others
+                        continue
+                    break
                 
-                # Update session log
-                session_data["steps"][i].update({
-                    "status": "ERROR",
-                    "error": str(e)
-                })
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    i = running.pop(future)
+                    try:
+                        run.record_success(i, future.result())
+                    except Exception as e:
+                        run.record_error(i, e)
             
-            # Save after each step completion
-            self._save_session(session_data)
+            # After an abort, let in-flight steps finish and record them
+            for future in list(running):
+                i = running.pop(future)
+                try:
+                    run.record_success(i, future.result())
+                except Exception as e:
+                    run.record_error(i, e)
+
+    async def _arun_steps(self, run: "_PlanRun"):
+        """Drive a plan run as asyncio tasks until no step can make progress."""
+        limit = asyncio.Semaphore(self.max_workers)
         
-        # Final status update
-        session_data["status"] = "COMPLETED" if results["failed"] == 0 else "FAILED"
-        self._save_session(session_data)
+        async def run_step(i: int) -> dict:
+            async with limit:
+                return await run.aexecute(i)
         
-        log_plan_complete(
-            results["succeeded"],
-            results["failed"],
-            results["skipped"],
-        )
+        running = {}
+        try:
+            while not run.aborted:
+                ready = run.ready_steps()
+                for i in ready:
+                    if await run.aapprove(i):
+                        running[asyncio.ensure_future(run_step(i))] = i
+                    if run.aborted:
+                        break
+                
+                if not running:
+                    if ready:
+                        # Skipped steps may have unblocked others
+                        continue
+                    break
+                
+                done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    i = running.pop(task)
+                    try:
+                        run.record_success(i, task.result())
+                    except Exception as e:
+                        run.record_error(i, e)
+        except BaseException:
+            for task in running:
+                task.cancel()
+            raise
         
-        return results
+        # After an abort, let in-flight steps finish and record them
+        for task in list(running):
+            i = running.pop(task)
+            try:
+                run.record_success(i, await task)
+            except Exception as e:
+                run.record_error(i, e)
 
     def _save_session(self, session_data: dict):
-        """Save session data to JSON file."""
+        """Atomically write a full session snapshot."""
         try:
-            logs_dir = Path("logs/sessions")
-            logs_dir.mkdir(parents=True, exist_ok=True)
-            
-            file_path = logs_dir / f"{session_data['id']}.json"
-            with open(file_path, "w", encoding="utf-8") as f:
-                json.dump(session_data, f, indent=2)
+            write_snapshot(session_data)
         except Exception as e:
             # Don't crash agent if logging fails
             logger.error(f"Failed to save session logs: {e}")
 
+
+class _PlanRun:
+    """
+    Bookkeeping for a single plan execution.
+    
+    Tracks step states and dependencies, records results into the session
+    journal and the results summary. All methods are called from the thread
+    that drives the plan; only the tool calls themselves run on worker threads.
+    """
+    
+    def __init__(self, agent: Agent, compiled: CompiledPlan, session_data: dict, worktree: Worktree = None):
+        self.agent = agent
+        self.compiled = compiled
+        self.worktree = worktree
+        self.steps = session_data["steps"]
+        self.session_data = session_data
+        self.journal = SessionJournal(session_data)
+        self.cache = ResultCache(strict=agent.strict_cache) if agent.use_cache else None
+        self.state = [step["status"] for step in session_data["steps"]]
+        self.resumed = sum(1 for state in self.state if state in FINISHED_STATES)
+        # In-memory step results, by index, for resolving $refs
+        self.outputs = {
+            i: step.get("output")
+            for i, step in enumerate(session_data["steps"])
+            if step["status"] == "COMPLETED"
+        }
+        self.aborted = False
+        self.results = {
+            "succeeded": 0,
+            "failed": 0,
+            "skipped": 0,
+            "step_results": [],
+        }
+        
+        # Per-step measurements by index when profiling, else None
+        self.profile = {} if agent.profile else None
+        self.started = time.perf_counter()
+        self.started_tracing = False
+        if self.profile is not None and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self.started_tracing = True
+    
+    def _timed(self, i: int, key: str):
+        """Accumulate the wall time of a block into step i's profile."""
+        if self.profile is None:
+            return nullcontext()
+        return timed(self.profile.setdefault(i, {}), key)
+    
+    def _measure(self, i: int, per_thread: bool = True):
+        """Measure a step's tool execution into its profile."""
+        if self.profile is None:
+            return nullcontext()
+        return measure(self.profile.setdefault(i, {}), per_thread)
+    
+    def stop_tracing(self):
+        """Stop the memory tracing this run started, however the run ended."""
+        if self.started_tracing:
+            tracemalloc.stop()
+            self.started_tracing = False
+    
+    def ready_steps(self) -> list[int]:
+        """
+        Return pending steps whose dependencies have all finished, in plan order.
+        
+        Pending steps with a failed or skipped hard dependency are skipped here,
+        which may in turn settle the dependencies of other steps.
+        """
+        ready, skipped = ready_steps(self.compiled, self.state)
+        for i, failed in skipped:
+            self.record_skip(
+                i,
+                f"Dependency not completed: {', '.join(failed)}",
+                blocked_by=failed,
+            )
+        return ready
+    
+    def approve(self, i: int) -> bool:
+        """Show a ready step and ask for approval. Returns True if it should run."""
+        step = self.steps[i]
+        tool = step["tool"]
+        params = step["params"]
+        
+        should_auto = self.agent.auto_approve or self.agent.approve_all
+        with approval_scope(auto_approve=should_auto):
+            with self._timed(i, "log_s"):
+                log_step(i + 1, len(self.steps), step.get("description", f"Execute {tool}"))
+                log_tool_call(tool, params)
+            
+            with self._timed(i, "approval_s"):
+                if not should_auto:
+                    self._preview(i)
+                approval = prompt_approval(auto_approve=should_auto)
+        
+        if approval == ApprovalResult.ABORT:
+            logger.info("Plan execution aborted by user")
+            self.aborted = True
+            self.journal.update_session(status="ABORTED")
+            return False
+        
+        if approval == ApprovalResult.APPROVE_ALL:
+            self.agent.approve_all = True
+        
+        if approval == ApprovalResult.SKIP:
+            self.record_skip(i, "Skipped by user")
+            return False
+        
+        # Update step status to RUNNING in session log
+        self.state[i] = "RUNNING"
+        with self._timed(i, "save_s"):
+            self.journal.update_step(i, status="RUNNING")
+        return True
+    
+    def _preview(self, i: int):
+        """Show a dry run of the step, for tools that support one."""
+        compiled = self.compiled.steps[i]
+        try:
+            preview = preview_tool(compiled.tool, self._params(compiled))
+        except Exception as e:
+            logger.warning(f"Preview of step {i+1} failed: {e}")
+            return
+        if preview is not None:
+            log_preview(preview)
+    
+    async def aapprove(self, i: int) -> bool:
+        """Async version of ``approve``; interactive prompts run on a thread."""
+        if self.agent.auto_approve or self.agent.approve_all:
+            return self.approve(i)
+        return await asyncio.to_thread(self.approve, i)
+    
+    def execute(self, i: int) -> dict:
+        """Run a step's tool with its $refs resolved. Called on a worker thread."""
+        step = self.compiled.steps[i]
+        params = self._params(step)
+        token = output_sink.set(partial(log_output, i + 1))
+        try:
+            with self._measure(i):
+                return execute_tool(step.tool, params, self.cache, step.func)
+        finally:
+            output_sink.reset(token)
+    
+    async def aexecute(self, i: int) -> dict:
+        """Async version of ``execute``."""
+        step = self.compiled.steps[i]
+        if step.afunc is None:
+            # On a worker thread, where the profile measures the tool itself
+            return await asyncio.to_thread(self.execute, i)
+        
+        params = self._params(step)
+        # Each step runs in its own task, so this only affects this step
+        output_sink.set(partial(log_output, i + 1))
+        with self._measure(i, per_thread=False):
+            return await aexecute_tool(step.tool, params, self.cache, step.afunc)
+    
+    def _params(self, step: CompiledStep) -> dict:
+        """A step's params with $refs resolved and paths pointed at the worktree."""
+        params = resolve_params(self.compiled, step, self.outputs)
+        if self.worktree is not None:
+            params = self.worktree.rebase_params(step.tool, params)
+        return params
+    
+    def record_success(self, i: int, result: dict):
+        with self._timed(i, "log_s"):
+            log_success(f"Step {i+1} completed: {result.get('message', 'OK')}")
+        self.results["succeeded"] += 1
+        self.results["step_results"].append({
+            "step": i + 1,
+            "tool": self.steps[i]["tool"],
+            "status": "success",
+            "result": result,
+        })
+        self.outputs[i] = result
+        self._update(i, status="COMPLETED", output=result)
+    
+    def record_error(self, i: int, error: Exception):
+        with self._timed(i, "log_s"):
+            log_error(f"Step {i+1} failed: {str(error)}")
+            logger.error("Tool execution failed", exc_info=error)
+        self.results["failed"] += 1
+        row = {
+            "step": i + 1,
+            "tool": self.steps[i]["tool"],
+            "status": "error",
+            "error": str(error),
+        }
+        # Tools that fail part-way may attach what they did (e.g. PartialWriteError)
+        partial = getattr(error, "result", None)
+        if isinstance(partial, dict):
+            row["result"] = partial
+            self.results["step_results"].append(row)
+            self._update(i, status="ERROR", error=str(error), output=partial)
+            return
+        self.results["step_results"].append(row)
+        self._update(i, status="ERROR", error=str(error))
+    
+    def record_skip(self, i: int, reason: str, blocked_by: list[str] = None):
+        with self._timed(i, "log_s"):
+            log_skipped()
+        self.results["skipped"] += 1
+        self.results["step_results"].append({
+            "step": i + 1,
+            "tool": self.steps[i]["tool"],
+            "status": "skipped",
+        })
+        if blocked_by:
+            self._update(i, status="SKIPPED", output=reason, blocked_by=blocked_by)
+        else:
+            self._update(i, status="SKIPPED", output=reason)
+    
+    def _update(self, i: int, **fields: Any):
+        self.state[i] = fields["status"]
+        if self.profile is None:
+            self.journal.update_step(i, **fields)
+            return
+        
+        profile = self.profile.setdefault(i, {})
+        with timed(profile, "save_s"):
+            # The time of this final write itself is only in the session totals
+            self.journal.update_step(i, **fields, profile=dict(profile))
+    
+    def interrupt(self):
+        """Mark the session as interrupted so it can be resumed later."""
+        if self.worktree is not None:
+            self._release_worktree("keep")
+        self.journal.update_session(status="INTERRUPTED")
+        self.journal.close()
+        logger.info(f"Session interrupted; continue with --resume {self.session_data['id']}")
+    
+    def finish(self) -> dict:
+        """Write the final session status, compact the journal and print the summary."""
+        meta = dict(self.session_data.get("meta", {}))
+        if self.cache is not None:
+            meta["cache"] = self.cache.stats()
+        if self.profile is not None:
+            meta["profile"] = self._profile_totals()
+        if self.worktree is not None:
+            # Only a fully successful plan is merged back or pushed
+            succeeded = not self.aborted and self.results["failed"] == 0
+            meta["worktree"] = self._release_worktree(self.agent.worktree if succeeded else "keep")
+        if meta != self.session_data.get("meta", {}):
+            self.journal.update_session(meta=meta)
+        if not self.aborted:
+            self.journal.update_session(
+                status="COMPLETED" if self.results["failed"] == 0 else "FAILED"
+            )
+        self.journal.close()
+        
+        self.results["step_results"].sort(key=lambda r: r["step"])
+        log_plan_complete(
+            self.results["succeeded"],
+            self.results["failed"],
+            self.results["skipped"],
+            profile=self._profile_rows(),
+        )
+        return self.results
+    
+    def _release_worktree(self, mode: str) -> dict:
+        try:
+            summary = get_pool().release(self.worktree, mode)
+        except Exception as e:
+            logger.error(f"Failed to release worktree {self.worktree.path}: {e}")
+            summary = {**self.worktree.info(), "mode": mode, "error": str(e)}
+        else:
+            log_success(f"Worktree branch {self.worktree.branch}: {summary['result']}")
+        self.worktree = None
+        return summary
+    
+    def _profile_totals(self) -> dict:
+        """Plan-level time split between execution, approval, saving and logging."""
+        totals = {"plan_wall_s": round(time.perf_counter() - self.started, 6)}
+        for key in ("wall_s", "cpu_s", "approval_s", "save_s", "log_s", "read_bytes", "write_bytes"):
+            total = sum(step.get(key, 0) for step in self.profile.values())
+            totals[key] = round(total, 6) if isinstance(total, float) else total
+        return totals
+    
+    def _profile_rows(self) -> list[dict]:
+        """Per-step profile rows for the summary table, or None when not profiling."""
+        if self.profile is None:
+            return None
+        return [
+            {"step": i + 1, "tool": self.steps[i]["tool"], "status": self.state[i], **self.profile[i]}
+            for i in sorted(self.profile)
+        ]
@@ -1,10 +1,17 @@
 """User approval prompts for step execution."""
 
+import threading
+from contextlib import nullcontext
+
 from rich.console import Console
 from rich.prompt import Prompt
 
 console = Console()
 
+# Serializes interactive prompts when several plans run in one process.
+# Reentrant, so a caller holding it around a step's display can still prompt.
+_prompt_lock = threading.RLock()
+
 
 class ApprovalResult:
     APPROVE = "approve"
@@ -13,6 +20,16 @@ class ApprovalResult:
     APPROVE_ALL = "approve_all"
 
 
+def approval_scope(auto_approve: bool = False):
+    """
+    Context manager to hold around a step's display, preview and prompt, so
+    output from other plans in the process doesn't interleave with them.
+    
+    A no-op when the step is auto-approved.
+    """
+    return nullcontext() if auto_approve else _prompt_lock
+
+
 def prompt_approval(auto_approve: bool = False) -> str:
     """
     Prompt the user for approval to execute a step.
@@ -23,6 +40,12 @@ def prompt_approval(auto_approve: bool = False) -> str:
         console.print("  [dim]Auto-approved[/dim]")
         return ApprovalResult.APPROVE
     
+    with _prompt_lock:
+        return _ask()
+
+
+def _ask() -> str:
+    """Ask for a choice until a valid one is entered."""
     console.print()
     console.print("  [bold]Execute this step?[/bold]")
     console.print("  [dim][Y]es / [N]o / [S]kip / [A]ll remaining / [Q]uit[/dim]")
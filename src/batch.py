@@ -0,0 +1,236 @@
+"""Batch mode: run many plans or objectives in one process."""
+
+import argparse
+import json
+import sys
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+
+from rich.table import Table
+
+from .agent import Agent, DEFAULT_MAX_WORKERS
+from .logger import console, logger
+from .worktrees import MERGE_MODES
+
+
+DEFAULT_JOBS = 4
+
+
+def load_jobs(source: str) -> list[dict]:
+    """
+    Load batch jobs from a directory of plan files or a JSONL file.
+
+    Each JSONL line is either an objective string or an object with one of
+    ``objective`` or ``plan``, and optionally ``name``, ``session_id`` and
+    ``auto_approve``.
+    """
+    path = Path(source)
+    if not path.exists():
+        raise FileNotFoundError(f"Batch source not found: {source}")
+
+    jobs = []
+    if path.is_dir():
+        for plan_path in sorted(path.glob("*.json")):
+            jobs.append({"name": plan_path.name, "plan_path": str(plan_path)})
+    else:
+        with open(path, "r", encoding="utf-8") as f:
+            for line_num, line in enumerate(f, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError as e:
+                    raise ValueError(f"Line {line_num}: invalid JSON: {e}") from e
+                if isinstance(entry, str):
+                    entry = {"objective": entry}
+                if not isinstance(entry, dict):
+                    raise ValueError(f"Line {line_num}: expected an objective string or an object")
+                if "objective" not in entry and "plan" not in entry:
+                    raise ValueError(f"Line {line_num}: expected 'objective' or 'plan'")
+                if "plan" in entry and not isinstance(entry["plan"], dict):
+                    raise ValueError(f"Line {line_num}: 'plan' must be an object")
+                entry.setdefault(
+                    "name",
+                    entry.get("objective") or entry.get("plan", {}).get("name") or f"line {line_num}",
+                )
+                jobs.append(entry)
+
+    for job in jobs:
+        job.setdefault("session_id", str(uuid.uuid4()))
+    return jobs
+
+
+def run_job(job: dict, options: dict) -> dict:
+    """
+    Run one batch job with its own Agent and return a summary row.
+
+    Module-level so it can be sent to a process pool.
+    """
+    started = time.perf_counter()
+    summary = {
+        "name": job["name"],
+        "session_id": job["session_id"],
+        "status": "error",
+        "succeeded": 0,
+        "failed": 0,
+        "skipped": 0,
+    }
+
+    auto_approve = job.get("auto_approve", options["auto_approve"])
+    agent = Agent(
+        auto_approve=auto_approve,
+        max_workers=options["workers"],
+        use_cache=options["use_cache"],
+        strict_cache=options["strict_cache"],
+        worktree=options["worktree"],
+    )
+
+    try:
+        if not auto_approve and options["processes"]:
+            raise RuntimeError("Jobs run in a process pool need auto-approve (-y)")
+
+        if "plan_path" in job:
+            plan = agent.load_plan(job["plan_path"])
+        elif "plan" in job:
+            plan = job["plan"]
+            agent._validate_plan(plan)
+        else:
+            from .planner import Planner
+            plan = Planner().generate_plan(job["objective"])
+            agent._validate_plan(plan)
+
+        results = agent.execute_plan(plan, session_id=job["session_id"])
+        summary.update(
+            status="failed" if results["failed"] else "succeeded",
+            succeeded=results["succeeded"],
+            failed=results["failed"],
+            skipped=results["skipped"],
+        )
+    except Exception as e:
+        logger.error(f"Batch job '{job['name']}' failed: {e}")
+        summary["error"] = str(e)
+
+    summary["duration"] = round(time.perf_counter() - started, 3)
+    return summary
+
+
+def run_batch(jobs: list[dict], options: dict) -> list[dict]:
+    """Run jobs on a bounded thread (or process) pool, returning summaries in job order."""
+    executor_cls = ProcessPoolExecutor if options["processes"] else ThreadPoolExecutor
+    with executor_cls(max_workers=options["jobs"]) as pool:
+        futures = [pool.submit(run_job, job, options) for job in jobs]
+        return [future.result() for future in futures]
+
+
+def print_summary(summaries: list[dict], elapsed: float):
+    """Print an aggregate table of batch results."""
+    table = Table(title=f"Batch Complete ({len(summaries)} jobs, {elapsed:.1f}s)")
+    table.add_column("Job")
+    table.add_column("Session")
+    table.add_column("Status")
+    table.add_column("✓", justify="right")
+    table.add_column("✗", justify="right")
+    table.add_column("⊘", justify="right")
+    table.add_column("Time", justify="right")
+
+    styles = {"succeeded": "green", "failed": "red", "error": "red"}
+    for row in summaries:
+        status = row["status"]
+        if row.get("error"):
+            status += f": {row['error'][:60]}"
+        table.add_row(
+            row["name"][:40],
+            row["session_id"][:8],
+            f"[{styles[row['status']]}]{status}[/]",
+            str(row["succeeded"]),
+            str(row["failed"]),
+            str(row["skipped"]),
+            f"{row['duration']:.1f}s",
+        )
+    console.print()
+    console.print(table)
+
+
+def batch_main(argv: list[str] = None):
+    """Entry point for ``python -m src.main batch``."""
+    parser = argparse.ArgumentParser(
+        prog="python -m src.main batch",
+        description="Run a directory of plan files or a JSONL file of objectives",
+    )
+    parser.add_argument(
+        "source",
+        help="Directory of plan JSON files, or a JSONL file of objectives",
+    )
+    parser.add_argument(
+        "-j", "--jobs",
+        type=int,
+        default=DEFAULT_JOBS,
+        help=f"Max jobs to run concurrently (default: {DEFAULT_JOBS})",
+    )
+    parser.add_argument(
+        "--processes",
+        action="store_true",
+        help="Run jobs in a process pool instead of threads (for CPU-bound plans)",
+    )
+    parser.add_argument(
+        "-y", "--yes",
+        action="store_true",
+        help="Auto-approve all steps of jobs that don't set auto_approve themselves",
+    )
+    parser.add_argument(
+        "-w", "--workers",
+        type=int,
+        default=DEFAULT_MAX_WORKERS,
+        help=f"Max steps to run concurrently within each job (default: {DEFAULT_MAX_WORKERS})",
+    )
+    parser.add_argument(
+        "--worktree",
+        nargs="?",
+        const="merge",
+        choices=MERGE_MODES,
+        help="Run each job in its own git worktree, then merge (default), push or keep its branch",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Bypass the tool result cache",
+    )
+    parser.add_argument(
+        "--strict-cache",
+        action="store_true",
+        help="Fingerprint cached tool inputs by content hash instead of mtime/size",
+    )
+    args = parser.parse_args(argv)
+
+    try:
+        jobs = load_jobs(args.source)
+    except (OSError, ValueError) as e:
+        console.print(f"[red]Error:[/red] {e}")
+        sys.exit(1)
+
+    if not jobs:
+        console.print("[yellow]No jobs found[/yellow]")
+        sys.exit(0)
+
+    options = {
+        "jobs": max(1, args.jobs),
+        "processes": args.processes,
+        "auto_approve": args.yes,
+        "workers": args.workers,
+        "use_cache": not args.no_cache,
+        "strict_cache": args.strict_cache,
+        "worktree": args.worktree,
+    }
+
+    started = time.perf_counter()
+    try:
+        summaries = run_batch(jobs, options)
+    except KeyboardInterrupt:
+        console.print("\n[yellow]Aborted by user[/yellow]")
+        sys.exit(130)
+
+    print_summary(summaries, time.perf_counter() - started)
+    sys.exit(0 if all(row["status"] == "succeeded" for row in summaries) else 1)
@@ -0,0 +1,359 @@
+"""Plan compilation: validate a plan once and cache the result.
+
+``compile_plan`` checks every step against its tool's signature and resolves
+step dependencies before any work runs, so a bad plan fails fast instead of
+after earlier steps have had side effects. Compiled plans are immutable and
+cached by a hash of their steps, so re-running a plan skips validation.
+
+A param value may reference an earlier step's result instead of repeating
+it, e.g. ``{"$ref": "steps.2.result.content"}`` (step id, then a path into
+the result dict). The referenced step becomes a hard dependency and the value
+is passed straight from memory when the step runs (see ``resolve_params``).
+"""
+
+import copy
+import hashlib
+import inspect
+import json
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Any, Callable, Mapping, Optional
+
+from .tools.registry import ASYNC_TOOLS, TOOLS
+
+
+# Number of compiled plans kept in memory
+PLAN_CACHE_SIZE = 256
+
+REF_KEY = "$ref"
+
+
+@dataclass(frozen=True)
+class ToolSchema:
+    """Parameters accepted by a tool, derived from its signature."""
+
+    name: str
+    func: Callable
+    params: tuple[str, ...]
+    required: frozenset[str]
+    accepts_any: bool
+    # Default values of the optional params
+    defaults: Mapping[str, Any]
+
+
+@dataclass(frozen=True)
+class CompiledStep:
+    """A validated step bound to its tool."""
+
+    index: int
+    id: str
+    tool: str
+    # The tool's function and coroutine implementation (None if it has none),
+    # resolved once here and passed to ``execute_tool``/``aexecute_tool``
+    func: Callable
+    afunc: Optional[Callable]
+    # A private copy of the step's params; use resolve_params for a mutable one
+    params: Mapping[str, Any]
+    # Steps that must finish first; the step only runs if the hard ones completed
+    deps: tuple[int, ...]
+    hard_deps: frozenset[int]
+    # Parsed $refs: (ref string, referenced step index, path into its result)
+    refs: tuple[tuple[str, int, tuple[str, ...]], ...]
+
+
+@dataclass(frozen=True)
+class CompiledPlan:
+    """A validated, immutable plan."""
+
+    hash: str
+    steps: tuple[CompiledStep, ...]
+    ids: Mapping[str, int]
+
+
+@lru_cache(maxsize=None)
+def tool_schema(tool_name: str) -> ToolSchema:
+    """Build (once per tool) the parameter schema of a registered tool."""
+    func = TOOLS[tool_name]
+    signature = inspect.signature(func)
+
+    params = []
+    required = set()
+    defaults = {}
+    accepts_any = False
+    for name, param in signature.parameters.items():
+        if param.kind == param.VAR_KEYWORD:
+            accepts_any = True
+        elif param.kind in (param.POSITIONAL_OR_KEYWORD, param.KEYWORD_ONLY):
+            params.append(name)
+            if param.default is param.empty:
+                required.add(name)
+            else:
+                defaults[name] = param.default
+
+    return ToolSchema(
+        tool_name, func, tuple(params), frozenset(required), accepts_any, MappingProxyType(defaults)
+    )
+
+
+def plan_hash(plan: dict) -> str:
+    """Hash of a plan's steps, used as the compiled plan cache key."""
+    payload = json.dumps(plan["steps"], sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+_plan_cache: "OrderedDict[str, CompiledPlan]" = OrderedDict()
+_plan_cache_lock = threading.Lock()
+
+
+def compile_plan(plan: dict) -> CompiledPlan:
+    """
+    Validate a plan and compile it, or return the cached compilation.
+
+    Raises ValueError describing the first problem found.
+    """
+    if not isinstance(plan, dict) or not isinstance(plan.get("steps"), list):
+        raise ValueError("Plan must have 'steps' array")
+
+    key = plan_hash(plan)
+    with _plan_cache_lock:
+        compiled = _plan_cache.get(key)
+        if compiled is not None:
+            _plan_cache.move_to_end(key)
+            return compiled
+
+    compiled = _compile(plan["steps"], key)
+
+    with _plan_cache_lock:
+        _plan_cache[key] = compiled
+        while len(_plan_cache) > PLAN_CACHE_SIZE:
+            _plan_cache.popitem(last=False)
+    return compiled
+
+
+def _compile(steps: list[dict], key: str) -> CompiledPlan:
+    for i, step in enumerate(steps):
+        _check_step(i, step)
+
+    deps = resolve_dependencies(steps)
+    ids = {str(step.get("id", i + 1)): i for i, step in enumerate(steps)}
+
+    compiled_steps = []
+    for i, step in enumerate(steps):
+        refs = tuple(_parse_ref(i, ref, ids) for ref in _find_refs(step["params"]))
+        dep_indices, hard = deps[i]
+        ref_indices = [index for _, index, _ in refs]
+        hard_deps = set(dep_indices if hard else []) | set(ref_indices)
+
+        compiled_steps.append(CompiledStep(
+            index=i,
+            id=str(step.get("id", i + 1)),
+            tool=step["tool"],
+            func=TOOLS[step["tool"]],
+            afunc=ASYNC_TOOLS.get(step["tool"]),
+            # Copied so later edits to the plan dict can't reach the cached compilation
+            params=MappingProxyType(copy.deepcopy(step["params"])),
+            deps=tuple(dict.fromkeys(dep_indices + ref_indices)),
+            hard_deps=frozenset(hard_deps),
+            refs=refs,
+        ))
+
+    # $refs add edges, which could close a cycle through a forward depends_on
+    _check_acyclic([(list(step.deps), True) for step in compiled_steps])
+    return CompiledPlan(key, tuple(compiled_steps), MappingProxyType(ids))
+
+
+def _find_refs(value: Any) -> list[str]:
+    """Collect the $ref strings in a (nested) param value."""
+    if isinstance(value, dict):
+        if REF_KEY in value:
+            return [value[REF_KEY]] if len(value) == 1 else [None]
+        return [ref for item in value.values() for ref in _find_refs(item)]
+    if isinstance(value, list):
+        return [ref for item in value for ref in _find_refs(item)]
+    return []
+
+
+def _parse_ref(i: int, ref: Any, ids: dict[str, int]) -> tuple[str, int, tuple[str, ...]]:
+    """Parse and check a ``steps.<id>.result[.<key>...]`` reference."""
+    parts = ref.split(".") if isinstance(ref, str) else []
+    if len(parts) < 3 or parts[0] != "steps" or parts[2] != "result":
+        raise ValueError(
+            f"Step {i+1} has invalid $ref {ref!r}: expected "
+            f"{{\"$ref\": \"steps.<id>.result[.<key>...]\"}}"
+        )
+    if parts[1] not in ids:
+        raise ValueError(f"Step {i+1} $ref {ref!r} names unknown step '{parts[1]}'")
+    if ids[parts[1]] >= i:
+        raise ValueError(f"Step {i+1} $ref {ref!r} must reference an earlier step")
+    return ref, ids[parts[1]], tuple(parts[3:])
+
+
+def resolve_params(plan: CompiledPlan, step: CompiledStep, results: Mapping[int, Any]) -> dict:
+    """
+    Build a step's params with every $ref replaced by the referenced value.
+
+    ``results`` maps step indices to their result dicts. Referenced values
+    are passed by reference, not copied; the dicts and lists of the step's
+    own params are rebuilt, so a tool mutating them can't change the compiled
+    plan. Raises ValueError if a path does not resolve.
+    """
+    def resolve(value: Any) -> Any:
+        if isinstance(value, dict):
+            if REF_KEY in value:
+                return _lookup(step, value[REF_KEY], plan.ids, results)
+            return {key: resolve(item) for key, item in value.items()}
+        if isinstance(value, list):
+            return [resolve(item) for item in value]
+        return value
+
+    return {key: resolve(value) for key, value in step.params.items()}
+
+
+def ready_steps(plan: CompiledPlan, state: list[str]) -> tuple[list[int], list[tuple[int, list[str]]]]:
+    """
+    Find the pending steps that can run, given each step's state
+    ("PENDING", "RUNNING", "COMPLETED", "SKIPPED", "FAILED"...).
+
+    Returns the steps whose dependencies have all finished, in plan order, and
+    the pending steps to skip because a hard dependency did not complete, with
+    the ids of those dependencies. Skipping a step can settle the dependencies
+    of others, so both lists account for the skips. ``state`` is not modified.
+    """
+    state = list(state)
+    skipped = []
+    changed = True
+    while changed:
+        changed = False
+        ready = []
+        for i, status in enumerate(state):
+            if status != "PENDING":
+                continue
+            step = plan.steps[i]
+            if any(state[d] in ("PENDING", "RUNNING") for d in step.deps):
+                continue
+            failed = [
+                plan.steps[d].id
+                for d in step.deps
+                if d in step.hard_deps and state[d] != "COMPLETED"
+            ]
+            if failed:
+                state[i] = "SKIPPED"
+                skipped.append((i, failed))
+                changed = True
+                continue
+            ready.append(i)
+    return ready, skipped
+
+
+def _lookup(step: CompiledStep, ref: str, ids: Mapping[str, int], results: Mapping[int, Any]) -> Any:
+    parts = ref.split(".")
+    index = ids[parts[1]]
+    if index not in results:
+        raise ValueError(f"Step {step.index+1} $ref {ref!r}: step '{parts[1]}' has no result")
+
+    value = results[index]
+    for key in parts[3:]:
+        try:
+            value = value[int(key)] if isinstance(value, list) else value[key]
+        except (KeyError, IndexError, ValueError, TypeError):
+            raise ValueError(f"Step {step.index+1} $ref {ref!r}: no '{key}' in result") from None
+    return value
+
+
+def _check_step(i: int, step: dict):
+    """Check a step's tool and params against the tool signature."""
+    if not isinstance(step, dict):
+        raise ValueError(f"Step {i+1} must be an object")
+    if "tool" not in step:
+        raise ValueError(f"Step {i+1} missing 'tool' field")
+    if step["tool"] not in TOOLS:
+        raise ValueError(
+            f"Step {i+1} has unknown tool '{step['tool']}'. "
+            f"Valid tools: {', '.join(TOOLS)}"
+        )
+    if "params" not in step:
+        raise ValueError(f"Step {i+1} missing 'params' field")
+    if not isinstance(step["params"], dict):
+        raise ValueError(f"Step {i+1} 'params' must be an object")
+
+    schema = tool_schema(step["tool"])
+    params = step["params"]
+    if not schema.accepts_any:
+        unknown = [name for name in params if name not in schema.params]
+        if unknown:
+            raise ValueError(
+                f"Step {i+1} ({schema.name}) has unknown param(s) {', '.join(unknown)}. "
+                f"Accepted params: {', '.join(schema.params)}"
+            )
+    missing = [name for name in schema.params if name in schema.required and name not in params]
+    if missing:
+        raise ValueError(
+            f"Step {i+1} ({schema.name}) missing required param(s) {', '.join(missing)}"
+        )
+
+
+def resolve_dependencies(steps: list[dict]) -> list[tuple[list[int], bool]]:
+    """
+    Resolve each step's dependencies to step indices.
+
+    Steps may declare an ``id`` (defaults to their 1-based position) and a
+    ``depends_on`` list of step ids. A step without ``depends_on`` simply runs
+    after the previous step, whatever its outcome, which keeps legacy plans
+    strictly sequential. Declared dependencies are hard: the step only runs if
+    every dependency completed.
+
+    Returns a list of ``(dependency_indices, hard)`` tuples, one per step.
+    """
+    ids = {}
+    for i, step in enumerate(steps):
+        step_id = str(step.get("id", i + 1))
+        if step_id in ids:
+            raise ValueError(f"Step {i+1} has duplicate id '{step_id}'")
+        ids[step_id] = i
+
+    deps = []
+    for i, step in enumerate(steps):
+        if "depends_on" not in step:
+            deps.append(([i - 1] if i > 0 else [], False))
+            continue
+
+        depends_on = step["depends_on"]
+        if not isinstance(depends_on, list):
+            raise ValueError(f"Step {i+1} 'depends_on' must be a list of step ids")
+
+        indices = []
+        for dep in depends_on:
+            if str(dep) not in ids:
+                raise ValueError(f"Step {i+1} depends on unknown step '{dep}'")
+            if ids[str(dep)] == i:
+                raise ValueError(f"Step {i+1} depends on itself")
+            indices.append(ids[str(dep)])
+        deps.append((indices, True))
+
+    _check_acyclic(deps)
+    return deps
+
+
+def _check_acyclic(deps: list[tuple[list[int], bool]]):
+    """Raise ValueError if the step dependency graph has a cycle."""
+    # 0 = unvisited, 1 = on stack, 2 = done
+    state = [0] * len(deps)
+    for start in range(len(deps)):
+        if state[start]:
+            continue
+        stack = [(start, iter(deps[start][0]))]
+        state[start] = 1
+        while stack:
+            node, children = stack[-1]
+            child = next(children, None)
+            if child is None:
+                state[node] = 2
+                stack.pop()
+            elif state[child] == 1:
+                raise ValueError(f"Dependency cycle detected at step {child+1}")
+            elif state[child] == 0:
+                state[child] = 1
+                stack.append((child, iter(deps[child][0])))
@@ -6,7 +6,10 @@ from datetime import datetime
 from pathlib import Path
 from rich.console import Console
 from rich.logging import RichHandler
+from rich.markup import escape
 from rich.panel import Panel
+from rich.syntax import Syntax
+from rich.table import Table
 from rich.text import Text
 
 console = Console()
@@ -52,6 +55,20 @@ def log_tool_call(tool: str, params: dict):
         console.print(f"  [dim]{key}:[/dim] {display_value}")
 
 
+def log_preview(preview: dict):
+    """Show a tool's dry-run result (message and per-file diffs) before approval."""
+    console.print(f"  [dim]Preview:[/dim] {preview.get('message', '')}")
+    for file in preview.get("files", []):
+        if file.get("diff"):
+            console.print(Syntax(file["diff"], "diff", theme="ansi_dark", background_color="default"))
+
+
+def log_output(step_num: int, stream: str, line: str):
+    """Print a line of a running step's command output."""
+    style = "red" if stream == "stderr" else "dim"
+    console.print(f"  [dim]{step_num} │[/dim] [{style}]{escape(line)}[/{style}]", highlight=False)
+
+
 def log_success(message: str):
     """Log a success message."""
     console.print(f"  [green]✓[/green] {message}")
@@ -79,8 +96,8 @@ def log_plan_start(name: str, step_count: int):
     )
 
 
-def log_plan_complete(succeeded: int, failed: int, skipped: int):
-    """Log plan completion summary."""
+def log_plan_complete(succeeded: int, failed: int, skipped: int, profile: list[dict] = None):
+    """Log plan completion summary, with a per-step profile table if given."""
     console.print()
     summary = Text()
     summary.append("✓ ", style="green")
@@ -96,3 +113,48 @@ def log_plan_complete(succeeded: int, failed: int, skipped: int):
     console.print(
         Panel(summary, title="[bold]Plan Complete[/bold]", border_style=style)
     )
+    
+    if profile:
+        log_profile(profile)
+
+
+def _format_bytes(value) -> str:
+    if value is None:
+        return "-"
+    for unit in ("B", "KB", "MB", "GB"):
+        if abs(value) < 1024 or unit == "GB":
+            return f"{value:.0f} {unit}" if unit == "B" else f"{value:.1f} {unit}"
+        value /= 1024
+
+
+def _format_seconds(value) -> str:
+    return "-" if value is None else f"{value:.3f}s"
+
+
+def log_profile(rows: list[dict]):
+    """Print a per-step profile table (see src/profiler.py for the fields)."""
+    table = Table(title="Step Profile")
+    table.add_column("Step", justify="right")
+    table.add_column("Tool")
+    table.add_column("Status")
+    for column in ("Wall", "CPU", "Peak Mem", "Read", "Written", "Approval", "Save", "Log"):
+        table.add_column(column, justify="right")
+    
+    for row in rows:
+        table.add_row(
+            str(row["step"]),
+            row["tool"],
+            row["status"],
+            _format_seconds(row.get("wall_s")),
+            _format_seconds(row.get("cpu_s")),
+            # Shared peaks may include other steps' allocations
+            _format_bytes(row.get("peak_mem_bytes")) + ("*" if row.get("peak_mem_shared") else ""),
+            _format_bytes(row.get("read_bytes")),
+            _format_bytes(row.get("write_bytes")),
+            _format_seconds(row.get("approval_s")),
+            _format_seconds(row.get("save_s")),
+            _format_seconds(row.get("log_s")),
+        )
+    console.print(table)
+    if any(row.get("peak_mem_shared") for row in rows):
+        console.print("[dim]* Overlapped other steps: the peak may include their allocations[/dim]")
@@ -2,19 +2,26 @@
 
 import sys
 import json
+import asyncio
 import argparse
 from pathlib import Path
 
 from dotenv import load_dotenv
 
-from .agent import Agent
+from .agent import Agent, DEFAULT_MAX_WORKERS
 from .logger import console, logger
+from .worktrees import MERGE_MODES
 
 
 def main():
     """Main CLI entry point."""
     load_dotenv()
     
+    if len(sys.argv) > 1 and sys.argv[1] == "batch":
+        from .batch import batch_main
+        batch_main(sys.argv[2:])
+        return
+    
     parser = argparse.ArgumentParser(
         description="Antigravity Hands - Execute AI-generated plans with approval"
     )
@@ -50,10 +57,68 @@ def main():
         help="Generate and save plan without executing",
     )
     
+    parser.add_argument(
+        "--resume",
+        metavar="SESSION_ID",
+        help="Resume an interrupted session from its first unfinished step",
+    )
+    
+    parser.add_argument(
+        "-w", "--workers",
+        type=int,
+        default=DEFAULT_MAX_WORKERS,
+        help=f"Max steps to run concurrently (default: {DEFAULT_MAX_WORKERS})",
+    )
+    
+    parser.add_argument(
+        "--async",
+        dest="use_async",
+        action="store_true",
+        help="Run steps on an asyncio event loop using native async tools",
+    )
+    
+    parser.add_argument(
+        "--worktree",
+        nargs="?",
+        const="merge",
+        choices=MERGE_MODES,
+        help="Run the plan in its own git worktree, then merge (default), push or keep its branch",
+    )
+    
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Record per-step wall/CPU time, memory peak, I/O and approval time",
+    )
+    
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Bypass the tool result cache",
+    )
+    
+    parser.add_argument(
+        "--strict-cache",
+        action="store_true",
+        help="Fingerprint cached tool inputs by content hash instead of mtime/size",
+    )
+    
     args = parser.parse_args()
     
     # Create agent
-    agent = Agent(auto_approve=args.yes)
+    agent = Agent(
+        auto_approve=args.yes,
+        max_workers=args.workers,
+        use_cache=not args.no_cache,
+        strict_cache=args.strict_cache,
+        profile=args.profile,
+        worktree=args.worktree,
+    )
+    
+    if args.resume:
+        if args.use_async:
+            run_and_exit(lambda: asyncio.run(agent.aresume(args.resume)))
+        run_and_exit(lambda: agent.resume(args.resume))
     
     # Get plan
     if args.interactive:
@@ -105,17 +170,32 @@ def main():
             sys.exit(1)
     
     # Execute plan
-    try:
-        results = agent.execute_plan(
-            plan, 
+    if args.use_async:
+        run_and_exit(lambda: asyncio.run(agent.aexecute_plan(
+            plan,
             session_id=args.session_id,
             plan_only=args.plan_only
-        )
+        )))
+    run_and_exit(lambda: agent.execute_plan(
+        plan, 
+        session_id=args.session_id,
+        plan_only=args.plan_only
+    ))
+
+
+def run_and_exit(execute):
+    """Run a plan execution callable and exit with a matching status code."""
+    try:
+        results = execute()
         
         # Exit with error code if any steps failed
         if results["failed"] > 0:
             sys.exit(1)
+        sys.exit(0)
             
+    except FileNotFoundError as e:
+        console.print(f"[red]Error:[/red] {e}")
+        sys.exit(1)
     except KeyboardInterrupt:
         console.print("\n[yellow]Aborted by user[/yellow]")
         sys.exit(130)
@@ -1,14 +1,17 @@
 """OpenAI API client wrapper."""
 
 import os
+from functools import lru_cache
+
 from openai import OpenAI
 from dotenv import load_dotenv
 
 load_dotenv()
 
 
+@lru_cache(maxsize=1)
 def get_client() -> OpenAI:
-    """Get configured OpenAI client."""
+    """Get configured OpenAI client (created once and shared across threads)."""
     api_key = os.getenv("OPENAI_API_KEY")
     if not api_key:
         raise ValueError(
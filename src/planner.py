@@ -44,6 +44,7 @@ Rules:
 4. For requests involving unknown services (e.g. "Shopify", "Asana", "Email"), USE "connect_module(domain, intent)".
 5. For vague automation tasks, USE "generic_handler(intent, action)".
 6. DO NOT hallucinate tools. If unsure, route to connect_module.
+7. To use an earlier step's output, set the param to {{"$ref": "steps.<step number>.result.<key>"}} (e.g. {{"$ref": "steps.1.result.content"}}) instead of reading the same file again.
 """
 
         user_prompt = f"Objective: {objective}"
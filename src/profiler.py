@@ -0,0 +1,87 @@
+"""Opt-in per-step profiling.
+
+Measurements are taken on the thread running the step's tool, so CPU time
+and I/O bytes are the step's own even when steps run on a thread pool (sync
+tools on the async path run on a worker thread too). Tools with a coroutine
+implementation share the event loop thread, so only their wall time and
+memory are recorded.
+
+tracemalloc's peak is process-wide. It is only reset when no other step is
+being measured, so a step's peak is never under-reported; when steps overlap
+it may include their allocations, and the step is marked ``peak_mem_shared``.
+"""
+
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+
+def _thread_io() -> Optional[tuple[int, int]]:
+    """Bytes read/written by the current thread so far (Linux only)."""
+    try:
+        with open("/proc/thread-self/io", "rb") as f:
+            fields = dict(line.split(b":", 1) for line in f.read().splitlines())
+        return int(fields[b"rchar"]), int(fields[b"wchar"])
+    except (OSError, KeyError, ValueError):
+        return None
+
+
+# Steps being measured, and a count of measurements started, so a step can
+# tell whether another one overlapped it
+_active = 0
+_started = 0
+_lock = threading.Lock()
+
+
+@contextmanager
+def measure(into: dict, per_thread: bool = True) -> Iterator[None]:
+    """
+    Record wall time, CPU time, traced memory peak and I/O bytes of a block.
+
+    Results are stored in ``into`` as ``wall_s``, ``cpu_s``, ``peak_mem_bytes``,
+    ``read_bytes`` and ``write_bytes`` (the last three only when available).
+    CPU time and I/O are those of the calling thread, so they are left out
+    when ``per_thread`` is False (a coroutine sharing the event loop thread).
+    """
+    global _active, _started
+    tracing = tracemalloc.is_tracing()
+    with _lock:
+        overlapped = _active > 0
+        if tracing and not overlapped:
+            tracemalloc.reset_peak()
+        _active += 1
+        _started += 1
+        started = _started
+    base_mem = tracemalloc.get_traced_memory()[0] if tracing else 0
+    start_io = _thread_io() if per_thread else None
+    start_cpu = time.thread_time()
+    start_wall = time.perf_counter()
+    try:
+        yield
+    finally:
+        into["wall_s"] = round(time.perf_counter() - start_wall, 6)
+        if per_thread:
+            into["cpu_s"] = round(time.thread_time() - start_cpu, 6)
+            end_io = _thread_io()
+            if start_io and end_io:
+                into["read_bytes"] = end_io[0] - start_io[0]
+                into["write_bytes"] = end_io[1] - start_io[1]
+        with _lock:
+            _active -= 1
+            overlapped = overlapped or _started != started
+        if tracing:
+            into["peak_mem_bytes"] = max(0, tracemalloc.get_traced_memory()[1] - base_mem)
+            if overlapped:
+                into["peak_mem_shared"] = True
+
+
+@contextmanager
+def timed(into: dict, key: str) -> Iterator[None]:
+    """Add the wall time of a block to ``into[key]``."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        into[key] = round(into.get(key, 0.0) + time.perf_counter() - start, 6)
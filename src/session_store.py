@@ -0,0 +1,177 @@
+"""Crash-safe session persistence.
+
+A session lives in two files under ``logs/sessions``:
+
+- ``<id>.json``: a compacted snapshot, always replaced atomically.
+- ``<id>.journal.jsonl``: small events appended since the last snapshot.
+
+Readers apply the journal on top of the snapshot (see ``load_session``).
+Events only ever set fields, so replaying one that is already part of the
+snapshot is harmless, and a torn last line from a killed process is ignored.
+"""
+
+import json
+import os
+import tempfile
+import threading
+from pathlib import Path
+from typing import Any, Optional
+
+from .logger import logger
+
+
+SESSIONS_DIR = Path("logs/sessions")
+JOURNAL_SUFFIX = ".journal.jsonl"
+
+# Number of journal events after which the snapshot is rewritten
+COMPACT_EVERY = 50
+
+
+def snapshot_path(session_id: str, logs_dir: Path = SESSIONS_DIR) -> Path:
+    return Path(logs_dir) / f"{session_id}.json"
+
+
+def journal_path(session_id: str, logs_dir: Path = SESSIONS_DIR) -> Path:
+    return Path(logs_dir) / f"{session_id}{JOURNAL_SUFFIX}"
+
+
+def write_snapshot(session_data: dict, logs_dir: Path = SESSIONS_DIR):
+    """Atomically write a full session snapshot (temp file + rename)."""
+    logs_dir = Path(logs_dir)
+    logs_dir.mkdir(parents=True, exist_ok=True)
+
+    fd, tmp_path = tempfile.mkstemp(
+        dir=logs_dir, prefix=f".{session_data['id']}.", suffix=".tmp"
+    )
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(session_data, f, indent=2, default=str)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, snapshot_path(session_data["id"], logs_dir))
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def apply_event(session_data: dict, event: dict):
+    """Apply a single journal event to a session dict in place."""
+    op = event.get("op")
+    if op == "step":
+        steps = session_data.setdefault("steps", [])
+        index = event["index"]
+        if 0 <= index < len(steps):
+            steps[index].update(event.get("fields", {}))
+    elif op == "session":
+        session_data.update(event.get("fields", {}))
+
+
+def read_journal(session_id: str, logs_dir: Path = SESSIONS_DIR) -> list[dict]:
+    """Read journal events, ignoring a torn trailing line."""
+    path = journal_path(session_id, logs_dir)
+    if not path.exists():
+        return []
+
+    events = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if not line.endswith("\n"):
+                break
+            try:
+                events.append(json.loads(line))
+            except json.JSONDecodeError:
+                break
+    return events
+
+
+def load_session(session_id: str, logs_dir: Path = SESSIONS_DIR) -> Optional[dict]:
+    """Load a session: the latest snapshot with any journal events applied."""
+    path = snapshot_path(session_id, logs_dir)
+    if not path.exists():
+        return None
+
+    with open(path, "r", encoding="utf-8") as f:
+        session_data = json.load(f)
+
+    for event in read_journal(session_id, logs_dir):
+        apply_event(session_data, event)
+    return session_data
+
+
+class SessionJournal:
+    """
+    Append-only writer for a running session.
+
+    Owns the in-memory ``session_data`` dict: every change is applied to it
+    and appended to the journal as a small event. The snapshot is compacted
+    every ``compact_every`` events and when the journal is closed.
+    """
+
+    def __init__(
+        self,
+        session_data: dict,
+        logs_dir: Path = SESSIONS_DIR,
+        compact_every: int = COMPACT_EVERY,
+    ):
+        self.data = session_data
+        self.logs_dir = Path(logs_dir)
+        self.compact_every = compact_every
+        self._lock = threading.Lock()
+        self._file = None
+        self._pending = 0
+        self.compact()
+
+    def update_step(self, index: int, **fields: Any):
+        """Update fields of a step and journal the change."""
+        self._append({"op": "step", "index": index, "fields": fields})
+
+    def update_session(self, **fields: Any):
+        """Update top-level session fields (status, meta, ...) and journal the change."""
+        self._append({"op": "session", "fields": fields})
+
+    def _append(self, event: dict):
+        with self._lock:
+            apply_event(self.data, event)
+            try:
+                if self._file is None:
+                    self._file = open(
+                        journal_path(self.data["id"], self.logs_dir), "a", encoding="utf-8"
+                    )
+                self._file.write(json.dumps(event, default=str) + "\n")
+                self._file.flush()
+                self._pending += 1
+            except Exception as e:
+                # Don't crash agent if logging fails
+                logger.error(f"Failed to append session journal: {e}")
+
+            if self._pending >= self.compact_every:
+                self._compact_locked()
+
+    def compact(self):
+        """Write a fresh snapshot and truncate the journal."""
+        with self._lock:
+            self._compact_locked()
+
+    def _compact_locked(self):
+        try:
+            write_snapshot(self.data, self.logs_dir)
+        except Exception as e:
+            # Keep the journal so readers still see the latest events
+            logger.error(f"Failed to save session logs: {e}")
+            return
+
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        try:
+            journal_path(self.data["id"], self.logs_dir).unlink(missing_ok=True)
+        except OSError as e:
+            logger.error(f"Failed to truncate session journal: {e}")
+        self._pending = 0
+
+    def close(self):
+        """Compact the session and release the journal file."""
+        self.compact()
@@ -223,6 +223,9 @@ class AntigravityApp {
             case 'step_executing':
                 this.onStepExecuting(data);
                 break;
+            case 'step_output':
+                this.onStepOutput(data);
+                break;
             case 'step_success':
                 this.onStepSuccess(data);
                 break;
@@ -275,6 +278,29 @@ class AntigravityApp {
         this.hideApprovalModal();
     }
 
+    onStepOutput(data) {
+        const card = document.getElementById(`step-${data.step}`);
+        if (!card) return;
+
+        let outputEl = card.querySelector('.step-output');
+        if (!outputEl) {
+            outputEl = document.createElement('pre');
+            outputEl.className = 'step-output';
+            card.appendChild(outputEl);
+        }
+
+        const lineEl = document.createElement('div');
+        lineEl.className = data.stream === 'stderr' ? 'stderr' : '';
+        lineEl.textContent = data.line;
+        outputEl.appendChild(lineEl);
+
+        // Keep only the tail in the DOM
+        while (outputEl.childElementCount > 200) {
+            outputEl.firstElementChild.remove();
+        }
+        outputEl.scrollTop = outputEl.scrollHeight;
+    }
+
     onStepSuccess(data) {
         const card = document.getElementById(`step-${data.step}`);
         if (card) {
@@ -1,2 +1,5 @@
 # Tool implementations
-from .registry import execute_tool, get_tool_names
+from .registry import execute_tool, aexecute_tool, get_tool_names, preview_tool
+from .cache import ResultCache
+from .proc import output_sink
+from .http_client import plan_scope
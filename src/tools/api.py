@@ -1,77 +1,354 @@
-import requests
+import asyncio
+import httpx
 import json
-from typing import Optional, Dict, Union, Any
+import time
+from functools import partial
+from typing import Optional, Dict, List, Union, Any
+
+from .download import PREVIEW_BYTES, STREAM_THRESHOLD, aread_body, read_body
+from .hedging import HEDGER
+from .http_cache import HTTP_CACHE, asend, send
+from .http_client import get_async_client, get_client, get_config, plan_scope
+from .rate_limit import HostLimiter, retry_delay
+
+
+# api_batch defaults
+BATCH_CONCURRENCY = 16
+BATCH_HOST_CONCURRENCY = 4
+BATCH_MAX_RETRIES = 3
+
+# Responses asking the client to slow down
+THROTTLE_STATUSES = (429, 503)
+
+# Methods that are safe to send twice when hedging
+IDEMPOTENT_METHODS = ('GET', 'HEAD')
+
 
 def api_request(
     method: str,
     url: str,
     headers: Optional[Dict[str, str]] = None,
-    json_body: Optional[Union[Dict[str, Any], str]] = None
+    json_body: Optional[Union[Dict[str, Any], str]] = None,
+    cache: bool = True,
+    stream_to: Optional[str] = None,
+    stream_threshold: int = STREAM_THRESHOLD,
+    preview_bytes: int = PREVIEW_BYTES,
+    hedge: bool = False,
+    hedge_delay: Optional[float] = None,
+    idempotent: bool = False
 ) -> Dict[str, Any]:
     """
-    Make an HTTP request using the requests library.
+    Make an HTTP request on the shared, pooled HTTP client.
+    
+    GET responses go through the on-disk HTTP cache (see ``http_cache``).
+    The body is read in chunks; bodies over ``stream_threshold`` bytes, or
+    any body when ``stream_to`` is set, are written to a file (see
+    ``download``) and reported in place of the content.
+    
+    With ``hedge``, an idempotent request (GET/HEAD, or ``idempotent``) that
+    has not completed after ``hedge_delay`` seconds (by default the host's
+    95th percentile latency, see ``hedging``) is sent again, and the first
+    response is used. Requests streamed to ``stream_to`` are not hedged.
     
     Args:
         method: HTTP method (GET, POST, PUT, DELETE, etc.)
         url: The URL to request
         headers: Optional dictionary of headers
         json_body: Optional JSON body (dict or string)
+        cache: Set to False to bypass the HTTP cache
+        stream_to: Optional path to write the response body to
+        stream_threshold: Size in bytes above which the body goes to a file
+        preview_bytes: Bytes of a text body written to a file to return as preview
+        hedge: Send a second request if the first is slow
+        hedge_delay: Seconds before hedging (defaults to the host's p95)
+        idempotent: Allow hedging a method other than GET/HEAD
         
     Returns:
         Dictionary with keys:
         - status: int (HTTP status code)
-        - content: dict or str (Response content)
+        - content: dict or str (Response content, unless written to a file)
+        - file: dict (path, size, content_type, sha256 and preview of a body
+          written to a file)
+        - cache: str (GET only: "hit", "revalidated" or "miss")
+        - hedge: dict (delay_s, fired, winner and the host's hedge rate,
+          when hedging)
         - error: str (Error message if any)
     """
     try:
-        # Prepare arguments
-        kwargs = {
-            'timeout': 10,
-            'headers': headers or {}
-        }
+        download = _download_options(stream_to, stream_threshold, preview_bytes)
+        key = _cache_key(method, url, headers, cache, download)
+        attempt = partial(_fetch, get_client(), method, url, key, _request_kwargs(headers, json_body), download)
+        host = httpx.URL(url).netloc.decode('ascii')
+        if not _hedgeable(method, hedge, idempotent, stream_to):
+            return HEDGER.timed(host, attempt)()
         
-        # Handle body
-        if json_body:
-            if isinstance(json_body, str):
-                try:
-                    kwargs['json'] = json.loads(json_body)
-                except json.JSONDecodeError:
-                    # Fallback to data if it's not valid JSON string but meant to be raw body?
-                    # The prompt says json_body. We'll assume it's data if string.
-                    # Actually standard requests usage for 'json' arg is a dict.
-                    kwargs['data'] = json_body
-            else:
-                kwargs['json'] = json_body
-
-        # Execute request
-        response = requests.request(method, url, **kwargs)
+        result, report = HEDGER.run(host, attempt, hedge_delay if hedge_delay is not None else HEDGER.delay(host))
+        return {**result, 'hedge': report}
         
-        # Parse content
+    except httpx.TimeoutException:
+        return _timeout_result()
+    except httpx.HTTPError as e:
+        return _request_error_result(e)
+    except Exception as e:
+        return _unexpected_error_result(e)
+
+
+async def api_request_async(
+    method: str,
+    url: str,
+    headers: Optional[Dict[str, str]] = None,
+    json_body: Optional[Union[Dict[str, Any], str]] = None,
+    cache: bool = True,
+    stream_to: Optional[str] = None,
+    stream_threshold: int = STREAM_THRESHOLD,
+    preview_bytes: int = PREVIEW_BYTES,
+    hedge: bool = False,
+    hedge_delay: Optional[float] = None,
+    idempotent: bool = False
+) -> Dict[str, Any]:
+    """Async version of ``api_request`` on the event loop's shared ``httpx.AsyncClient``."""
+    try:
+        download = _download_options(stream_to, stream_threshold, preview_bytes)
+        key = _cache_key(method, url, headers, cache, download)
+        attempt = partial(_afetch, get_async_client(), method, url, key, _request_kwargs(headers, json_body), download)
+        host = httpx.URL(url).netloc.decode('ascii')
+        if not _hedgeable(method, hedge, idempotent, stream_to):
+            return await HEDGER.atimed(host, attempt)()
+        
+        result, report = await HEDGER.arun(host, attempt, hedge_delay if hedge_delay is not None else HEDGER.delay(host))
+        return {**result, 'hedge': report}
+        
+    except httpx.TimeoutException:
+        return _timeout_result()
+    except httpx.HTTPError as e:
+        return _request_error_result(e)
+    except Exception as e:
+        return _unexpected_error_result(e)
+
+
+def api_batch(
+    requests: List[Dict[str, Any]],
+    max_concurrency: int = BATCH_CONCURRENCY,
+    per_host: int = BATCH_HOST_CONCURRENCY,
+    rate: Optional[float] = None,
+    burst: Optional[int] = None,
+    max_retries: int = BATCH_MAX_RETRIES,
+    cache: bool = True,
+    stream_threshold: int = STREAM_THRESHOLD,
+) -> Dict[str, Any]:
+    """
+    Make many HTTP requests concurrently, limited globally and per host.
+    
+    Args:
+        requests: Requests as ``api_request`` params (method, url, headers,
+            json_body, stream_to)
+        max_concurrency: Maximum requests in flight overall
+        per_host: Maximum requests in flight per host
+        rate: Maximum requests per second per host (token bucket), or None
+        burst: Requests a host's bucket allows at once (defaults to ``rate``)
+        max_retries: Retries of a request answered with 429 or 503
+        cache: Set to False to bypass the HTTP cache for GET requests
+        stream_threshold: Size in bytes above which a body goes to a file
+        
+    Returns:
+        Dictionary with keys:
+        - message: str (Summary)
+        - results: list (``api_request`` results in input order, each with
+          elapsed_s and attempts)
+        - failed: int (Requests with an error or an error status)
+    """
+    async def run_batch():
+        async with plan_scope():
+            return await api_batch_async(
+                requests, max_concurrency, per_host, rate, burst, max_retries, cache, stream_threshold
+            )
+    
+    return asyncio.run(run_batch())
+
+
+async def api_batch_async(
+    requests: List[Dict[str, Any]],
+    max_concurrency: int = BATCH_CONCURRENCY,
+    per_host: int = BATCH_HOST_CONCURRENCY,
+    rate: Optional[float] = None,
+    burst: Optional[int] = None,
+    max_retries: int = BATCH_MAX_RETRIES,
+    cache: bool = True,
+    stream_threshold: int = STREAM_THRESHOLD,
+) -> Dict[str, Any]:
+    """
+    Async version of ``api_batch``.
+    
+    A 429 or 503 pauses every request to that host for the time given by
+    ``Retry-After`` (or an exponential backoff) before the request is retried.
+    """
+    if max_concurrency < 1 or per_host < 1:
+        raise ValueError("max_concurrency and per_host must be at least 1")
+    for request in requests:
+        if not isinstance(request, dict) or 'url' not in request:
+            raise ValueError(f"Each request needs a url: {request}")
+    
+    client = get_async_client()
+    overall = asyncio.Semaphore(max_concurrency)
+    limiters: Dict[str, HostLimiter] = {}
+    
+    async def send_one(request: Dict[str, Any]) -> Dict[str, Any]:
+        method = request.get('method', 'GET')
+        url = request['url']
         try:
-            content = response.json()
-        except json.JSONDecodeError:
-            content = response.text
+            # A malformed request only fails its own row
+            kwargs = _request_kwargs(request.get('headers'), request.get('json_body'))
+            download = _download_options(request.get('stream_to'), stream_threshold, PREVIEW_BYTES)
+            key = _cache_key(method, url, request.get('headers'), cache, download)
+            host = httpx.URL(url).netloc.decode('ascii')
+        except Exception as e:
+            return {**_request_error_result(e), 'elapsed_s': 0.0, 'attempts': 0}
+        limiter = limiters.setdefault(host, HostLimiter(per_host, rate, burst))
+        
+        started = time.perf_counter()
+        attempt = 0
+        while True:
+            await limiter.wait()
+            try:
+                async with limiter.semaphore, overall:
+                    response, cached = await asend(client, method, url, key, **kwargs)
+                    if response.status_code in THROTTLE_STATUSES and attempt < max_retries:
+                        await response.aclose()
+                    else:
+                        result = await _aread_result(response, cached, key, download)
+                        break
+            except httpx.TimeoutException:
+                result = _timeout_result()
+                break
+            except httpx.HTTPError as e:
+                result = _request_error_result(e)
+                break
+            except Exception as e:
+                result = _unexpected_error_result(e)
+                break
             
-        return {
-            'status': response.status_code,
-            'content': content
-        }
+            limiter.back_off(retry_delay(response.headers.get('retry-after'), attempt))
+            attempt += 1
         
-    except requests.Timeout:
-        return {
-            'status': 408,
-            'content': 'Request timed out after 10 seconds',
-            'error': 'Timeout'
-        }
-    except requests.RequestException as e:
         return {
-            'status': 500,
-            'content': str(e),
-            'error': 'RequestException'
-        }
-    except Exception as e:
-        return {
-            'status': 500,
-            'content': f"Unexpected error: {str(e)}",
-            'error': 'UnexpectedError'
+            **result,
+            'elapsed_s': round(time.perf_counter() - started, 3),
+            'attempts': attempt + 1,
         }
+    
+    started = time.perf_counter()
+    results = await asyncio.gather(*(send_one(request) for request in requests))
+    failed = sum(1 for result in results if 'error' in result or result['status'] >= 400)
+    return {
+        'message': f"{len(results)} requests in {time.perf_counter() - started:.2f}s, {failed} failed",
+        'results': results,
+        'failed': failed,
+    }
+
+
+def _request_kwargs(
+    headers: Optional[Dict[str, str]],
+    json_body: Optional[Union[Dict[str, Any], str]],
+) -> Dict[str, Any]:
+    """httpx request arguments for the tool's headers and body."""
+    kwargs = {'headers': headers or {}}
+    if json_body:
+        if isinstance(json_body, str):
+            try:
+                kwargs['json'] = json.loads(json_body)
+            except json.JSONDecodeError:
+                # Not valid JSON: send the string as the raw body
+                kwargs['content'] = json_body
+        else:
+            kwargs['json'] = json_body
+    return kwargs
+
+
+def _download_options(stream_to: Optional[str], threshold: int, preview: int) -> Dict[str, Any]:
+    return {'stream_to': stream_to, 'threshold': threshold, 'preview': preview}
+
+
+def _cache_key(method: str, url: str, headers: Optional[Dict[str, str]], cache: bool, download: Dict[str, Any]) -> Optional[str]:
+    # Bodies written to a requested file are not kept in the cache
+    if not cache or download['stream_to']:
+        return None
+    return HTTP_CACHE.key(method, url, headers)
+
+
+def _hedgeable(method: str, hedge: bool, idempotent: bool, stream_to: Optional[str]) -> bool:
+    return hedge and not stream_to and (idempotent or method.upper() in IDEMPOTENT_METHODS)
+
+
+def _fetch(client, method: str, url: str, key: Optional[str], kwargs: Dict[str, Any], download: Dict[str, Any]) -> Dict[str, Any]:
+    """Send a request and read its result (one attempt, when hedging)."""
+    response, cached = send(client, method, url, key, **kwargs)
+    return _read_result(response, cached, key, download)
+
+
+async def _afetch(client, method: str, url: str, key: Optional[str], kwargs: Dict[str, Any], download: Dict[str, Any]) -> Dict[str, Any]:
+    """Async version of ``_fetch``."""
+    response, cached = await asend(client, method, url, key, **kwargs)
+    return await _aread_result(response, cached, key, download)
+
+
+def _read_result(response, cached: Optional[str], key: Optional[str], download: Dict[str, Any]) -> Dict[str, Any]:
+    """Read a streamed response, store it in the cache on a miss, and build the result."""
+    try:
+        content, file = read_body(response, **download)
+    finally:
+        response.close()
+    if cached == 'miss' and content is not None:
+        HTTP_CACHE.put(key, response, content)
+    return _response_result(response, content, file, cached)
+
+
+async def _aread_result(response, cached: Optional[str], key: Optional[str], download: Dict[str, Any]) -> Dict[str, Any]:
+    """Async version of ``_read_result``."""
+    try:
+        content, file = await aread_body(response, **download)
+    finally:
+        await response.aclose()
+    if cached == 'miss' and content is not None:
+        await asyncio.to_thread(HTTP_CACHE.put, key, response, content)
+    return _response_result(response, content, file, cached)
+
+
+def _response_result(response, content: Optional[bytes], file: Optional[Dict[str, Any]], cached: Optional[str] = None) -> Dict[str, Any]:
+    """Build the tool result from an httpx response and its body."""
+    result = {'status': response.status_code}
+    if file is not None:
+        result['file'] = file
+    else:
+        # Parse content
+        try:
+            result['content'] = json.loads(content)
+        except ValueError:
+            result['content'] = content.decode(response.encoding or 'utf-8', errors='replace')
+    
+    if cached is not None:
+        result['cache'] = cached
+    return result
+
+
+def _timeout_result() -> Dict[str, Any]:
+    return {
+        'status': 408,
+        'content': f'Request timed out after {get_config().timeout:g} seconds',
+        'error': 'Timeout'
+    }
+
+
+def _request_error_result(e: Exception) -> Dict[str, Any]:
+    return {
+        'status': 500,
+        'content': str(e),
+        'error': 'RequestException'
+    }
+
+
+def _unexpected_error_result(e: Exception) -> Dict[str, Any]:
+    return {
+        'status': 500,
+        'content': f"Unexpected error: {str(e)}",
+        'error': 'UnexpectedError'
+    }
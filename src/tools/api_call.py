@@ -3,6 +3,8 @@
 import httpx
 from typing import Any
 
+from .http_client import get_async_client, get_client
+
 
 def http_request(
     method: str,
@@ -27,20 +29,39 @@ def http_request(
     method = method.upper()
     headers = headers or {}
     
-    with httpx.Client(timeout=timeout) as client:
-        if method == "GET":
-            response = client.get(url, headers=headers)
-        elif method == "POST":
-            response = client.post(url, headers=headers, json=body)
-        elif method == "PUT":
-            response = client.put(url, headers=headers, json=body)
-        elif method == "PATCH":
-            response = client.patch(url, headers=headers, json=body)
-        elif method == "DELETE":
-            response = client.delete(url, headers=headers)
-        else:
-            raise ValueError(f"Unsupported HTTP method: {method}")
+    response = get_client().request(method, url, headers=headers, **_request_options(method, body, timeout))
+    return _response_result(method, url, response)
+
+
+async def http_request_async(
+    method: str,
+    url: str,
+    headers: dict = None,
+    body: Any = None,
+    timeout: float = 30.0,
+) -> dict:
+    """Async version of ``http_request``."""
+    method = method.upper()
+    headers = headers or {}
+    
+    response = await get_async_client().request(
+        method, url, headers=headers, **_request_options(method, body, timeout)
+    )
+    return _response_result(method, url, response)
+
+
+def _request_options(method: str, body: Any, timeout: float) -> dict:
+    if method not in ("GET", "POST", "PUT", "PATCH", "DELETE"):
+        raise ValueError(f"Unsupported HTTP method: {method}")
     
+    # Only methods that take a body get one
+    options = {"timeout": timeout, "follow_redirects": False}
+    if method in ("POST", "PUT", "PATCH"):
+        options["json"] = body
+    return options
+
+
+def _response_result(method: str, url: str, response: httpx.Response) -> dict:
     # Try to parse JSON response
     try:
         response_body = response.json()
@@ -0,0 +1,159 @@
+"""Cache of build outputs, keyed by a build's declared inputs.
+
+An entry holds a copy of the output directory, its digest and the build
+result. On a hit the output directory is left alone if it still matches,
+and restored from the copy otherwise.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, Optional
+
+from .cache import CACHE_ROOT
+from .hashing import default_hasher, expand_paths, tree_digest
+
+
+DEFAULT_MAX_ENTRIES = 5
+DEFAULT_MAX_BYTES = 1024 * 1024 * 1024
+DEFAULT_MAX_AGE = 7 * 24 * 60 * 60  # seconds
+
+# Environment variables that are part of every build key
+BUILD_ENV = ("NODE_ENV",)
+
+META_FILE = "meta.json"
+OUTPUT_DIR = "output"
+
+
+class BuildCache:
+    """
+    On-disk cache of build output directories.
+
+    Entries older than ``max_age`` seconds are ignored and evicted; beyond
+    ``max_entries`` or ``max_bytes``, the least recently used entries go first.
+    """
+
+    def __init__(
+        self,
+        cache_dir: Path = CACHE_ROOT / "builds",
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        max_age: float = DEFAULT_MAX_AGE,
+    ):
+        self.cache_dir = Path(cache_dir)
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self._lock = threading.Lock()
+
+    def key(self, command: str, cwd: str, inputs: list[str], output_dir: str, env: list[str] = None) -> str:
+        """
+        Build the cache key from the command, the content of the input files
+        (minus any under the output directory) and the relevant env vars.
+        """
+        output = (Path(cwd) / output_dir).resolve()
+        files = [
+            path for path in expand_paths(inputs, cwd)
+            if output != path.resolve() and output not in path.resolve().parents
+        ]
+        names = sorted(set(BUILD_ENV) | set(env or []))
+        payload = json.dumps(
+            {
+                "command": command,
+                "output_dir": output_dir,
+                "inputs": tree_digest(default_hasher().hash_files(files, cwd)),
+                "env": {name: os.environ.get(name) for name in names},
+            },
+            sort_keys=True,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[dict[str, Any]]:
+        """Return an entry's metadata, or None on a miss."""
+        meta_path = self.cache_dir / key / META_FILE
+        try:
+            if time.time() - meta_path.stat().st_mtime > self.max_age:
+                return None
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            # mtime doubles as the last-used time for LRU eviction
+            os.utime(meta_path)
+        except (OSError, ValueError):
+            return None
+        return meta
+
+    def restore(self, key: str, meta: dict, output_dir: Path) -> str:
+        """
+        Make ``output_dir`` match a cached entry.
+
+        Returns "reused" if it already did, "restored" if it was copied back.
+        """
+        if output_dir.is_dir() and _digest(output_dir) == meta["output_digest"]:
+            return "reused"
+
+        if output_dir.exists():
+            shutil.rmtree(output_dir)
+        shutil.copytree(self.cache_dir / key / OUTPUT_DIR, output_dir, copy_function=shutil.copy2)
+        return "restored"
+
+    def put(self, key: str, output_dir: Path, result: dict[str, Any]):
+        """Store a copy of a successful build's output directory."""
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        tmp_dir = Path(tempfile.mkdtemp(dir=self.cache_dir, prefix=".tmp-"))
+        try:
+            shutil.copytree(output_dir, tmp_dir / OUTPUT_DIR, copy_function=shutil.copy2)
+            size = sum(path.stat().st_size for path in (tmp_dir / OUTPUT_DIR).rglob("*") if path.is_file())
+            meta = {
+                "created": time.time(),
+                "bytes": size,
+                "output_digest": _digest(output_dir),
+                "result": result,
+            }
+            with open(tmp_dir / META_FILE, "w", encoding="utf-8") as f:
+                json.dump(meta, f)
+
+            with self._lock:
+                entry = self.cache_dir / key
+                if entry.exists():
+                    shutil.rmtree(entry)
+                os.replace(tmp_dir, entry)
+        except (OSError, TypeError, ValueError):
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            return
+
+        self.evict()
+
+    def evict(self):
+        """Remove expired entries, then least recently used ones over the limits."""
+        now = time.time()
+        entries = []
+        for entry in self.cache_dir.iterdir():
+            if entry.name.startswith("."):
+                continue
+            try:
+                used = (entry / META_FILE).stat().st_mtime
+                with open(entry / META_FILE, "r", encoding="utf-8") as f:
+                    size = json.load(f).get("bytes", 0)
+            except (OSError, ValueError):
+                shutil.rmtree(entry, ignore_errors=True)
+                continue
+            if now - used > self.max_age:
+                shutil.rmtree(entry, ignore_errors=True)
+            else:
+                entries.append((used, size, entry))
+
+        entries.sort(reverse=True)
+        total = 0
+        for count, (used, size, entry) in enumerate(entries, 1):
+            total += size
+            if count > self.max_entries or total > self.max_bytes:
+                shutil.rmtree(entry, ignore_errors=True)
+
+
+def _digest(directory: Path) -> str:
+    return tree_digest(default_hasher().hash_files(expand_paths(["."], directory), directory))
@@ -0,0 +1,171 @@
+"""Content-addressed cache for idempotent tool results."""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, Optional
+
+
+CACHE_ROOT = Path(os.getenv("OPTIMUS_CACHE_DIR", ".optimus/cache"))
+
+DEFAULT_MAX_ENTRIES = 1000
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+DEFAULT_MAX_AGE = 24 * 60 * 60  # seconds
+
+# Run eviction after this many writes rather than on every one
+EVICT_EVERY = 25
+
+
+def fingerprint_file(path: str, strict: bool = False) -> dict:
+    """
+    Fingerprint a file a tool reads.
+
+    By default this is the file's size and mtime; in strict mode it is a
+    SHA-256 of the content, which also catches edits that preserve mtime.
+    """
+    file_path = Path(path).absolute()
+    try:
+        stat = file_path.stat()
+    except OSError:
+        return {"path": str(file_path), "missing": True}
+
+    if not strict:
+        return {"path": str(file_path), "size": stat.st_size, "mtime": stat.st_mtime_ns}
+
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return {"path": str(file_path), "sha256": digest.hexdigest()}
+
+
+class ResultCache:
+    """
+    On-disk cache of tool results, keyed by tool name, normalized params and
+    fingerprints of the files the tool reads.
+
+    Entries older than ``max_age`` seconds are ignored and evicted; beyond
+    ``max_entries`` or ``max_bytes``, the least recently used entries go first.
+    Hit and miss counters are kept per instance.
+    """
+
+    def __init__(
+        self,
+        cache_dir: Path = CACHE_ROOT / "results",
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        max_age: float = DEFAULT_MAX_AGE,
+        strict: bool = False,
+    ):
+        self.cache_dir = Path(cache_dir)
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.strict = strict
+        self.hits = 0
+        self.misses = 0
+        self._writes = 0
+        self._lock = threading.Lock()
+
+    def key(self, tool_name: str, params: dict, inputs: list[str]) -> str:
+        """Build the cache key for a tool call."""
+        payload = json.dumps(
+            {
+                "tool": tool_name,
+                "params": params,
+                "inputs": [fingerprint_file(path, self.strict) for path in inputs],
+            },
+            sort_keys=True,
+            separators=(",", ":"),
+            default=str,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[dict[str, Any]]:
+        """Return a cached result, or None on a miss."""
+        path = self.cache_dir / f"{key}.json"
+        result = None
+        try:
+            if time.time() - path.stat().st_mtime <= self.max_age:
+                with open(path, "r", encoding="utf-8") as f:
+                    result = json.load(f)["result"]
+                # mtime doubles as the last-used time for LRU eviction
+                os.utime(path)
+        except (OSError, ValueError, KeyError):
+            result = None
+
+        with self._lock:
+            if result is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return result
+
+    def put(self, key: str, tool_name: str, result: dict[str, Any]):
+        """Store a result. Results that are not JSON-serializable are not cached."""
+        try:
+            data = json.dumps({"tool": tool_name, "created": time.time(), "result": result})
+        except (TypeError, ValueError):
+            return
+
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, prefix=".", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(data)
+            os.replace(tmp_path, self.cache_dir / f"{key}.json")
+        except OSError:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            return
+
+        with self._lock:
+            self._writes += 1
+            evict = self._writes % EVICT_EVERY == 1
+        if evict:
+            self.evict()
+
+    def evict(self):
+        """Remove expired entries, then least recently used ones over the limits."""
+        now = time.time()
+        entries = []
+        try:
+            with os.scandir(self.cache_dir) as it:
+                for entry in it:
+                    if not entry.name.endswith(".json"):
+                        continue
+                    try:
+                        stat = entry.stat()
+                    except OSError:
+                        continue
+                    if now - stat.st_mtime > self.max_age:
+                        self._remove(entry.path)
+                    else:
+                        entries.append((stat.st_mtime, stat.st_size, entry.path))
+        except FileNotFoundError:
+            return
+
+        entries.sort()
+        total_bytes = sum(size for _, size, _ in entries)
+        while entries and (len(entries) > self.max_entries or total_bytes > self.max_bytes):
+            _, size, path = entries.pop(0)
+            self._remove(path)
+            total_bytes -= size
+
+    @staticmethod
+    def _remove(path: str):
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+
+    def stats(self) -> dict[str, int]:
+        """Hit/miss counters for this cache instance."""
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses}
@@ -0,0 +1,123 @@
+"""Tree-wide search and replace."""
+
+import difflib
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Optional
+
+from .file_ops import atomic_open, edit_stage
+from .workspace import is_binary, list_files
+
+
+# Below this many files the scan runs in-process (pool startup costs more)
+PROCESS_POOL_MIN_FILES = 64
+
+# Per-file diff size shown in dry runs
+MAX_DIFF_CHARS = 4000
+
+
+def replace_in_tree(
+    replacements: list[dict],
+    root: str = ".",
+    include: Optional[list[str]] = None,
+    exclude: Optional[list[str]] = None,
+    dry_run: bool = False,
+    max_workers: Optional[int] = None,
+) -> dict:
+    """
+    Apply search/replace edits to every matching file under a directory.
+
+    Replacements use the ``edit_file`` edit format (``search``, ``replace``,
+    optional ``regex``) and are applied in order. Ignored (.gitignore),
+    binary and non-UTF-8 files are skipped. Files are scanned in parallel and
+    each changed file is replaced atomically.
+
+    Args:
+        replacements: List of ``{"search", "replace", "regex"?}`` edits
+        root: Directory to search
+        include: Glob patterns of files to edit (default: all)
+        exclude: Glob patterns of files to leave alone
+        dry_run: Report per-file diffs without writing anything
+        max_workers: Max scanning processes (default: CPU count)
+
+    Returns:
+        Result dict with per-file replacement counts (and diffs on dry runs)
+    """
+    if not replacements:
+        raise ValueError("No replacements given")
+    # Validate up front so bad edits fail before any file is touched
+    for i, edit in enumerate(replacements):
+        edit_stage(i, edit)
+
+    files = [str(path) for path in list_files(root, include, exclude)]
+
+    if len(files) < PROCESS_POOL_MIN_FILES:
+        results = [_replace_file(path, replacements, dry_run) for path in files]
+    else:
+        workers = max_workers or os.cpu_count() or 1
+        # Spawned, not forked: this runs on worker threads of a process that
+        # may hold locks (logging, HTTP pools) a forked child would inherit held
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+            chunksize = max(1, len(files) // (workers * 4))
+            results = list(pool.map(
+                _replace_file,
+                files,
+                [replacements] * len(files),
+                [dry_run] * len(files),
+                chunksize=chunksize,
+            ))
+
+    changed = [result for result in results if result]
+    total = sum(result["replacements"] for result in changed)
+    verb = "Would change" if dry_run else "Changed"
+
+    return {
+        "message": f"{verb} {len(changed)} of {len(files)} file(s), {total} replacement(s)",
+        "root": str(Path(root).absolute()),
+        "dry_run": dry_run,
+        "files_scanned": len(files),
+        "files_changed": len(changed),
+        "replacements": total,
+        "files": changed,
+    }
+
+
+def _replace_file(path: str, replacements: list[dict], dry_run: bool) -> Optional[dict]:
+    """Apply the edits to one file. Runs in a worker process."""
+    file_path = Path(path)
+    try:
+        if is_binary(file_path):
+            return None
+        with open(file_path, "r", encoding="utf-8", newline="") as f:
+            content = f.read()
+    except (OSError, UnicodeDecodeError):
+        return None
+
+    new_content = content
+    counts = []
+    for i, edit in enumerate(replacements):
+        stage = edit_stage(i, edit)
+        new_content = stage.feed(new_content, final=True)
+        counts.append(stage.count)
+
+    if new_content == content:
+        return None
+
+    result = {"path": path, "replacements": sum(counts), "counts": counts}
+    if dry_run:
+        diff = "".join(difflib.unified_diff(
+            content.splitlines(keepends=True),
+            new_content.splitlines(keepends=True),
+            fromfile=f"a/{path}",
+            tofile=f"b/{path}",
+            n=1,
+        ))
+        if len(diff) > MAX_DIFF_CHARS:
+            diff = diff[:MAX_DIFF_CHARS] + "\n... (diff truncated)\n"
+        result["diff"] = diff
+    else:
+        with atomic_open(file_path, fsync=False, newline="") as f:
+            f.write(new_content)
+    return result
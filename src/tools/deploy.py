@@ -1,88 +1,465 @@
 """Static site build and deploy tools."""
 
+import asyncio
+import contextvars
+import hashlib
+import json
 import subprocess
-import shutil
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from pathlib import Path
+from typing import Callable, Optional
 
+from .build_cache import BuildCache
+from .manifest import build_manifest, diff_manifests, load_deploy, save_manifest, sync_directory, transfer_stats
+from .proc import output_sink, run, arun
 
-def build_site(command: str, cwd: str = ".") -> dict:
+
+# Shared by all builds; entries are keyed by command, inputs and env
+BUILD_CACHE = BuildCache()
+
+# Targets deployed at once by deploy_many
+DEPLOY_WORKERS = 4
+
+
+def build_site(
+    command: str,
+    cwd: str = ".",
+    inputs: list[str] = None,
+    output_dir: str = None,
+    env: list[str] = None,
+    use_cache: bool = True,
+) -> dict:
     """
     Run a build command for a static site.
     
+    When ``inputs`` and ``output_dir`` are declared, the build is cached: if
+    the input files, command and env vars match a previous successful build,
+    its output directory is reused (or restored) instead of building again.
+    
     Args:
         command: Build command to run (e.g., "npm run build")
         cwd: Working directory
+        inputs: Files/directories the build reads, relative to cwd
+        output_dir: Directory the build writes, relative to cwd
+        env: Names of environment variables that affect the build
+        use_cache: Set to False to always build
     
     Returns:
-        Result dict with build output
+        Result dict with build output and whether it came from the cache
     """
-    result = subprocess.run(
-        command,
-        shell=True,
-        cwd=cwd,
-        capture_output=True,
-        text=True,
-    )
+    if not _cacheable(inputs, output_dir, use_cache):
+        return _build_result(run(command, cwd, shell=True, stream=True))
+    
+    key = BUILD_CACHE.key(command, cwd, inputs, output_dir, env)
+    cached = _restore_build(key, cwd, output_dir)
+    if cached is not None:
+        return cached
     
+    result = _build_result(run(command, cwd, shell=True, stream=True), cached=False)
+    _store_build(key, cwd, output_dir, result)
+    return result
+
+
+async def build_site_async(
+    command: str,
+    cwd: str = ".",
+    inputs: list[str] = None,
+    output_dir: str = None,
+    env: list[str] = None,
+    use_cache: bool = True,
+) -> dict:
+    """Async version of ``build_site``; hashing and copying run on a thread."""
+    if not _cacheable(inputs, output_dir, use_cache):
+        return _build_result(await arun(command, cwd, shell=True, stream=True))
+    
+    key = await asyncio.to_thread(BUILD_CACHE.key, command, cwd, inputs, output_dir, env)
+    cached = await asyncio.to_thread(_restore_build, key, cwd, output_dir)
+    if cached is not None:
+        return cached
+    
+    result = _build_result(await arun(command, cwd, shell=True, stream=True), cached=False)
+    await asyncio.to_thread(_store_build, key, cwd, output_dir, result)
+    return result
+
+
+def _cacheable(inputs: list[str], output_dir: str, use_cache: bool) -> bool:
+    return bool(use_cache and inputs and output_dir)
+
+
+def _restore_build(key: str, cwd: str, output_dir: str) -> dict:
+    meta = BUILD_CACHE.get(key)
+    if meta is None:
+        return None
+    
+    how = BUILD_CACHE.restore(key, meta, Path(cwd) / output_dir)
+    return {
+        **meta["result"],
+        "message": f"Build cached: inputs unchanged, {how} {output_dir}",
+        "cached": True,
+    }
+
+
+def _store_build(key: str, cwd: str, output_dir: str, result: dict):
+    output = Path(cwd) / output_dir
+    if output.is_dir():
+        BUILD_CACHE.put(key, output, result)
+
+
+def _build_result(result: subprocess.CompletedProcess, cached: bool = None) -> dict:
     if result.returncode != 0:
         raise RuntimeError(f"Build failed: {result.stderr.strip()}")
     
-    return {
+    build = {
         "message": "Build completed successfully",
-        "output": result.stdout[:1000],  # Truncate long output
+        "output": result.stdout[-1000:],  # Tail of the (streamed) output
         "returncode": result.returncode,
     }
+    if cached is not None:
+        build["cached"] = cached
+    return build
 
 
 def deploy(
     provider: str,
     source_dir: str = "dist",
     project_name: str = None,
+    force: bool = False,
+    skip_unchanged: bool = False,
     **config
 ) -> dict:
     """
     Deploy a static site to a hosting provider.
     
+    The files deployed are recorded in a manifest of content hashes per
+    target. Only files added, changed or deleted since the last deploy are
+    copied (``local``) or reported. A local deploy with no changes is
+    skipped; a remote one only with ``skip_unchanged``, since the provider's
+    side may have changed without the manifest knowing.
+    
     Args:
-        provider: Hosting provider (vercel, netlify, github-pages, surge)
+        provider: Hosting provider (vercel, netlify, github-pages, surge, local)
         source_dir: Directory containing built files
         project_name: Project name (optional)
-        **config: Provider-specific configuration
+        force: Deploy even if nothing changed since the last deploy
+        skip_unchanged: Skip a remote deploy if no file changed since the last
+            one with the same options
+        **config: Provider-specific configuration (``target_dir`` for local)
     
     Returns:
-        Result dict with deploy URL
+        Result dict with deploy URL and files/bytes transferred versus skipped
     """
+    plan = _plan_deploy(provider, source_dir, project_name, config, force, skip_unchanged)
+    if not plan.pending:
+        return plan.skipped()
+    
+    if plan.args is None:
+        sync_directory(plan.source, plan.target_dir, plan.diff)
+        result = plan.parse(plan)
+    else:
+        result = _deploy_result(plan.label, plan.parse, run(plan.args, stream=True))
+    return _finish_deploy(plan, result)
+
+
+async def deploy_async(
+    provider: str,
+    source_dir: str = "dist",
+    project_name: str = None,
+    force: bool = False,
+    skip_unchanged: bool = False,
+    **config
+) -> dict:
+    """Async version of ``deploy``; hashing and copying run on a thread."""
+    plan = await asyncio.to_thread(
+        _plan_deploy, provider, source_dir, project_name, config, force, skip_unchanged
+    )
+    if not plan.pending:
+        return plan.skipped()
+    
+    if plan.args is None:
+        await asyncio.to_thread(sync_directory, plan.source, plan.target_dir, plan.diff)
+        result = plan.parse(plan)
+    else:
+        result = _deploy_result(plan.label, plan.parse, await arun(plan.args, stream=True))
+    return await asyncio.to_thread(_finish_deploy, plan, result)
+
+
+def deploy_many(
+    targets: list[dict],
+    source_dir: str = "dist",
+    max_parallel: int = DEPLOY_WORKERS,
+    force: bool = False,
+    allow_partial: bool = True,
+) -> dict:
+    """
+    Deploy the same build to several targets concurrently.
+    
+    Each target's output lines are streamed prefixed with its name. A target
+    that fails does not stop the others; its entry in ``results`` holds the
+    error instead.
+    
+    Args:
+        targets: ``deploy`` params per target (provider, project_name, config),
+            plus an optional ``name`` for it in the results
+        source_dir: Directory containing built files, shared by all targets
+        max_parallel: Maximum number of deploys running at once
+        force: Deploy even if nothing changed since a target's last deploy
+        allow_partial: Set to False to fail the step if any target fails
+    
+    Returns:
+        Result dict with per-target results and the targets that failed
+    """
+    named = _named_targets(targets, max_parallel)
+    sink = output_sink.get()
+    
+    def deploy_one(name: str, target: dict) -> dict:
+        output_sink.set(_prefixed_sink(sink, name))
+        try:
+            result = deploy(**target, source_dir=source_dir, force=force)
+        except Exception as e:
+            result = {"error": str(e)}
+        _report_target(result)
+        return result
+    
+    with ThreadPoolExecutor(max_workers=max_parallel) as pool:
+        # Each deploy runs in a copy of this context, so it streams to our sink
+        futures = {
+            name: pool.submit(contextvars.copy_context().run, deploy_one, name, target)
+            for name, target in named.items()
+        }
+        results = {name: future.result() for name, future in futures.items()}
+    return _deploy_many_result(results, allow_partial)
+
+
+async def deploy_many_async(
+    targets: list[dict],
+    source_dir: str = "dist",
+    max_parallel: int = DEPLOY_WORKERS,
+    force: bool = False,
+    allow_partial: bool = True,
+) -> dict:
+    """Async version of ``deploy_many``."""
+    named = _named_targets(targets, max_parallel)
+    sink = output_sink.get()
+    semaphore = asyncio.Semaphore(max_parallel)
+    
+    async def deploy_one(name: str, target: dict) -> dict:
+        # gather runs each call as a task with its own copy of the context
+        output_sink.set(_prefixed_sink(sink, name))
+        async with semaphore:
+            try:
+                result = await deploy_async(**target, source_dir=source_dir, force=force)
+            except Exception as e:
+                result = {"error": str(e)}
+        _report_target(result)
+        return result
+    
+    outcomes = await asyncio.gather(*(deploy_one(name, target) for name, target in named.items()))
+    return _deploy_many_result(dict(zip(named, outcomes)), allow_partial)
+
+
+def _named_targets(targets: list[dict], max_parallel: int) -> dict[str, dict]:
+    """Key each target's deploy params by a unique name."""
+    if not targets:
+        raise ValueError("No deploy targets given")
+    if max_parallel < 1:
+        raise ValueError("max_parallel must be at least 1")
+    
+    named = {}
+    for target in targets:
+        params = dict(target)
+        if "provider" not in params:
+            raise ValueError(f"Deploy target has no provider: {target}")
+        if "source_dir" in params or "force" in params:
+            raise ValueError("source_dir and force apply to all targets; set them on deploy_many")
+        
+        name = params.pop("name", None) or ":".join(
+            str(part) for part in (
+                params["provider"],
+                params.get("project_name") or params.get("domain") or params.get("target_dir"),
+            ) if part
+        )
+        unique, n = name, 1
+        while unique in named:
+            n += 1
+            unique = f"{name}#{n}"
+        named[unique] = params
+    return named
+
+
+def _prefixed_sink(sink, name: str):
+    if sink is None:
+        return None
+    return lambda stream, line: sink(stream, f"[{name}] {line}")
+
+
+def _report_target(result: dict):
+    """Stream a target's outcome through its (prefixed) output sink."""
+    sink = output_sink.get()
+    if sink is None:
+        return
+    if "error" in result:
+        sink("stderr", f"failed: {result['error']}")
+    else:
+        sink("stdout", result["message"])
+
+
+def _deploy_many_result(results: dict[str, dict], allow_partial: bool) -> dict:
+    failed = [name for name, result in results.items() if "error" in result]
+    if failed and (len(failed) == len(results) or not allow_partial):
+        errors = "; ".join(f"{name}: {results[name]['error']}" for name in failed)
+        raise RuntimeError(f"Deploy failed for {len(failed)} of {len(results)} targets: {errors}")
+    
+    return {
+        "message": f"Deployed {len(results) - len(failed)} of {len(results)} targets",
+        "results": results,
+        "failed": failed,
+    }
+
+
+@dataclass
+class _DeployPlan:
+    """What a deploy will do: the command to run and the files it changes."""
+    provider: str
+    label: str
+    args: Optional[list[str]]  # None for the local provider
+    parse: Callable
+    source: Path
+    target: str  # Identifies the deploy target in the manifest store
+    manifest: dict[str, list]
+    diff: dict[str, list[str]]
+    first: bool  # No manifest was stored for the target
+    target_dir: Optional[Path] = None
+    last_result: Optional[dict] = None  # What the last deploy to the target returned
+    skip_unchanged: bool = True  # Whether an unchanged deploy may be skipped
+    
+    @property
+    def pending(self) -> bool:
+        if self.first or not self.skip_unchanged:
+            return True
+        return any(self.diff[name] for name in ("added", "changed", "deleted"))
+    
+    def skipped(self) -> dict:
+        # Carry the last deploy's url and provider output, so $refs to them still resolve
+        return {
+            **(self.last_result or {}),
+            "message": f"{self.label} deploy skipped: no files changed since the last deploy",
+            "provider": self.provider,
+            "skipped": True,
+            **transfer_stats(self.diff, self.manifest),
+        }
+
+
+def _plan_deploy(
+    provider: str,
+    source_dir: str,
+    project_name: str,
+    config: dict,
+    force: bool,
+    skip_unchanged: bool,
+) -> _DeployPlan:
+    """Resolve the deploy command and diff the source against the last deploy."""
     source = Path(source_dir)
     if not source.exists():
         raise FileNotFoundError(f"Source directory not found: {source_dir}")
     
     provider = provider.lower()
+    label, args, parse = _deploy_command(provider, source, project_name, config)
+    manifest = build_manifest(source)
+    target_dir = None
     
+    if provider == "local":
+        target_dir = _local_target(source, config.get("target_dir"))
+        target = f"local:{target_dir}"
+    else:
+        target = f"{provider}:{project_name or config.get('domain') or source.resolve()}"
+        if config:
+            # A deploy with other options is a different target
+            options = json.dumps(config, sort_keys=True, default=str)
+            target += f"#{hashlib.sha256(options.encode()).hexdigest()[:16]}"
+    record = load_deploy(target)
+    
+    if provider == "local":
+        # Diff against what is actually in the target, which also catches
+        # changes made there since the last deploy
+        previous = build_manifest(target_dir)
+        first = False
+    else:
+        previous = record["files"] if record else None
+        first = previous is None
+    
+    diff = diff_manifests(previous or {}, manifest)
+    if force:
+        diff["changed"] = sorted(diff["changed"] + diff["unchanged"])
+        diff["unchanged"] = []
+        first = True
+    
+    last_result = record.get("result") if record else None
+    # The local target's own contents are diffed, so skipping it is always safe
+    skip_unchanged = skip_unchanged or provider == "local"
+    return _DeployPlan(
+        provider, label, args, parse, source, target, manifest, diff, first, target_dir, last_result, skip_unchanged
+    )
+
+
+def _finish_deploy(plan: _DeployPlan, result: dict) -> dict:
+    save_manifest(plan.target, plan.manifest, result)
+    return {**result, **transfer_stats(plan.diff, plan.manifest)}
+
+
+def _local_target(source: Path, target_dir: str) -> Path:
+    if not target_dir:
+        raise ValueError("The local provider requires a target_dir")
+    
+    target = Path(target_dir).resolve()
+    resolved = source.resolve()
+    if target == resolved or resolved in target.parents or target in resolved.parents:
+        raise ValueError(f"target_dir must not overlap the source directory: {target_dir}")
+    return target
+
+
+def _deploy_command(provider: str, source: Path, project_name: str, config: dict):
+    """Resolve a provider to its label, CLI arguments and output parser."""
     if provider == "vercel":
-        return _deploy_vercel(source, project_name)
+        return "Vercel", _vercel_args(source, project_name), _vercel_result
     elif provider == "netlify":
-        return _deploy_netlify(source, project_name)
+        return "Netlify", _netlify_args(source), _netlify_result
     elif provider == "surge":
-        return _deploy_surge(source, config.get("domain"))
+        return "Surge", _surge_args(source, config.get("domain")), _surge_result
     elif provider == "github-pages":
-        return _deploy_github_pages(source)
+        return "GitHub Pages", _github_pages_args(source), _github_pages_result
+    elif provider == "local":
+        return "Local", None, _local_result
     else:
-        raise ValueError(f"Unknown provider: {provider}. Supported: vercel, netlify, surge, github-pages")
+        raise ValueError(f"Unknown provider: {provider}. Supported: vercel, netlify, surge, github-pages, local")
 
 
-def _deploy_vercel(source: Path, project_name: str = None) -> dict:
-    """Deploy to Vercel."""
+def _deploy_result(label: str, parse, result: subprocess.CompletedProcess) -> dict:
+    if result.returncode != 0:
+        raise RuntimeError(f"{label} deploy failed: {result.stderr}")
+    
+    return parse(result.stdout)
+
+
+def _local_result(plan: _DeployPlan) -> dict:
+    return {
+        "message": f"Synced {plan.source} to {plan.target_dir}",
+        "path": str(plan.target_dir),
+        "provider": "local",
+    }
+
+
+def _vercel_args(source: Path, project_name: str = None) -> list[str]:
+    """CLI arguments to deploy to Vercel."""
     args = ["npx", "vercel", str(source), "--yes"]
     if project_name:
         args.extend(["--name", project_name])
-    
-    result = subprocess.run(args, capture_output=True, text=True)
-    
-    if result.returncode != 0:
-        raise RuntimeError(f"Vercel deploy failed: {result.stderr}")
-    
+    return args
+
+
+def _vercel_result(stdout: str) -> dict:
     # Extract URL from output
-    url = result.stdout.strip().split("\n")[-1]
+    url = stdout.strip().split("\n")[-1]
     
     return {
         "message": f"Deployed to Vercel",
@@ -91,51 +468,41 @@ def _deploy_vercel(source: Path, project_name: str = None) -> dict:
     }
 
 
-def _deploy_netlify(source: Path, project_name: str = None) -> dict:
-    """Deploy to Netlify."""
-    args = ["npx", "netlify-cli", "deploy", "--dir", str(source), "--prod"]
-    
-    result = subprocess.run(args, capture_output=True, text=True)
-    
-    if result.returncode != 0:
-        raise RuntimeError(f"Netlify deploy failed: {result.stderr}")
-    
+def _netlify_args(source: Path) -> list[str]:
+    """CLI arguments to deploy to Netlify."""
+    return ["npx", "netlify-cli", "deploy", "--dir", str(source), "--prod"]
+
+
+def _netlify_result(stdout: str) -> dict:
     return {
         "message": "Deployed to Netlify",
-        "output": result.stdout[:500],
+        "output": stdout[-500:],
         "provider": "netlify",
     }
 
 
-def _deploy_surge(source: Path, domain: str = None) -> dict:
-    """Deploy to Surge.sh."""
+def _surge_args(source: Path, domain: str = None) -> list[str]:
+    """CLI arguments to deploy to Surge.sh."""
     args = ["npx", "surge", str(source)]
     if domain:
         args.append(domain)
-    
-    result = subprocess.run(args, capture_output=True, text=True)
-    
-    if result.returncode != 0:
-        raise RuntimeError(f"Surge deploy failed: {result.stderr}")
-    
+    return args
+
+
+def _surge_result(stdout: str) -> dict:
     return {
         "message": "Deployed to Surge",
-        "output": result.stdout[:500],
+        "output": stdout[-500:],
         "provider": "surge",
     }
 
 
-def _deploy_github_pages(source: Path) -> dict:
-    """Deploy to GitHub Pages using gh-pages."""
-    result = subprocess.run(
-        ["npx", "gh-pages", "-d", str(source)],
-        capture_output=True,
-        text=True,
-    )
-    
-    if result.returncode != 0:
-        raise RuntimeError(f"GitHub Pages deploy failed: {result.stderr}")
-    
+def _github_pages_args(source: Path) -> list[str]:
+    """CLI arguments to deploy to GitHub Pages using gh-pages."""
+    return ["npx", "gh-pages", "-d", str(source)]
+
+
+def _github_pages_result(stdout: str) -> dict:
     return {
         "message": "Deployed to GitHub Pages",
         "provider": "github-pages",
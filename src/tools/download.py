@@ -0,0 +1,222 @@
+"""Reading HTTP response bodies with bounded memory.
+
+Bodies are read in chunks. Small ones are kept in memory; once a body passes
+the threshold (or when a destination is given) it is written to a file
+instead, and the tool reports the file rather than the body.
+
+Bodies without a destination go to ``DOWNLOAD_DIR``, which is pruned by age
+and total size as new bodies are written there (see ``prune_downloads``).
+"""
+
+import hashlib
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+import httpx
+
+from .cache import CACHE_ROOT
+
+
+# Bodies larger than this are written to disk
+STREAM_THRESHOLD = 1024 * 1024
+
+# Bytes of a streamed body returned as its preview
+PREVIEW_BYTES = 512
+
+CHUNK_SIZE = 64 * 1024
+
+# Where streamed bodies go when no destination is given
+DOWNLOAD_DIR = CACHE_ROOT / "downloads"
+
+# Retention of DOWNLOAD_DIR: files older than MAX_AGE go, then the least
+# recently written over MAX_BYTES, except those written in the last MIN_AGE
+# (a plan that just downloaded a file can still read it)
+DOWNLOAD_MAX_AGE = 24 * 60 * 60  # seconds
+DOWNLOAD_MAX_BYTES = 1024 * 1024 * 1024
+DOWNLOAD_MIN_AGE = 60 * 60  # seconds
+
+# Prune on the first spill to DOWNLOAD_DIR, then every this many spills
+PRUNE_EVERY = 25
+
+TEXT_TYPES = ("text/", "application/json", "application/xml", "application/javascript", "+json", "+xml")
+
+
+class BodyReader:
+    """
+    Consumes a response body chunk by chunk (``feed``, then ``finish``).
+
+    The body is kept in memory until it passes ``threshold`` bytes, then
+    spilled to a temporary file. It goes to a file from the start when
+    ``stream_to`` is set or the announced length is already over the threshold.
+    """
+
+    def __init__(
+        self,
+        response: httpx.Response,
+        stream_to: Optional[str] = None,
+        threshold: int = STREAM_THRESHOLD,
+        preview: int = PREVIEW_BYTES,
+    ):
+        self.response = response
+        self.destination = Path(stream_to) if stream_to else None
+        self.threshold = threshold
+        self.preview_size = preview
+        self.buffer = bytearray()
+        self.file = None
+        self.tmp_path = None
+        self.size = 0
+        self.digest = hashlib.sha256()
+        self.preview = b""
+
+        try:
+            length = int(response.headers.get("content-length", -1))
+        except ValueError:
+            length = -1
+        if self.destination is not None or length > threshold:
+            self._spill()
+
+    def _spill(self):
+        directory = self.destination.parent if self.destination else DOWNLOAD_DIR
+        directory.mkdir(parents=True, exist_ok=True)
+        if self.destination is None:
+            _count_spill()
+        fd, self.tmp_path = tempfile.mkstemp(dir=directory, prefix=".", suffix=".part")
+        self.file = os.fdopen(fd, "wb")
+        self.file.write(self.buffer)
+        self.buffer = None
+
+    def feed(self, chunk: bytes):
+        self.size += len(chunk)
+        self.digest.update(chunk)
+        if len(self.preview) < self.preview_size:
+            self.preview += chunk[:self.preview_size - len(self.preview)]
+
+        if self.file is None:
+            self.buffer += chunk
+            if len(self.buffer) > self.threshold:
+                self._spill()
+        else:
+            self.file.write(chunk)
+
+    def finish(self) -> tuple[Optional[bytes], Optional[dict]]:
+        """Return ``(body, None)`` for an in-memory body, else ``(None, file info)``."""
+        if self.file is None:
+            return bytes(self.buffer), None
+
+        self.file.close()
+        sha256 = self.digest.hexdigest()
+        path = self.destination or DOWNLOAD_DIR / f"{sha256[:16]}{_suffix(self.response.url)}"
+        os.replace(self.tmp_path, path)
+        self.tmp_path = None
+        return None, {
+            "path": str(path),
+            "size": self.size,
+            "content_type": self.response.headers.get("content-type"),
+            "sha256": sha256,
+            "preview": _preview(self.preview, self.response) if self.preview_size else None,
+        }
+
+    def abort(self):
+        """Discard a partially written file after an error."""
+        if self.file is not None:
+            self.file.close()
+        if self.tmp_path is not None:
+            try:
+                os.unlink(self.tmp_path)
+            except OSError:
+                pass
+            self.tmp_path = None
+
+
+def read_body(response: httpx.Response, **options) -> tuple[Optional[bytes], Optional[dict]]:
+    """Read a streamed response's body with a ``BodyReader``."""
+    reader = BodyReader(response, **options)
+    try:
+        for chunk in response.iter_bytes(CHUNK_SIZE):
+            reader.feed(chunk)
+        return reader.finish()
+    except BaseException:
+        reader.abort()
+        raise
+
+
+async def aread_body(response: httpx.Response, **options) -> tuple[Optional[bytes], Optional[dict]]:
+    """Async version of ``read_body``."""
+    reader = BodyReader(response, **options)
+    try:
+        async for chunk in response.aiter_bytes(CHUNK_SIZE):
+            reader.feed(chunk)
+        return reader.finish()
+    except BaseException:
+        reader.abort()
+        raise
+
+
+_spills = 0
+_spills_lock = threading.Lock()
+
+
+def _count_spill():
+    global _spills
+    with _spills_lock:
+        _spills += 1
+        prune = _spills % PRUNE_EVERY == 1
+    if prune:
+        prune_downloads()
+
+
+def prune_downloads(
+    max_age: float = DOWNLOAD_MAX_AGE,
+    max_bytes: int = DOWNLOAD_MAX_BYTES,
+    min_age: float = DOWNLOAD_MIN_AGE,
+) -> int:
+    """
+    Remove downloaded bodies (and abandoned partial files) from DOWNLOAD_DIR
+    older than ``max_age``, then the oldest over ``max_bytes`` in total,
+    sparing files younger than ``min_age``. Returns the number removed.
+    """
+    entries = []
+    try:
+        with os.scandir(DOWNLOAD_DIR) as it:
+            for entry in it:
+                try:
+                    stat = entry.stat(follow_symlinks=False)
+                except OSError:
+                    continue
+                if entry.is_file(follow_symlinks=False):
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+    except FileNotFoundError:
+        return 0
+
+    now = time.time()
+    entries.sort()
+    total_bytes = sum(size for _, size, _ in entries)
+    removed = 0
+    for mtime, size, path in entries:
+        age = now - mtime
+        if age <= max_age and (total_bytes <= max_bytes or age < min_age):
+            continue
+        try:
+            os.unlink(path)
+        except OSError:
+            continue
+        total_bytes -= size
+        removed += 1
+    return removed
+
+
+def _suffix(url: httpx.URL) -> str:
+    suffix = Path(url.path).suffix
+    return suffix if suffix.isascii() and len(suffix) <= 10 else ""
+
+
+def _preview(data: bytes, response: httpx.Response) -> Optional[str]:
+    """The start of a textual body as text; binary bodies have no preview."""
+    content_type = response.headers.get("content-type", "")
+    if not any(marker in content_type for marker in TEXT_TYPES):
+        return None
+    return data.decode(response.encoding or "utf-8", errors="ignore")
@@ -1,7 +1,36 @@
 """File operations tools."""
 
+import base64
+import codecs
+import hashlib
+import io
+import mmap
 import os
+import re
+import shutil
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from pathlib import Path
+from typing import Iterator, TextIO, Union
+
+
+# Cap on bytes returned by one read_file call, so a plan peeking at a huge
+# file does not pull all of it into memory (use offset/length to page through)
+MAX_READ_BYTES = 32 * 1024 * 1024
+
+CHUNK_SIZE = 1024 * 1024
+
+# Default number of files write_files writes concurrently
+WRITE_WORKERS = 8
+
+
+class PartialWriteError(RuntimeError):
+    """Raised when some files of a write_files call failed; ``result`` has every file's row."""
+    
+    def __init__(self, message: str, result: dict):
+        super().__init__(message)
+        self.result = result
 
 
 def write_file(path: str, content: str) -> dict:
@@ -28,63 +57,487 @@ def write_file(path: str, content: str) -> dict:
     }
 
 
-def read_file(path: str) -> dict:
+def write_files(
+    files: Union[list[dict], dict[str, str]],
+    fsync: bool = False,
+    skip_unchanged: bool = True,
+    max_workers: int = WRITE_WORKERS,
+) -> dict:
     """
-    Read content from a file.
+    Write many files in one step.
+    
+    Directories are created once up front and files are written concurrently.
+    Files whose current content already matches are left alone. With
+    ``fsync``, each file is written to a temp file, flushed to disk and
+    renamed into place, so it survives a crash either old or new.
+    
+    Args:
+        files: List of ``{"path", "content"}`` objects, or a path -> content map
+        fsync: Write durably (slower)
+        skip_unchanged: Don't rewrite files whose content hash matches
+        max_workers: Max files written concurrently
+    
+    Returns:
+        Result dict with counts and a ``[path, status, bytes]`` row per file
+    
+    Raises:
+        PartialWriteError: If any file could not be written; its ``result``
+            holds the rows of every file, failed ones with status "error"
+            and the reason as a fourth column
+    """
+    if isinstance(files, dict):
+        files = [{"path": path, "content": content} for path, content in files.items()]
+    
+    entries = []
+    seen = set()
+    for i, entry in enumerate(files):
+        if not isinstance(entry, dict) or "path" not in entry or "content" not in entry:
+            raise ValueError(f"File {i+1} must be an object with 'path' and 'content'")
+        if not isinstance(entry["path"], str) or not isinstance(entry["content"], str):
+            raise ValueError(f"File {i+1} must have a string 'path' and 'content'")
+        file_path = Path(entry["path"])
+        if file_path in seen:
+            raise ValueError(f"File {i+1} ({entry['path']}) is listed more than once")
+        seen.add(file_path)
+        entries.append((file_path, entry["content"]))
+    
+    for directory in sorted({file_path.parent for file_path, _ in entries}):
+        directory.mkdir(parents=True, exist_ok=True)
+    
+    def write(file_path: Path, content: str) -> str:
+        data = content.encode("utf-8")
+        if skip_unchanged and _same_content(file_path, data):
+            return "unchanged"
+        if fsync:
+            with atomic_open(file_path) as f:
+                f.write(content)
+        else:
+            with open(file_path, "w", encoding="utf-8") as f:
+                f.write(content)
+        return "written"
+    
+    rows = []
+    failures = []
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(entries) or 1))) as pool:
+        futures = [pool.submit(write, file_path, content) for file_path, content in entries]
+        for (file_path, content), future in zip(entries, futures):
+            row = [str(file_path), "error", len(content.encode("utf-8"))]
+            try:
+                row[1] = future.result()
+            except OSError as e:
+                failures.append(f"{file_path}: {e.strerror or e}")
+                row.append(str(e.strerror or e))
+            rows.append(row)
+    
+    written = sum(1 for row in rows if row[1] == "written")
+    unchanged = sum(1 for row in rows if row[1] == "unchanged")
+    result = {
+        "message": f"Wrote {written} file(s), {unchanged} unchanged",
+        "written": written,
+        "unchanged": unchanged,
+        "bytes": sum(row[2] for row in rows if row[1] == "written"),
+        "files": rows,
+    }
+    
+    if failures:
+        result["failed"] = len(failures)
+        raise PartialWriteError(
+            f"Failed to write {len(failures)} of {len(entries)} file(s): " + "; ".join(failures[:5]),
+            result,
+        )
+    return result
+
+
+def _same_content(file_path: Path, data: bytes) -> bool:
+    """Whether a file already holds exactly ``data`` (size check, then hash)."""
+    try:
+        if file_path.stat().st_size != len(data):
+            return False
+        digest = hashlib.sha256()
+        with open(file_path, "rb") as f:
+            for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+                digest.update(chunk)
+    except OSError:
+        return False
+    return digest.digest() == hashlib.sha256(data).digest()
+
+
+def read_file(
+    path: str,
+    offset: int = 0,
+    length: int = None,
+    head: int = None,
+    tail: int = None,
+    binary: bool = False,
+) -> dict:
+    """
+    Read content from a file, or part of it.
+    
+    At most ``length`` bytes (capped at MAX_READ_BYTES) are read from byte
+    ``offset``; ``head``/``tail`` read the first/last N lines instead. Binary
+    mode memory-maps the file and returns the range base64-encoded.
     
     Args:
         path: File path to read
+        offset: Byte offset to start reading at
+        length: Max bytes to read (default: MAX_READ_BYTES)
+        head: Read only the first N lines
+        tail: Read only the last N lines
+        binary: Return raw bytes (base64) instead of UTF-8 text
     
     Returns:
-        Result dict with content and size
+        Result dict with content, the file size and bytes read, and whether
+        the content is truncated (not the whole file)
     """
     file_path = Path(path)
     
     if not file_path.exists():
         raise FileNotFoundError(f"File not found: {path}")
+    if head is not None and tail is not None:
+        raise ValueError("Pass either head or tail, not both")
+    if offset < 0 or (length is not None and length < 0):
+        raise ValueError("offset and length must not be negative")
     
-    with open(file_path, "r", encoding="utf-8") as f:
-        content = f.read()
+    size = file_path.stat().st_size
+    limit = MAX_READ_BYTES if length is None else min(length, MAX_READ_BYTES)
     
-    return {
-        "message": f"Read {len(content)} bytes from {path}",
+    if head is not None:
+        data = _read_head(file_path, head, limit)
+        start = 0
+    elif tail is not None:
+        data = _read_tail(file_path, tail, limit)
+        start = size - len(data)
+    elif binary:
+        data = _map_range(file_path, offset, limit)
+        start = offset
+    else:
+        data = _read_range(file_path, offset, limit)
+        start = offset
+    
+    truncated = start > 0 or start + len(data) < size
+    if binary:
+        content = base64.b64encode(data).decode("ascii")
+    else:
+        content = _decode(data, skip_partial=start > 0, final=start + len(data) >= size)
+    
+    if truncated:
+        message = f"Read {len(data)} of {size} bytes from {path}"
+    else:
+        message = f"Read {size} bytes from {path}"
+    
+    result = {
+        "message": message,
         "content": content,
         "path": str(file_path.absolute()),
-        "bytes": len(content),
+        "size": size,
+        "bytes": len(data),
+        "offset": start,
+        "truncated": truncated,
     }
+    if binary:
+        result["encoding"] = "base64"
+    return result
+
+
+def iter_file(
+    path: str,
+    chunk_size: int = CHUNK_SIZE,
+    offset: int = 0,
+    length: int = None,
+    binary: bool = False,
+) -> Iterator[Union[str, bytes]]:
+    """
+    Yield a file's content chunk by chunk, for tools that process large files.
+    
+    Text chunks are decoded UTF-8 with universal newlines, like ``read_file``;
+    a character split across chunks is yielded whole. Unlike ``read_file``,
+    ``length`` is not capped.
+    """
+    remaining = length
+    decoder = None if binary else _text_decoder()
+    first = True
+    with open(path, "rb") as f:
+        f.seek(offset)
+        while remaining is None or remaining > 0:
+            chunk = f.read(chunk_size if remaining is None else min(chunk_size, remaining))
+            if not chunk:
+                break
+            if remaining is not None:
+                remaining -= len(chunk)
+            if decoder is None:
+                yield chunk
+                continue
+            if first and offset > 0:
+                chunk = _skip_continuation(chunk)
+            if remaining == 0:
+                chunk = _trim_partial(chunk)
+            first = False
+            text = decoder.decode(chunk)
+            if text:
+                yield text
+    
+    if decoder is not None:
+        text = decoder.decode(b"", final=True)
+        if text:
+            yield text
 
 
-def edit_file(path: str, search: str, replace: str) -> dict:
+def _text_decoder() -> io.IncrementalNewlineDecoder:
+    return io.IncrementalNewlineDecoder(codecs.getincrementaldecoder("utf-8")(), translate=True)
+
+
+def _skip_continuation(data: bytes) -> bytes:
+    """Drop the tail of a UTF-8 character cut at the start of a byte range."""
+    i = 0
+    while i < min(len(data), 3) and 0x80 <= data[i] < 0xC0:
+        i += 1
+    return data[i:]
+
+
+def _trim_partial(data: bytes) -> bytes:
+    """Drop the head of a UTF-8 character cut at the end of a byte range."""
+    for back in range(1, min(len(data), 4) + 1):
+        byte = data[-back]
+        if byte < 0x80:
+            return data
+        if byte >= 0xC0:
+            needed = 2 if byte < 0xE0 else 3 if byte < 0xF0 else 4
+            return data[:-back] if needed > back else data
+    return data
+
+
+def _decode(data: bytes, skip_partial: bool, final: bool) -> str:
+    """Decode a byte range, dropping characters cut at either end of it."""
+    if skip_partial:
+        data = _skip_continuation(data)
+    # At the end of the file an incomplete character is a real decoding error
+    if not final:
+        data = _trim_partial(data)
+    return _text_decoder().decode(data, final=True)
+
+
+def _read_range(path: Path, offset: int, limit: int) -> bytes:
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if offset >= size:
+            return b""
+        f.seek(offset)
+        # read(n) allocates n bytes up front; don't allocate the whole limit for a small file
+        return f.read(min(limit, size - offset))
+
+
+def _map_range(path: Path, offset: int, limit: int) -> bytes:
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        # Empty files cannot be mapped
+        if offset >= size:
+            return b""
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            return mapped[offset:offset + limit]
+
+
+def _read_head(path: Path, lines: int, limit: int) -> bytes:
+    parts = []
+    remaining = limit
+    with open(path, "rb") as f:
+        for _ in range(lines):
+            line = f.readline(remaining)
+            if not line:
+                break
+            parts.append(line)
+            remaining -= len(line)
+            if remaining <= 0:
+                break
+    return b"".join(parts)
+
+
+def _read_tail(path: Path, lines: int, limit: int) -> bytes:
+    if lines <= 0:
+        return b""
+    
+    with open(path, "rb") as f:
+        end = f.seek(0, os.SEEK_END)
+        position = end
+        data = b""
+        # Read backwards until we have one newline more than the lines wanted
+        # (a trailing newline ends the last line rather than starting a new one)
+        while position > 0 and data.count(b"\n") <= lines and len(data) < limit:
+            step = min(CHUNK_SIZE, position)
+            position -= step
+            f.seek(position)
+            data = f.read(step) + data
+    
+    data = b"".join(data.splitlines(keepends=True)[-lines:])
+    return data[-limit:] if len(data) > limit else data
+
+
+def edit_file(
+    path: str,
+    search: str = None,
+    replace: str = None,
+    edits: list[dict] = None,
+) -> dict:
     """
     Find and replace text in a file.
     
+    Either pass a single ``search``/``replace`` pair, or ``edits``: a list of
+    ``{"search", "replace", "regex"?, "optional"?}`` objects applied in order,
+    each to the output of the previous one, in a single streaming pass. Regex
+    edits are applied line by line, so a pattern cannot span lines. The new
+    content is written to a temp file that replaces the original, so a failed
+    edit leaves the file untouched.
+    
     Args:
         path: File path to edit
         search: Text to find
         replace: Text to replace with
+        edits: Batched edits (instead of search/replace)
     
     Returns:
-        Result dict with replacement count
+        Result dict with total and per-edit replacement counts
     """
     file_path = Path(path)
     
     if not file_path.exists():
         raise FileNotFoundError(f"File not found: {path}")
     
-    with open(file_path, "r", encoding="utf-8") as f:
-        content = f.read()
+    if edits is None:
+        if search is None or replace is None:
+            raise ValueError("Pass search and replace, or a list of edits")
+        edits = [{"search": search, "replace": replace}]
+    elif search is not None or replace is not None:
+        raise ValueError("Pass either search/replace or edits, not both")
     
-    count = content.count(search)
-    if count == 0:
-        raise ValueError(f"Search text not found in {path}")
+    stages = [edit_stage(i, edit) for i, edit in enumerate(edits)]
     
-    new_content = content.replace(search, replace)
+    with atomic_open(file_path) as f:
+        for chunk in iter_file(file_path):
+            for stage in stages:
+                chunk = stage.feed(chunk)
+            f.write(chunk)
+        
+        tail = ""
+        for stage in stages:
+            tail = stage.feed(tail, final=True)
+        f.write(tail)
+        
+        for stage, edit in zip(stages, edits):
+            if stage.count == 0 and not edit.get("optional"):
+                if len(edits) == 1:
+                    raise ValueError(f"Search text not found in {path}")
+                raise ValueError(f"Edit {stage.number} ({edit['search']!r}) matched nothing in {path}")
     
-    with open(file_path, "w", encoding="utf-8") as f:
-        f.write(new_content)
+    counts = [stage.count for stage in stages]
+    total = sum(counts)
+    if len(edits) == 1:
+        message = f"Replaced {total} occurrence(s) in {path}"
+    else:
+        message = f"Applied {len(edits)} edit(s), {total} replacement(s) in {path}"
     
     return {
-        "message": f"Replaced {count} occurrence(s) in {path}",
+        "message": message,
         "path": str(file_path.absolute()),
-        "replacements": count,
+        "replacements": total,
+        "counts": counts,
     }
+
+
+class _LiteralEdit:
+    """Streaming literal replace that carries a possible partial match over."""
+    
+    def __init__(self, number: int, search: str, replace: str):
+        self.number = number
+        self.search = search
+        self.replace = replace
+        self.count = 0
+        self.buffer = ""
+    
+    def feed(self, chunk: str, final: bool = False) -> str:
+        buffer = self.buffer + chunk
+        out = []
+        pos = 0
+        while True:
+            found = buffer.find(self.search, pos)
+            if found == -1:
+                break
+            out.append(buffer[pos:found])
+            out.append(self.replace)
+            self.count += 1
+            pos = found + len(self.search)
+        
+        # Anything that could still be the start of a match waits for more input
+        keep = len(buffer) if final else max(pos, len(buffer) - len(self.search) + 1)
+        out.append(buffer[pos:keep])
+        self.buffer = buffer[keep:]
+        return "".join(out)
+
+
+class _RegexEdit:
+    """Streaming regex replace applied to complete lines."""
+    
+    def __init__(self, number: int, pattern: re.Pattern, replace: str):
+        self.number = number
+        self.pattern = pattern
+        self.replace = replace
+        self.count = 0
+        self.buffer = ""
+    
+    def feed(self, chunk: str, final: bool = False) -> str:
+        buffer = self.buffer + chunk
+        end = len(buffer) if final else buffer.rfind("\n") + 1
+        self.buffer = buffer[end:]
+        
+        out = []
+        for line in buffer[:end].splitlines(keepends=True):
+            line, n = self.pattern.subn(self.replace, line)
+            self.count += n
+            out.append(line)
+        return "".join(out)
+
+
+def edit_stage(i: int, edit: dict) -> Union[_LiteralEdit, _RegexEdit]:
+    if not isinstance(edit, dict) or "search" not in edit or "replace" not in edit:
+        raise ValueError(f"Edit {i+1} must be an object with 'search' and 'replace'")
+    if not edit["search"]:
+        raise ValueError(f"Edit {i+1} has an empty search")
+    
+    if edit.get("regex"):
+        try:
+            pattern = re.compile(edit["search"])
+        except re.error as e:
+            raise ValueError(f"Edit {i+1} has an invalid regex: {e}") from None
+        return _RegexEdit(i + 1, pattern, edit["replace"])
+    return _LiteralEdit(i + 1, edit["search"], edit["replace"])
+
+
+@contextmanager
+def atomic_open(path: Path, fsync: bool = True, newline: str = None) -> Iterator[TextIO]:
+    """
+    Open a temp file next to ``path`` for writing, which replaces ``path`` if
+    the block succeeds and is discarded if it raises.
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8", newline=newline) as f:
+            yield f
+            f.flush()
+            if fsync:
+                os.fsync(f.fileno())
+        # mkstemp creates the file private; keep the original's permissions
+        if path.exists():
+            shutil.copymode(path, tmp_path)
+        else:
+            os.chmod(tmp_path, 0o666 & ~_umask())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def _umask() -> int:
+    mask = os.umask(0)
+    os.umask(mask)
+    return mask
@@ -1,24 +1,54 @@
 """Git operations tools."""
 
+import re
 import subprocess
-from pathlib import Path
+from typing import Optional
 
+from .proc import run, arun
 
-def _run_git(args: list[str], cwd: str = ".") -> str:
-    """Run a git command and return output."""
-    result = subprocess.run(
-        ["git"] + args,
-        cwd=cwd,
-        capture_output=True,
-        text=True,
-    )
-    
+
+# "[main 1a2b3c4] message" or "[main (root-commit) 1a2b3c4] message"
+COMMIT_LINE = re.compile(r"^\[.+? (?:\(root-commit\) )?([0-9a-f]{4,})\]")
+
+# Patch text returned by git_diff
+MAX_PATCH_CHARS = 20000
+
+
+def _check_git(result: subprocess.CompletedProcess) -> str:
+    """Return stripped stdout of a git command, raising on failure."""
     if result.returncode != 0:
         raise RuntimeError(f"Git error: {result.stderr.strip()}")
     
     return result.stdout.strip()
 
 
+def _run_git(args: list[str], cwd: str = ".", input: str = None, stream: bool = False) -> str:
+    """
+    Run a git command and return output.
+    
+    Only stream commands whose output is for people: a streamed command
+    returns just the tail of its output.
+    """
+    return _check_git(run(["git"] + args, cwd, input=input, stream=stream))
+
+
+async def _arun_git(args: list[str], cwd: str = ".", input: str = None, stream: bool = False) -> str:
+    """Run a git command asynchronously and return output."""
+    return _check_git(await arun(["git"] + args, cwd, input=input, stream=stream))
+
+
+def _add_args(files: Optional[list[str]]) -> tuple[list[str], Optional[str]]:
+    """Args and stdin staging files in one ``git add``."""
+    if not files:
+        return ["add", "-A"], None
+    # Paths go through stdin, NUL-separated, so any number of files (and any
+    # file names) fit in a single invocation
+    return ["add", "--pathspec-from-file=-", "--pathspec-file-nul"], "\0".join(files)
+
+
+STATUS_ARGS = ["status", "--porcelain=v2", "-z", "--branch"]
+
+
 def git_commit(message: str, files: list[str] = None, cwd: str = ".") -> dict:
     """
     Stage files and create a commit.
@@ -32,26 +62,51 @@ def git_commit(message: str, files: list[str] = None, cwd: str = ".") -> dict:
         Result dict with commit info
     """
     # Stage files
-    if files:
-        for file in files:
-            _run_git(["add", file], cwd)
-    else:
-        _run_git(["add", "-A"], cwd)
+    args, stdin = _add_args(files)
+    _run_git(args, cwd, input=stdin)
     
-    # Check if there's anything to commit
-    status = _run_git(["status", "--porcelain"], cwd)
-    if not status:
-        return {
-            "message": "Nothing to commit",
-            "committed": False,
-        }
+    # Check if there's anything staged to commit
+    status = _parse_status(_run_git(STATUS_ARGS, cwd))
+    if not status["staged"]:
+        return _nothing_to_commit()
     
     # Create commit
     output = _run_git(["commit", "-m", message], cwd)
     
-    # Get commit hash
-    commit_hash = _run_git(["rev-parse", "--short", "HEAD"], cwd)
+    # Get commit hash (from the commit summary line when possible)
+    commit_hash = _commit_hash(output) or _run_git(["rev-parse", "--short", "HEAD"], cwd)
     
+    return _committed(commit_hash)
+
+
+async def git_commit_async(message: str, files: list[str] = None, cwd: str = ".") -> dict:
+    """Async version of ``git_commit``."""
+    args, stdin = _add_args(files)
+    await _arun_git(args, cwd, input=stdin)
+    
+    status = _parse_status(await _arun_git(STATUS_ARGS, cwd))
+    if not status["staged"]:
+        return _nothing_to_commit()
+    
+    output = await _arun_git(["commit", "-m", message], cwd)
+    commit_hash = _commit_hash(output) or await _arun_git(["rev-parse", "--short", "HEAD"], cwd)
+    
+    return _committed(commit_hash)
+
+
+def _commit_hash(output: str) -> Optional[str]:
+    match = COMMIT_LINE.match(output)
+    return match.group(1) if match else None
+
+
+def _nothing_to_commit() -> dict:
+    return {
+        "message": "Nothing to commit",
+        "committed": False,
+    }
+
+
+def _committed(commit_hash: str) -> dict:
     return {
         "message": f"Created commit {commit_hash}",
         "hash": commit_hash,
@@ -76,10 +131,166 @@ def git_push(remote: str = "origin", branch: str = None, cwd: str = ".") -> dict
         branch = _run_git(["rev-parse", "--abbrev-ref", "HEAD"], cwd)
     
     # Push
-    output = _run_git(["push", remote, branch], cwd)
+    output = _run_git(["push", remote, branch], cwd, stream=True)
+    
+    return _pushed(remote, branch)
+
+
+async def git_push_async(remote: str = "origin", branch: str = None, cwd: str = ".") -> dict:
+    """Async version of ``git_push``."""
+    if not branch:
+        branch = await _arun_git(["rev-parse", "--abbrev-ref", "HEAD"], cwd)
     
+    await _arun_git(["push", remote, branch], cwd, stream=True)
+    
+    return _pushed(remote, branch)
+
+
+def _pushed(remote: str, branch: str) -> dict:
     return {
         "message": f"Pushed to {remote}/{branch}",
         "remote": remote,
         "branch": branch,
     }
+
+
+def git_status(cwd: str = ".") -> dict:
+    """
+    Get the working tree status.
+    
+    Args:
+        cwd: Working directory
+    
+    Returns:
+        Result dict with branch info and staged, unstaged, untracked and
+        conflicted paths
+    """
+    status = _parse_status(_run_git(STATUS_ARGS, cwd))
+    
+    changes = len(status["staged"]) + len(status["unstaged"]) + len(status["untracked"])
+    if status["clean"]:
+        message = f"Working tree clean on {status['branch']}"
+    else:
+        message = f"{changes} change(s) on {status['branch']}"
+    
+    return {"message": message, **status}
+
+
+def _parse_status(output: str) -> dict:
+    """Parse ``git status --porcelain=v2 -z --branch`` output."""
+    status = {
+        "branch": None,
+        "commit": None,
+        "upstream": None,
+        "ahead": 0,
+        "behind": 0,
+        "staged": [],
+        "unstaged": [],
+        "untracked": [],
+        "conflicted": [],
+    }
+    
+    fields = iter(output.split("\0"))
+    for entry in fields:
+        if not entry:
+            continue
+        kind = entry[0]
+        
+        if kind == "#":
+            _, key, *value = entry.split(" ")
+            if key == "branch.head":
+                status["branch"] = value[0]
+            elif key == "branch.oid":
+                status["commit"] = None if value[0] == "(initial)" else value[0]
+            elif key == "branch.upstream":
+                status["upstream"] = value[0]
+            elif key == "branch.ab":
+                status["ahead"] = int(value[0])
+                status["behind"] = -int(value[1])
+        elif kind in "12":
+            # "1 XY sub mH mI mW hH hI path", renames add a score field and
+            # are followed by the original path as a separate field
+            parts = entry.split(" ", 9 if kind == "2" else 8)
+            xy, path = parts[1], parts[-1]
+            change = {"path": path}
+            if kind == "2":
+                change["from"] = next(fields)
+            if xy[0] != ".":
+                status["staged"].append({**change, "status": xy[0]})
+            if xy[1] != ".":
+                status["unstaged"].append({**change, "status": xy[1]})
+        elif kind == "u":
+            status["conflicted"].append({"path": entry.split(" ", 10)[-1], "status": entry[2:4]})
+        elif kind == "?":
+            status["untracked"].append(entry[2:])
+    
+    status["clean"] = not (
+        status["staged"] or status["unstaged"] or status["untracked"] or status["conflicted"]
+    )
+    return status
+
+
+def git_diff(
+    cwd: str = ".",
+    staged: bool = False,
+    ref: str = None,
+    paths: list[str] = None,
+    patch: bool = True,
+) -> dict:
+    """
+    Get a diff as per-file line counts, optionally with the patch text.
+    
+    Args:
+        cwd: Working directory
+        staged: Diff the index instead of the working tree
+        ref: Commit to diff against (default: index, or HEAD when staged)
+        paths: Limit the diff to these paths
+        patch: Include the (truncated) patch text
+    
+    Returns:
+        Result dict with added/deleted line counts per file
+    """
+    args = ["diff"]
+    if staged:
+        args.append("--cached")
+    if ref:
+        args.append(ref)
+    pathspec = ["--"] + paths if paths else []
+    
+    files = _parse_numstat(_run_git(args + ["--numstat", "-z"] + pathspec, cwd))
+    
+    result = {
+        "message": f"{len(files)} file(s) changed",
+        "files": files,
+        "added": sum(f["added"] or 0 for f in files),
+        "deleted": sum(f["deleted"] or 0 for f in files),
+    }
+    if patch:
+        text = _run_git(args + pathspec, cwd)
+        result["patch"] = text[:MAX_PATCH_CHARS]
+        result["truncated"] = len(text) > MAX_PATCH_CHARS
+    return result
+
+
+def _parse_numstat(output: str) -> list[dict]:
+    """Parse ``git diff --numstat -z`` output."""
+    files = []
+    fields = iter(output.split("\0"))
+    for entry in fields:
+        if not entry:
+            continue
+        added, deleted, path = entry.split("\t", 2)
+        change = {}
+        if not path:
+            # Renames: the old and new paths follow as separate fields
+            change["from"] = next(fields)
+            path = next(fields)
+        binary = added == "-"
+        files.append({
+            "path": path,
+            **change,
+            "added": None if binary else int(added),
+            "deleted": None if binary else int(deleted),
+            "binary": binary,
+        })
+    return files
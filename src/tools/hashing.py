@@ -0,0 +1,139 @@
+"""Fast content hashing of file trees.
+
+Hashes are remembered per file along with its size, mtime and inode, so a
+file that has not changed since it was last hashed is not read again. The
+remaining files are hashed in parallel (hashlib releases the GIL).
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from pathlib import Path
+from typing import Iterable
+
+from .cache import CACHE_ROOT
+from .workspace import ALWAYS_IGNORED
+
+
+HASH_WORKERS = 8
+
+CHUNK_SIZE = 1024 * 1024
+
+# Files modified this recently are not remembered: another write within the
+# same mtime tick could change them without changing their stat
+RACY_SECONDS = 2
+
+
+def expand_paths(paths: Iterable[str], root: str = ".") -> list[Path]:
+    """Resolve files and directories (walked recursively) to a sorted file list."""
+    root_path = Path(root)
+    files = set()
+    for value in paths:
+        path = root_path / value
+        if path.is_file():
+            files.add(path)
+        elif path.is_dir():
+            for dirpath, dirnames, filenames in os.walk(path):
+                dirnames[:] = [d for d in dirnames if d not in ALWAYS_IGNORED]
+                files.update(Path(dirpath) / name for name in filenames)
+        else:
+            raise FileNotFoundError(f"Input not found: {value}")
+    return sorted(files)
+
+
+def tree_digest(hashes: dict[str, str]) -> str:
+    """Single digest of a ``{relative path: sha256}`` map."""
+    digest = hashlib.sha256()
+    for rel in sorted(hashes):
+        digest.update(f"{rel}\0{hashes[rel]}\n".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def sha256_file(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class FileHasher:
+    """SHA-256 of files, re-reading only those whose stat changed."""
+
+    def __init__(self, state_path: Path = CACHE_ROOT / "hashes.json", workers: int = HASH_WORKERS):
+        self.state_path = Path(state_path)
+        self.workers = workers
+        self._lock = threading.Lock()
+        self._dirty = False
+        try:
+            with open(self.state_path, "r", encoding="utf-8") as f:
+                self._state = json.load(f)
+        except (OSError, ValueError):
+            self._state = {}
+
+    def hash_files(self, files: list[Path], root: str = ".") -> dict[str, str]:
+        """Map each file's path relative to ``root`` to its SHA-256."""
+        root_path = Path(root).resolve()
+        hashes = {}
+        stale = []
+        for path in files:
+            resolved = path.resolve()
+            stat = resolved.stat()
+            signature = [stat.st_size, stat.st_mtime_ns, stat.st_ino]
+            try:
+                rel = resolved.relative_to(root_path).as_posix()
+            except ValueError:
+                rel = resolved.as_posix()
+            with self._lock:
+                known = self._state.get(str(resolved))
+            if known and known[:3] == signature:
+                hashes[rel] = known[3]
+            else:
+                stale.append((rel, resolved, signature))
+
+        if stale:
+            racy = time.time_ns() - RACY_SECONDS * 1_000_000_000
+            with ThreadPoolExecutor(max_workers=self.workers) as pool:
+                digests = pool.map(lambda entry: sha256_file(entry[1]), stale)
+                for (rel, resolved, signature), sha in zip(stale, digests):
+                    hashes[rel] = sha
+                    if signature[1] > racy:
+                        continue
+                    with self._lock:
+                        self._state[str(resolved)] = signature + [sha]
+                        self._dirty = True
+            self.save()
+        return hashes
+
+    def save(self):
+        """Persist remembered hashes (atomically) if any changed."""
+        with self._lock:
+            if not self._dirty:
+                return
+            # Forget files that no longer exist
+            self._state = {path: entry for path, entry in self._state.items() if os.path.exists(path)}
+            data = json.dumps(self._state, separators=(",", ":"))
+            self._dirty = False
+
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.state_path.parent, prefix=".", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(data)
+            os.replace(tmp_path, self.state_path)
+        except OSError:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+
+
+@lru_cache(maxsize=1)
+def default_hasher() -> FileHasher:
+    """The process-wide hasher, shared by the tools that hash trees."""
+    return FileHasher()
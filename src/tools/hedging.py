@@ -0,0 +1,188 @@
+"""Hedged requests: cutting tail latency on idempotent calls.
+
+If a request has not completed within a delay (by default a high percentile
+of the host's recent latencies), a second identical request is sent and
+whichever finishes first is used. Latencies are kept per host in
+log-bucketed histograms that decay, so the delay follows the host's
+current behaviour.
+"""
+
+import asyncio
+import threading
+import time
+from bisect import bisect_left
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Awaitable, Callable, Optional
+
+
+# Histogram buckets: upper bounds from 1 ms growing by 25% (to about 60 s)
+BUCKET_BOUNDS = [0.001 * 1.25 ** i for i in range(50)]
+
+# Counts are halved once a histogram holds this many samples
+MAX_SAMPLES = 1000
+
+# Samples needed before the percentile is trusted over the default delay
+MIN_SAMPLES = 20
+
+DEFAULT_PERCENTILE = 95
+DEFAULT_DELAY = 1.0  # seconds
+MIN_DELAY = 0.01
+
+HEDGE_WORKERS = 16
+
+
+class LatencyHistogram:
+    """Decaying histogram of request latencies in seconds."""
+
+    def __init__(self):
+        self.counts = [0.0] * (len(BUCKET_BOUNDS) + 1)
+        self.total = 0.0
+
+    def record(self, seconds: float):
+        self.counts[bisect_left(BUCKET_BOUNDS, seconds)] += 1
+        self.total += 1
+        if self.total >= MAX_SAMPLES:
+            self.counts = [count / 2 for count in self.counts]
+            self.total /= 2
+
+    def percentile(self, percent: float) -> Optional[float]:
+        """Upper bound of the bucket holding the percentile, or None with too few samples."""
+        if self.total < MIN_SAMPLES:
+            return None
+        target = self.total * percent / 100
+        cumulative = 0.0
+        for i, count in enumerate(self.counts):
+            cumulative += count
+            if cumulative >= target:
+                break
+        return BUCKET_BOUNDS[min(i, len(BUCKET_BOUNDS) - 1)]
+
+
+class Hedger:
+    """Per-host latency histograms and hedge counters, with sync and async runners."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms: dict[str, LatencyHistogram] = {}
+        self._stats: dict[str, dict[str, int]] = {}
+        self._pool = None
+
+    def delay(self, host: str, percentile: float = DEFAULT_PERCENTILE) -> float:
+        """Seconds to wait before hedging a request to a host."""
+        with self._lock:
+            histogram = self._histograms.get(host)
+            value = histogram.percentile(percentile) if histogram else None
+        return max(MIN_DELAY, DEFAULT_DELAY if value is None else value)
+
+    def record(self, host: str, seconds: float):
+        with self._lock:
+            self._histograms.setdefault(host, LatencyHistogram()).record(seconds)
+
+    def _count(self, host: str, fired: bool, hedge_won: bool) -> dict[str, Any]:
+        with self._lock:
+            stats = self._stats.setdefault(host, {"requests": 0, "hedged": 0, "hedge_wins": 0})
+            stats["requests"] += 1
+            stats["hedged"] += fired
+            stats["hedge_wins"] += hedge_won
+            return dict(stats)
+
+    def _report(self, host: str, delay: float, fired: bool, hedge_won: bool) -> dict[str, Any]:
+        stats = self._count(host, fired, hedge_won)
+        return {
+            "delay_s": round(delay, 3),
+            "fired": fired,
+            "winner": "hedge" if hedge_won else "primary",
+            "host_rate": round(stats["hedged"] / stats["requests"], 3),
+            "host_requests": stats["requests"],
+        }
+
+    def timed(self, host: str, attempt: Callable[[], dict]) -> Callable[[], dict]:
+        """Wrap an attempt to record its latency (cache hits excepted)."""
+        def run() -> dict:
+            started = time.perf_counter()
+            result = attempt()
+            if result.get("cache") != "hit":
+                self.record(host, time.perf_counter() - started)
+            return result
+        return run
+
+    def atimed(self, host: str, attempt: Callable[[], Awaitable[dict]]) -> Callable[[], Awaitable[dict]]:
+        """Async version of ``timed``."""
+        async def run() -> dict:
+            started = time.perf_counter()
+            result = await attempt()
+            if result.get("cache") != "hit":
+                self.record(host, time.perf_counter() - started)
+            return result
+        return run
+
+    def run(self, host: str, attempt: Callable[[], dict], delay: float) -> tuple[dict, dict]:
+        """
+        Run ``attempt``, starting a second one if the first has not finished
+        after ``delay`` seconds. Returns the first successful result and a
+        hedge report.
+
+        A sync request cannot be interrupted, so the slower attempt runs to
+        completion in the background and its result is dropped.
+        """
+        attempt = self.timed(host, attempt)
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=HEDGE_WORKERS, thread_name_prefix="hedge")
+            pool = self._pool
+
+        primary = pool.submit(attempt)
+        done, _ = wait([primary], timeout=delay)
+        if done:
+            return primary.result(), self._report(host, delay, False, False)
+
+        hedge = pool.submit(attempt)
+        winner = _first_success([primary, hedge])
+        return winner.result(), self._report(host, delay, True, winner is hedge)
+
+    async def arun(self, host: str, attempt: Callable[[], Awaitable[dict]], delay: float) -> tuple[dict, dict]:
+        """Async version of ``run``; the slower attempt is cancelled."""
+        attempt = self.atimed(host, attempt)
+        primary = asyncio.ensure_future(attempt())
+        hedge = None
+        try:
+            done, _ = await asyncio.wait([primary], timeout=delay)
+            if done:
+                return primary.result(), self._report(host, delay, False, False)
+
+            hedge = asyncio.ensure_future(attempt())
+            winner = await _afirst_success([primary, hedge])
+            return winner.result(), self._report(host, delay, True, winner is hedge)
+        finally:
+            for task in (primary, hedge):
+                if task is not None:
+                    task.cancel()
+
+
+def _first_success(futures: list):
+    """The first future to succeed, or the first one to fail if all do."""
+    pending = set(futures)
+    failed = None
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in sorted(done, key=futures.index):
+            if future.exception() is None:
+                return future
+            failed = failed or future
+    return failed
+
+
+async def _afirst_success(tasks: list):
+    pending = set(tasks)
+    failed = None
+    while pending:
+        done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        for task in sorted(done, key=tasks.index):
+            if task.exception() is None:
+                return task
+            failed = failed or task
+    return failed
+
+
+# Shared by the API tools
+HEDGER = Hedger()
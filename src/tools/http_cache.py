@@ -0,0 +1,274 @@
+"""On-disk HTTP cache for GET requests made by the API tools.
+
+Responses are stored with their validators (``ETag``/``Last-Modified``) and
+freshness lifetime (``Cache-Control: max-age`` or ``Expires``). A fresh entry
+is served without a request; a stale one is revalidated with
+``If-None-Match``/``If-Modified-Since`` and served again on a 304.
+"""
+
+import asyncio
+import base64
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from pathlib import Path
+from typing import Any, Optional
+
+import httpx
+
+from .cache import CACHE_ROOT
+
+
+DEFAULT_MAX_ENTRIES = 500
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+# Larger bodies are not stored
+MAX_ENTRY_BYTES = 8 * 1024 * 1024
+
+# Run eviction after this many writes rather than on every one
+EVICT_EVERY = 25
+
+# Only complete, successful responses are stored
+CACHEABLE_STATUSES = (200, 203)
+
+# Describe the stored body as sent, not as it is stored (decoded)
+DROPPED_HEADERS = ("content-encoding", "content-length", "transfer-encoding", "connection")
+
+
+def _directives(header: Optional[str]) -> dict[str, Optional[str]]:
+    """Parse a Cache-Control header into ``{directive: value or None}``."""
+    directives = {}
+    for part in (header or "").split(","):
+        name, _, value = part.strip().partition("=")
+        if name:
+            directives[name.lower()] = value.strip('"') or None
+    return directives
+
+
+def _lifetime(headers: httpx.Headers, now: float) -> float:
+    """Seconds a response stays fresh, from max-age (minus Age) or Expires."""
+    directives = _directives(headers.get("cache-control"))
+    if "no-cache" in directives:
+        return 0.0
+    if directives.get("max-age") is not None:
+        try:
+            age = float(headers.get("age", 0))
+        except ValueError:
+            age = 0.0
+        try:
+            return max(0.0, float(directives["max-age"]) - age)
+        except ValueError:
+            return 0.0
+    if headers.get("expires"):
+        try:
+            return max(0.0, parsedate_to_datetime(headers["expires"]).timestamp() - now)
+        except (TypeError, ValueError):
+            return 0.0
+    return 0.0
+
+
+class HttpCache:
+    """
+    On-disk cache of GET responses, keyed by URL and request headers.
+
+    Beyond ``max_entries`` or ``max_bytes``, the least recently used entries
+    are evicted.
+    """
+
+    def __init__(
+        self,
+        cache_dir: Path = CACHE_ROOT / "http",
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+    ):
+        self.cache_dir = Path(cache_dir)
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._writes = 0
+        self._lock = threading.Lock()
+
+    def key(self, method: str, url: str, headers: Optional[dict]) -> Optional[str]:
+        """Cache key of a request, or None if it must not use the cache."""
+        if method.upper() != "GET":
+            return None
+        headers = {name.lower(): str(value) for name, value in (headers or {}).items()}
+        if "no-store" in _directives(headers.get("cache-control")):
+            return None
+        payload = json.dumps({"url": str(url), "headers": headers}, sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[dict[str, Any]]:
+        """Return a stored entry, or None on a miss."""
+        path = self.cache_dir / f"{key}.json"
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+            # mtime doubles as the last-used time for LRU eviction
+            os.utime(path)
+        except (OSError, ValueError):
+            return None
+        return entry
+
+    @staticmethod
+    def is_fresh(entry: dict, request_headers: Optional[dict] = None) -> bool:
+        """Whether an entry can be served without revalidating it."""
+        requested = {name.lower(): value for name, value in (request_headers or {}).items()}
+        if "no-cache" in _directives(requested.get("cache-control")):
+            return False
+        return time.time() < entry["expires"]
+
+    @staticmethod
+    def conditional_headers(entry: Optional[dict], headers: Optional[dict]) -> dict:
+        """Request headers plus the validators of a stale entry."""
+        headers = dict(headers or {})
+        if entry is not None:
+            stored = httpx.Headers(entry["headers"])
+            if "etag" in stored:
+                headers["If-None-Match"] = stored["etag"]
+            if "last-modified" in stored:
+                headers["If-Modified-Since"] = stored["last-modified"]
+        return headers
+
+    @staticmethod
+    def response(entry: dict, request: httpx.Request) -> httpx.Response:
+        """Rebuild a stored response."""
+        return httpx.Response(
+            entry["status"],
+            headers=entry["headers"],
+            content=base64.b64decode(entry["body"]),
+            request=request,
+        )
+
+    def revalidate(self, key: str, entry: dict, response: httpx.Response) -> httpx.Response:
+        """Refresh an entry a 304 confirmed, and return the stored response."""
+        # The 304's headers update the stored ones, including freshness
+        headers = httpx.Headers(entry["headers"])
+        headers.update({
+            name: value for name, value in response.headers.items()
+            if name.lower() not in DROPPED_HEADERS
+        })
+        entry = {**entry, "headers": dict(headers.items())}
+        entry["expires"] = time.time() + _lifetime(headers, time.time())
+        self._write(key, entry)
+        return self.response(entry, response.request)
+
+    def put(self, key: str, response: httpx.Response, content: bytes):
+        """Store a response if it is cacheable and can be reused or revalidated."""
+        directives = _directives(response.headers.get("cache-control"))
+        if response.status_code not in CACHEABLE_STATUSES or "no-store" in directives:
+            return
+        if len(content) > MAX_ENTRY_BYTES:
+            return
+
+        now = time.time()
+        lifetime = _lifetime(response.headers, now)
+        validated = "etag" in response.headers or "last-modified" in response.headers
+        if lifetime <= 0 and not validated:
+            return
+
+        self._write(key, {
+            "url": str(response.request.url),
+            "status": response.status_code,
+            "headers": {
+                name: value for name, value in response.headers.items()
+                if name.lower() not in DROPPED_HEADERS
+            },
+            "body": base64.b64encode(content).decode("ascii"),
+            "stored": now,
+            "expires": now + lifetime,
+        })
+
+    def _write(self, key: str, entry: dict):
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, prefix=".", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(entry, f)
+            os.replace(tmp_path, self.cache_dir / f"{key}.json")
+        except OSError:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            return
+
+        with self._lock:
+            self._writes += 1
+            evict = self._writes % EVICT_EVERY == 1
+        if evict:
+            self.evict()
+
+    def evict(self):
+        """Remove least recently used entries over the limits."""
+        entries = []
+        try:
+            with os.scandir(self.cache_dir) as it:
+                for entry in it:
+                    if not entry.name.endswith(".json"):
+                        continue
+                    try:
+                        stat = entry.stat()
+                    except OSError:
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+        except FileNotFoundError:
+            return
+
+        entries.sort()
+        total_bytes = sum(size for _, size, _ in entries)
+        while entries and (len(entries) > self.max_entries or total_bytes > self.max_bytes):
+            _, size, path = entries.pop(0)
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+            total_bytes -= size
+
+
+# Shared by the API tools
+HTTP_CACHE = HttpCache()
+
+
+def send(client: httpx.Client, method: str, url: str, key: Optional[str], **kwargs) -> tuple[httpx.Response, Optional[str]]:
+    """
+    Send a request through the cache (``key`` from ``HTTP_CACHE.key``, None
+    to bypass it).
+
+    The response is returned unread (the caller reads and closes it), with
+    "hit", "revalidated", "miss" or None when the cache was bypassed. The
+    caller stores a miss with ``HTTP_CACHE.put`` once it has the body.
+    """
+    if key is None:
+        return client.send(client.build_request(method, url, **kwargs), stream=True), None
+
+    entry = HTTP_CACHE.get(key)
+    if entry is not None and HTTP_CACHE.is_fresh(entry, kwargs.get("headers")):
+        return HTTP_CACHE.response(entry, client.build_request(method, url)), "hit"
+
+    kwargs["headers"] = HTTP_CACHE.conditional_headers(entry, kwargs.get("headers"))
+    response = client.send(client.build_request(method, url, **kwargs), stream=True)
+    if response.status_code == 304 and entry is not None:
+        response.close()
+        return HTTP_CACHE.revalidate(key, entry, response), "revalidated"
+    return response, "miss"
+
+
+async def asend(client: httpx.AsyncClient, method: str, url: str, key: Optional[str], **kwargs) -> tuple[httpx.Response, Optional[str]]:
+    """Async version of ``send``; cache files are read and written on a thread."""
+    if key is None:
+        return await client.send(client.build_request(method, url, **kwargs), stream=True), None
+
+    entry = await asyncio.to_thread(HTTP_CACHE.get, key)
+    if entry is not None and HTTP_CACHE.is_fresh(entry, kwargs.get("headers")):
+        return HTTP_CACHE.response(entry, client.build_request(method, url)), "hit"
+
+    kwargs["headers"] = HTTP_CACHE.conditional_headers(entry, kwargs.get("headers"))
+    response = await client.send(client.build_request(method, url, **kwargs), stream=True)
+    if response.status_code == 304 and entry is not None:
+        await response.aclose()
+        return await asyncio.to_thread(HTTP_CACHE.revalidate, key, entry, response), "revalidated"
+    return response, "miss"
@@ -0,0 +1,167 @@
+"""Shared, pooled HTTP clients for the API tools.
+
+One ``httpx.Client`` is shared by all threads, and one ``httpx.AsyncClient``
+by all tasks of each event loop, so consecutive requests to a host reuse
+its keep-alive connections (and HTTP/2 when the ``h2`` package is
+installed) instead of paying for DNS, TCP and TLS setup on every call.
+
+Plans hold a ``plan_scope()`` while they run; the clients are closed when
+the last plan using them ends.
+"""
+
+import asyncio
+import atexit
+import importlib.util
+import os
+import threading
+import weakref
+from dataclasses import dataclass, replace
+from typing import Optional
+
+import httpx
+
+
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+
+def _env_number(name: str, default: float) -> float:
+    try:
+        return float(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+
+@dataclass(frozen=True)
+class HttpConfig:
+    """Pool limits and timeouts of the shared clients (seconds for times)."""
+    max_connections: int = int(_env_number("OPTIMUS_HTTP_MAX_CONNECTIONS", 100))
+    max_keepalive: int = int(_env_number("OPTIMUS_HTTP_MAX_KEEPALIVE", 20))
+    keepalive_expiry: float = _env_number("OPTIMUS_HTTP_KEEPALIVE_EXPIRY", 30.0)
+    timeout: float = _env_number("OPTIMUS_HTTP_TIMEOUT", 10.0)
+    connect_timeout: float = _env_number("OPTIMUS_HTTP_CONNECT_TIMEOUT", 5.0)
+    http2: bool = os.environ.get("OPTIMUS_HTTP2", "1") != "0"
+
+    def client_options(self) -> dict:
+        return {
+            "limits": httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_keepalive,
+                keepalive_expiry=self.keepalive_expiry,
+            ),
+            "timeout": httpx.Timeout(self.timeout, connect=self.connect_timeout),
+            "http2": self.http2 and HTTP2_AVAILABLE,
+            "follow_redirects": True,
+        }
+
+
+_config = HttpConfig()
+_lock = threading.Lock()
+_client: Optional[httpx.Client] = None
+_scopes = 0
+
+# Async clients are bound to the loop they were created on
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, tuple[HttpConfig, httpx.AsyncClient]]" = (
+    weakref.WeakKeyDictionary()
+)
+_async_scopes: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, int]" = weakref.WeakKeyDictionary()
+
+
+def get_config() -> HttpConfig:
+    return _config
+
+
+def configure(**changes) -> HttpConfig:
+    """
+    Change pool limits or timeouts (see ``HttpConfig``).
+
+    The sync client is closed and clients are rebuilt on their next use.
+    """
+    global _config, _client
+    with _lock:
+        _config = replace(_config, **changes)
+        client, _client = _client, None
+    if client is not None:
+        client.close()
+    return _config
+
+
+def get_client() -> httpx.Client:
+    """The shared sync client, created on first use."""
+    global _client
+    with _lock:
+        if _client is None:
+            _client = httpx.Client(**_config.client_options())
+        return _client
+
+
+def get_async_client() -> httpx.AsyncClient:
+    """The shared async client of the running event loop."""
+    loop = asyncio.get_running_loop()
+    with _lock:
+        config, client = _async_clients.get(loop, (None, None))
+        if client is not None and config == _config:
+            return client
+        stale = client
+        client = httpx.AsyncClient(**_config.client_options())
+        _async_clients[loop] = (_config, client)
+    if stale is not None:
+        loop.create_task(stale.aclose())
+    return client
+
+
+class _PlanScope:
+    """Keeps the shared clients open; the last scope to exit closes them."""
+
+    def __enter__(self):
+        global _scopes
+        with _lock:
+            _scopes += 1
+        return self
+
+    def __exit__(self, *exc_info):
+        global _scopes, _client
+        with _lock:
+            _scopes -= 1
+            client = None
+            if _scopes == 0:
+                client, _client = _client, None
+        if client is not None:
+            client.close()
+
+    async def __aenter__(self):
+        loop = asyncio.get_running_loop()
+        with _lock:
+            _async_scopes[loop] = _async_scopes.get(loop, 0) + 1
+        return self.__enter__()
+
+    async def __aexit__(self, *exc_info):
+        loop = asyncio.get_running_loop()
+        with _lock:
+            _async_scopes[loop] -= 1
+            client = None
+            if _async_scopes[loop] == 0:
+                del _async_scopes[loop]
+                client = _async_clients.pop(loop, (None, None))[1]
+        try:
+            if client is not None:
+                await client.aclose()
+        finally:
+            self.__exit__(*exc_info)
+
+
+def plan_scope() -> _PlanScope:
+    """
+    Context manager held while a plan runs (``with`` or ``async with``).
+
+    Scopes are counted, so concurrent plans share the clients and they are
+    closed once, when the last one ends.
+    """
+    return _PlanScope()
+
+
+@atexit.register
+def _close_client():
+    with _lock:
+        client = _client
+    if client is not None:
+        client.close()
@@ -0,0 +1,144 @@
+"""Deploy manifests: per-file content hashes of what was last deployed.
+
+Comparing a build's manifest with the one stored for a target gives the
+files added, changed and deleted since the last deploy there, so unchanged
+sites can skip the deploy entirely and the ``local`` provider only copies
+what changed.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+from pathlib import Path
+from typing import Optional
+
+from .cache import CACHE_ROOT
+from .hashing import default_hasher, expand_paths
+
+
+MANIFEST_DIR = CACHE_ROOT / "deploys"
+
+# Paths listed per kind of change in a deploy result
+MAX_LISTED = 50
+
+
+def build_manifest(directory: Path) -> dict[str, list]:
+    """Map each file under a directory to ``[sha256, size]`` (hashed in parallel)."""
+    if not directory.is_dir():
+        return {}
+    files = expand_paths(["."], directory)
+    # The hasher keys files by resolved path; hashing relative to / keeps
+    # symlinked files apart from their targets so they can be mapped back
+    hashes = default_hasher().hash_files(files, "/")
+    manifest = {}
+    for path in files:
+        resolved = path.resolve()
+        manifest[path.relative_to(directory).as_posix()] = [
+            hashes[resolved.relative_to("/").as_posix()],
+            resolved.stat().st_size,
+        ]
+    return manifest
+
+
+def diff_manifests(old: dict[str, list], new: dict[str, list]) -> dict[str, list[str]]:
+    """Files added, changed, deleted and unchanged going from ``old`` to ``new``."""
+    return {
+        "added": sorted(rel for rel in new if rel not in old),
+        "changed": sorted(rel for rel in new if rel in old and old[rel][0] != new[rel][0]),
+        "deleted": sorted(rel for rel in old if rel not in new),
+        "unchanged": sorted(rel for rel in new if rel in old and old[rel][0] == new[rel][0]),
+    }
+
+
+def transfer_stats(diff: dict[str, list[str]], new: dict[str, list]) -> dict:
+    """Summarize a diff as counts and bytes transferred versus skipped."""
+    sent = diff["added"] + diff["changed"]
+    return {
+        "files": {name: len(paths) for name, paths in diff.items()},
+        "changes": {
+            name: diff[name][:MAX_LISTED] for name in ("added", "changed", "deleted") if diff[name]
+        },
+        "files_transferred": len(sent),
+        "files_skipped": len(diff["unchanged"]),
+        "bytes_transferred": sum(new[rel][1] for rel in sent),
+        "bytes_skipped": sum(new[rel][1] for rel in diff["unchanged"]),
+    }
+
+
+def _manifest_path(target: str) -> Path:
+    key = hashlib.sha256(target.encode("utf-8")).hexdigest()[:32]
+    return MANIFEST_DIR / f"{key}.json"
+
+
+def load_deploy(target: str) -> Optional[dict]:
+    """
+    The record stored by the last deploy to a target, or None: ``target``,
+    ``deployed`` (a timestamp), ``files`` (its manifest) and ``result`` (what
+    the deploy returned).
+    """
+    try:
+        with open(_manifest_path(target), "r", encoding="utf-8") as f:
+            record = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return record if isinstance(record, dict) and "files" in record else None
+
+
+def load_manifest(target: str) -> Optional[dict[str, list]]:
+    """The manifest stored by the last deploy to a target, or None."""
+    record = load_deploy(target)
+    return record["files"] if record is not None else None
+
+
+def save_manifest(target: str, manifest: dict[str, list], result: Optional[dict] = None):
+    """Store a target's manifest, and the deploy's result, after a successful deploy."""
+    MANIFEST_DIR.mkdir(parents=True, exist_ok=True)
+    record = {"target": target, "deployed": time.time(), "files": manifest, "result": result}
+    fd, tmp_path = tempfile.mkstemp(dir=MANIFEST_DIR, prefix=".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(record, f, default=str)
+        os.replace(tmp_path, _manifest_path(target))
+    except OSError:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def sync_directory(source: Path, target: Path, diff: dict[str, list[str]]):
+    """Apply a diff to ``target``: copy added/changed files, remove deleted ones."""
+    for rel in diff["added"] + diff["changed"]:
+        destination = target / rel
+        destination.parent.mkdir(parents=True, exist_ok=True)
+        # Copy next to the destination and rename, so readers never see half a file
+        fd, tmp_path = tempfile.mkstemp(dir=destination.parent, prefix=".", suffix=".tmp")
+        os.close(fd)
+        try:
+            shutil.copy2(source / rel, tmp_path)
+            os.replace(tmp_path, destination)
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
+
+    for rel in diff["deleted"]:
+        path = target / rel
+        try:
+            path.unlink()
+        except FileNotFoundError:
+            pass
+        # Remove directories the deletion left empty
+        for parent in path.parents:
+            if parent == target or not parent.is_relative_to(target):
+                break
+            try:
+                parent.rmdir()
+            except OSError:
+                break
@@ -0,0 +1,173 @@
+"""Subprocess helpers shared by the sync and async tool implementations."""
+
+import asyncio
+import subprocess
+import threading
+from collections import deque
+from contextvars import ContextVar
+from typing import Callable, Optional, Union
+
+
+# Receives (stream name, line) for every output line of a streamed command.
+# Whoever runs a tool sets it for the duration of the call (the CLI prints
+# lines to the console, the web server forwards them over the WebSocket).
+output_sink: ContextVar[Optional[Callable[[str, str], None]]] = ContextVar("output_sink", default=None)
+
+# Lines of each stream kept from a streamed command
+TAIL_LINES = 200
+
+# Longer lines are split (sync) or cut (async)
+MAX_LINE_BYTES = 64 * 1024
+
+
+def run(
+    args: Union[list[str], str],
+    cwd: str = ".",
+    shell: bool = False,
+    input: Optional[str] = None,
+    stream: bool = False,
+) -> subprocess.CompletedProcess:
+    """
+    Run a command to completion, capturing text output.
+
+    With ``stream``, output lines are passed to ``output_sink`` as they are
+    printed and only the last TAIL_LINES of each stream are returned.
+    """
+    if not stream:
+        return subprocess.run(
+            args,
+            shell=shell,
+            cwd=cwd,
+            input=input,
+            capture_output=True,
+            text=True,
+        )
+
+    sink = output_sink.get()
+    tails = {"stdout": deque(maxlen=TAIL_LINES), "stderr": deque(maxlen=TAIL_LINES)}
+    process = subprocess.Popen(
+        args,
+        shell=shell,
+        cwd=cwd,
+        stdin=None if input is None else subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+    )
+
+    def pump(pipe, name: str):
+        with pipe:
+            for raw in iter(lambda: pipe.readline(MAX_LINE_BYTES), b""):
+                _emit(sink, tails[name], name, raw)
+
+    def feed():
+        with process.stdin:
+            try:
+                process.stdin.write(input.encode("utf-8"))
+            except BrokenPipeError:
+                pass
+
+    threads = [threading.Thread(target=pump, args=(process.stderr, "stderr"), daemon=True)]
+    if input is not None:
+        threads.append(threading.Thread(target=feed, daemon=True))
+    for thread in threads:
+        thread.start()
+
+    try:
+        pump(process.stdout, "stdout")
+        for thread in threads:
+            thread.join()
+        returncode = process.wait()
+    except BaseException:
+        process.kill()
+        process.wait()
+        raise
+
+    return subprocess.CompletedProcess(args, returncode, "".join(tails["stdout"]), "".join(tails["stderr"]))
+
+
+async def arun(
+    args: Union[list[str], str],
+    cwd: str = ".",
+    shell: bool = False,
+    input: Optional[str] = None,
+    stream: bool = False,
+) -> subprocess.CompletedProcess:
+    """Async counterpart of ``run`` built on asyncio subprocesses."""
+    stdin = None if input is None else asyncio.subprocess.PIPE
+    if shell:
+        process = await asyncio.create_subprocess_shell(
+            args,
+            cwd=cwd,
+            stdin=stdin,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            limit=MAX_LINE_BYTES,
+        )
+    else:
+        process = await asyncio.create_subprocess_exec(
+            *args,
+            cwd=cwd,
+            stdin=stdin,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            limit=MAX_LINE_BYTES,
+        )
+
+    try:
+        if stream:
+            stdout, stderr = await _astream(process, input)
+        else:
+            stdout, stderr = await process.communicate(
+                None if input is None else input.encode("utf-8")
+            )
+            stdout = stdout.decode("utf-8", errors="replace")
+            stderr = stderr.decode("utf-8", errors="replace")
+    except asyncio.CancelledError:
+        if process.returncode is None:
+            process.kill()
+            await process.wait()
+        raise
+
+    return subprocess.CompletedProcess(args, process.returncode, stdout, stderr)
+
+
+async def _astream(process: asyncio.subprocess.Process, input: Optional[str]) -> tuple[str, str]:
+    sink = output_sink.get()
+    tails = {"stdout": deque(maxlen=TAIL_LINES), "stderr": deque(maxlen=TAIL_LINES)}
+
+    async def pump(reader: asyncio.StreamReader, name: str):
+        while True:
+            try:
+                raw = await reader.readline()
+            except ValueError:
+                # Over the line limit; the reader has dropped what it buffered
+                raw = b"... (line too long)\n"
+            if not raw:
+                break
+            _emit(sink, tails[name], name, raw)
+
+    async def feed():
+        try:
+            process.stdin.write(input.encode("utf-8"))
+            await process.stdin.drain()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        process.stdin.close()
+
+    tasks = [pump(process.stdout, "stdout"), pump(process.stderr, "stderr")]
+    if input is not None:
+        tasks.append(feed())
+    await asyncio.gather(*tasks)
+    await process.wait()
+    return "".join(tails["stdout"]), "".join(tails["stderr"])
+
+
+def _emit(sink: Optional[Callable[[str, str], None]], tail: deque, name: str, raw: bytes):
+    line = raw.decode("utf-8", errors="replace")
+    tail.append(line)
+    if sink is None:
+        return
+    try:
+        sink(name, line.rstrip("\r\n"))
+    except Exception:
+        pass  # A broken sink must not fail the command
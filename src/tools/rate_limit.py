@@ -0,0 +1,79 @@
+"""Asyncio rate limiting for the HTTP fan-out tools."""
+
+import asyncio
+import time
+from email.utils import parsedate_to_datetime
+from typing import Optional
+
+
+# Backoff after a 429/503 without a usable Retry-After: BASE * 2**attempt
+BACKOFF_BASE = 0.5
+MAX_BACKOFF = 60.0
+
+
+class TokenBucket:
+    """Allows ``rate`` acquisitions per second on average, in bursts of up to ``burst``."""
+
+    def __init__(self, rate: float, burst: Optional[int] = None):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.capacity = burst or max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class HostLimiter:
+    """
+    Concurrency cap, optional token bucket and shared backoff for one host.
+
+    When a response asks to slow down, every request to the host waits
+    until the backoff has passed, not just the one that was throttled.
+    """
+
+    def __init__(self, concurrency: int, rate: Optional[float] = None, burst: Optional[int] = None):
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.bucket = TokenBucket(rate, burst) if rate else None
+        self.resume_at = 0.0
+
+    async def wait(self):
+        """Wait out any backoff, then for a token."""
+        while (delay := self.resume_at - time.monotonic()) > 0:
+            await asyncio.sleep(delay)
+        if self.bucket is not None:
+            await self.bucket.acquire()
+
+    def back_off(self, delay: float):
+        self.resume_at = max(self.resume_at, time.monotonic() + delay)
+
+
+def retry_delay(retry_after: Optional[str], attempt: int) -> float:
+    """
+    Seconds to wait before retrying a throttled request.
+
+    Honors a ``Retry-After`` header (seconds or an HTTP date), otherwise
+    backs off exponentially with the attempt number.
+    """
+    if retry_after:
+        try:
+            delay = float(retry_after)
+        except ValueError:
+            try:
+                delay = parsedate_to_datetime(retry_after).timestamp() - time.time()
+            except (TypeError, ValueError):
+                delay = None
+        if delay is not None:
+            return min(max(delay, 0.0), MAX_BACKOFF)
+    return min(BACKOFF_BASE * 2 ** attempt, MAX_BACKOFF)
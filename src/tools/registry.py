@@ -1,42 +1,166 @@
 """Tool registry and dispatcher."""
 
-from typing import Any, Callable
+import asyncio
+from typing import Any, Awaitable, Callable, Optional
 
-from .file_ops import write_file, read_file, edit_file
-from .git import git_commit, git_push
-from .deploy import build_site, deploy
-from .api import api_request
+from .file_ops import write_file, write_files, read_file, edit_file
+from .codemod import replace_in_tree
+from .search import search_files
+from .git import git_commit, git_push, git_status, git_diff, git_commit_async, git_push_async
+from .deploy import build_site, deploy, deploy_many, build_site_async, deploy_async, deploy_many_async
+from .api import api_request, api_batch, api_request_async, api_batch_async
 from .router import connect_module, generic_handler
+from .cache import ResultCache
 
 
 # Registry of all available tools
 TOOLS: dict[str, Callable] = {
     "write_file": write_file,
+    "write_files": write_files,
     "read_file": read_file,
     "edit_file": edit_file,
+    "replace_in_tree": replace_in_tree,
+    "search_files": search_files,
     "git_commit": git_commit,
     "git_push": git_push,
+    "git_status": git_status,
+    "git_diff": git_diff,
     "build_site": build_site,
     "deploy": deploy,
+    "deploy_many": deploy_many,
     "api_request": api_request,
+    "api_batch": api_batch,
     "connect_module": connect_module,
     "generic_handler": generic_handler,
 }
 
 
+# Native coroutine implementations. Tools without one are run on a worker
+# thread when called through aexecute_tool.
+ASYNC_TOOLS: dict[str, Callable[..., Awaitable[dict]]] = {
+    "git_commit": git_commit_async,
+    "git_push": git_push_async,
+    "build_site": build_site_async,
+    "deploy": deploy_async,
+    "deploy_many": deploy_many_async,
+    "api_request": api_request_async,
+    "api_batch": api_batch_async,
+}
+
+
+# Tools whose results may be cached (opt-in). Each maps a call's params to the
+# files that call reads, or to None when that particular call is not idempotent.
+CACHEABLE_TOOLS: dict[str, Callable[[dict], Optional[list[str]]]] = {
+    "read_file": lambda params: [params["path"]],
+}
+
+
+# Tools whose results depend on remote state, which no file fingerprint
+# captures. They bypass the result cache even if listed above; GET responses
+# are cached by the HTTP layer instead, which revalidates them (http_cache).
+NETWORK_TOOLS = frozenset({"api_request", "api_batch", "git_push", "deploy", "deploy_many"})
+
+
+# Tools that can show what a call would do before it is approved. Each maps
+# the call's params to a preview result (see logger.log_preview).
+PREVIEW_TOOLS: dict[str, Callable[[dict], dict]] = {
+    "replace_in_tree": lambda params: replace_in_tree(**{**params, "dry_run": True}),
+}
+
+
 def get_tool_names() -> list[str]:
     """Get list of all registered tool names."""
     return list(TOOLS.keys())
 
 
-def execute_tool(tool_name: str, params: dict) -> dict[str, Any]:
+def execute_tool(
+    tool_name: str,
+    params: dict,
+    cache: Optional[ResultCache] = None,
+    tool_func: Optional[Callable[..., dict]] = None,
+) -> dict[str, Any]:
     """
     Execute a tool by name with given parameters.
     
+    If a cache is given and the tool is cacheable, a result stored for the
+    same params and unchanged input files is returned without running it.
+    ``tool_func`` skips the lookup when the caller already resolved the tool
+    (see ``CompiledStep.func``).
+    
     Returns a dict with at minimum a 'message' key describing the result.
     """
-    if tool_name not in TOOLS:
-        raise ValueError(f"Unknown tool: {tool_name}")
+    if tool_func is None:
+        if tool_name not in TOOLS:
+            raise ValueError(f"Unknown tool: {tool_name}")
+        tool_func = TOOLS[tool_name]
+    
+    inputs = _cache_inputs(tool_name, params, cache)
+    if inputs is None:
+        return tool_func(**params)
+    
+    key = cache.key(tool_name, params, inputs)
+    cached = cache.get(key)
+    if cached is not None:
+        return cached
+    
+    result = tool_func(**params)
+    _store(cache, key, tool_name, params, inputs, result)
+    return result
+
+
+async def aexecute_tool(
+    tool_name: str,
+    params: dict,
+    cache: Optional[ResultCache] = None,
+    async_func: Optional[Callable[..., Awaitable[dict]]] = None,
+) -> dict[str, Any]:
+    """
+    Async version of ``execute_tool``.
+    
+    Uses the tool's coroutine implementation from ASYNC_TOOLS (or
+    ``async_func``, when already resolved) if there is one, otherwise runs
+    the sync tool on a worker thread.
+    """
+    if async_func is None:
+        if tool_name not in TOOLS:
+            raise ValueError(f"Unknown tool: {tool_name}")
+        async_func = ASYNC_TOOLS.get(tool_name)
+    if async_func is None:
+        return await asyncio.to_thread(execute_tool, tool_name, params, cache)
+    
+    inputs = _cache_inputs(tool_name, params, cache)
+    if inputs is None:
+        return await async_func(**params)
     
-    tool_func = TOOLS[tool_name]
-    return tool_func(**params)
+    key = cache.key(tool_name, params, inputs)
+    cached = cache.get(key)
+    if cached is not None:
+        return cached
+    
+    result = await async_func(**params)
+    _store(cache, key, tool_name, params, inputs, result)
+    return result
+
+
+def preview_tool(tool_name: str, params: dict) -> Optional[dict]:
+    """Dry-run a tool call for the approval prompt, or None if it has no preview."""
+    preview = PREVIEW_TOOLS.get(tool_name)
+    if preview is None or params.get("dry_run"):
+        return None
+    return preview(params)
+
+
+def _cache_inputs(tool_name: str, params: dict, cache: Optional[ResultCache]) -> Optional[list[str]]:
+    """Files a cacheable call reads, or None if this call should bypass the cache."""
+    if cache is None or tool_name not in CACHEABLE_TOOLS or tool_name in NETWORK_TOOLS:
+        return None
+    try:
+        return CACHEABLE_TOOLS[tool_name](params)
+    except (KeyError, TypeError):
+        return None
+
+
+def _store(cache: ResultCache, key: str, tool_name: str, params: dict, inputs: list[str], result: dict):
+    # Don't cache reported failures, or results whose inputs changed mid-run
+    if "error" not in result and cache.key(tool_name, params, inputs) == key:
+        cache.put(key, tool_name, result)
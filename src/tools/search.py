@@ -0,0 +1,331 @@
+"""Indexed workspace search.
+
+Each searched root gets a persistent SQLite index mapping trigrams (runs of
+three characters, lowercased) to the files containing them. Before a search,
+files whose size or mtime changed are re-indexed and deleted ones dropped, so
+only the candidate files that contain every trigram of the query are read.
+Files too large to index are scanned on every search instead.
+"""
+
+import hashlib
+import re
+import sqlite3
+import threading
+from collections import deque
+from contextlib import closing
+from pathlib import Path
+from typing import Optional
+
+from .cache import CACHE_ROOT
+from .workspace import is_binary, list_files
+
+
+INDEX_DIR = CACHE_ROOT / "search"
+
+# Larger files are not indexed; they are scanned on every search
+MAX_INDEX_BYTES = 2 * 1024 * 1024
+
+DEFAULT_MAX_RESULTS = 50
+DEFAULT_CONTEXT = 2
+
+# Trigrams of a query checked against the index
+MAX_QUERY_TRIGRAMS = 256
+
+# Max matching lines reported per file
+MAX_LINES_PER_FILE = 20
+
+# Max paths listed in a result's ``skipped``
+MAX_SKIPPED_LISTED = 50
+
+# What the index knows about a file: its trigrams are indexed (text), it is
+# too large to index (large), or it can't be searched (binary or not UTF-8)
+TEXT, LARGE, UNSEARCHABLE = "text", "large", "unsearchable"
+
+# Bumped when the schema changes, so old indexes are rebuilt rather than migrated
+INDEX_VERSION = 2
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    path TEXT UNIQUE NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    kind TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS trigrams (
+    trigram INTEGER NOT NULL,
+    file_id INTEGER NOT NULL,
+    PRIMARY KEY (trigram, file_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS trigrams_file ON trigrams (file_id);
+"""
+
+# Serializes index updates within the process (SQLite handles other processes)
+_update_lock = threading.Lock()
+
+
+def search_files(
+    query: str,
+    root: str = ".",
+    regex: bool = False,
+    case_sensitive: bool = False,
+    include: Optional[list[str]] = None,
+    exclude: Optional[list[str]] = None,
+    max_results: int = DEFAULT_MAX_RESULTS,
+    context: int = DEFAULT_CONTEXT,
+) -> dict:
+    """
+    Search the text files under a directory, using a persistent index.
+
+    Args:
+        query: Text (or regex) to find
+        root: Directory to search
+        regex: Treat the query as a regular expression
+        case_sensitive: Match case exactly
+        include: Glob patterns of files to search (default: all)
+        exclude: Glob patterns of files to leave out
+        max_results: Max files returned
+        context: Lines of context around each matching line
+
+    Returns:
+        Result dict with files ranked by number of matches, each with its
+        matching lines and their context, and the files that could not be
+        searched (binary or not UTF-8)
+    """
+    if not query:
+        raise ValueError("Empty search query")
+    flags = 0 if case_sensitive else re.IGNORECASE
+    try:
+        pattern = re.compile(query if regex else re.escape(query), flags)
+    except re.error as e:
+        raise ValueError(f"Invalid regex: {e}") from None
+
+    root_path = Path(root)
+    files = list_files(root, include, exclude)
+    literals = _regex_literals(query) if regex else [query]
+
+    with closing(_connect(root_path)) as db:
+        kinds = _update_index(db, root_path, files)
+        candidates = _candidates(db, literals)
+
+    if candidates is None:
+        candidates = {rel for rel, kind in kinds.items() if kind == TEXT}
+    else:
+        candidates &= kinds.keys()
+    # The index can't rule out large files, so they are always read
+    candidates |= {rel for rel, kind in kinds.items() if kind == LARGE}
+    skipped = sorted(rel for rel, kind in kinds.items() if kind == UNSEARCHABLE)
+
+    results = []
+    for rel in sorted(candidates):
+        found = _search_file(root_path / rel, pattern, context)
+        if found:
+            found["path"] = str(root_path / rel)
+            results.append(found)
+
+    # Rank by match count, then prefer files whose name matches
+    results.sort(key=lambda r: (-r["matches"], not pattern.search(Path(r["path"]).name), r["path"]))
+    total = len(results)
+    results = results[:max_results]
+
+    return {
+        "message": f"Found matches in {total} file(s) ({len(candidates)} candidate(s) of {len(files)})",
+        "query": query,
+        "files_searched": len(candidates),
+        "files_matched": total,
+        "files_skipped": len(skipped),
+        "skipped": [str(root_path / rel) for rel in skipped[:MAX_SKIPPED_LISTED]],
+        "truncated": total > len(results),
+        "results": results,
+    }
+
+
+def _connect(root: Path) -> sqlite3.Connection:
+    key = hashlib.sha256(str(root.resolve()).encode("utf-8")).hexdigest()[:16]
+    INDEX_DIR.mkdir(parents=True, exist_ok=True)
+    db = sqlite3.connect(INDEX_DIR / f"{key}.v{INDEX_VERSION}.sqlite", timeout=30)
+    db.execute("PRAGMA journal_mode=WAL")
+    db.execute("PRAGMA synchronous=NORMAL")
+    db.executescript(SCHEMA)
+    return db
+
+
+def _update_index(db: sqlite3.Connection, root: Path, files: list[Path]) -> dict[str, str]:
+    """Re-index changed files and drop deleted ones. Returns the kind of each file."""
+    with _update_lock, db:
+        known = {
+            path: (file_id, size, mtime_ns, kind)
+            for file_id, path, size, mtime_ns, kind in db.execute(
+                "SELECT id, path, size, mtime_ns, kind FROM files"
+            )
+        }
+
+        current = {}
+        for path in files:
+            rel = path.relative_to(root).as_posix()
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entry = known.get(rel)
+            if entry and entry[1:3] == (stat.st_size, stat.st_mtime_ns):
+                current[rel] = entry[3]
+                continue
+            if entry:
+                _drop(db, entry[0])
+            current[rel] = _index_file(db, path, rel, stat.st_size, stat.st_mtime_ns)
+
+        for rel in known.keys() - current.keys():
+            _drop(db, known[rel][0])
+
+    return current
+
+
+def _index_file(db: sqlite3.Connection, path: Path, rel: str, size: int, mtime_ns: int) -> str:
+    # Files without trigrams are still recorded, with their kind, so they are
+    # not retried until they change
+    trigrams = set()
+    try:
+        if is_binary(path):
+            kind = UNSEARCHABLE
+        elif size > MAX_INDEX_BYTES:
+            kind = LARGE
+        else:
+            trigrams = _trigrams(path.read_text(encoding="utf-8"))
+            kind = TEXT
+    except (OSError, UnicodeDecodeError):
+        kind = UNSEARCHABLE
+
+    cursor = db.execute(
+        "INSERT INTO files (path, size, mtime_ns, kind) VALUES (?, ?, ?, ?)",
+        (rel, size, mtime_ns, kind),
+    )
+    db.executemany(
+        "INSERT INTO trigrams (trigram, file_id) VALUES (?, ?)",
+        ((trigram, cursor.lastrowid) for trigram in trigrams),
+    )
+    return kind
+
+
+def _drop(db: sqlite3.Connection, file_id: int):
+    db.execute("DELETE FROM trigrams WHERE file_id = ?", (file_id,))
+    db.execute("DELETE FROM files WHERE id = ?", (file_id,))
+
+
+def _trigrams(text: str) -> set[int]:
+    """Distinct lowercased trigrams of a text, packed into integers."""
+    codes = [ord(c) for c in text.lower()]
+    return {
+        (codes[i] << 42) | (codes[i + 1] << 21) | codes[i + 2]
+        for i in range(len(codes) - 2)
+    }
+
+
+def _candidates(db: sqlite3.Connection, literals: list[str]) -> Optional[set[str]]:
+    """Files containing every trigram of the literals, or None if they can't narrow it."""
+    trigrams = set()
+    for literal in literals:
+        trigrams |= _trigrams(literal)
+    if not trigrams:
+        return None
+
+    # Any subset still only rules out files that cannot match
+    params = list(trigrams)[:MAX_QUERY_TRIGRAMS]
+    rows = db.execute(
+        f"SELECT path FROM files WHERE id IN ("
+        f"SELECT file_id FROM trigrams WHERE trigram IN ({','.join('?' * len(params))}) "
+        f"GROUP BY file_id HAVING COUNT(*) = ?)",
+        params + [len(params)],
+    )
+    return {path for (path,) in rows}
+
+
+def _regex_literals(pattern: str) -> list[str]:
+    """
+    Literal runs that every match of a regex must contain.
+
+    Conservative: a pattern with alternation yields nothing, groups are
+    skipped, and a character made optional by a quantifier ends a run.
+    """
+    if "|" in pattern:
+        return []
+
+    literals = []
+    run = []
+    i = 0
+    while i < len(pattern):
+        c = pattern[i]
+        if c == "\\" and i + 1 < len(pattern):
+            nxt = pattern[i + 1]
+            char = nxt if not nxt.isalnum() else None
+            i += 2
+        elif c == "(":
+            # Skip the whole group
+            depth = 0
+            while i < len(pattern):
+                if pattern[i] == "\\":
+                    i += 1
+                elif pattern[i] == "(":
+                    depth += 1
+                elif pattern[i] == ")":
+                    depth -= 1
+                    if depth == 0:
+                        break
+                i += 1
+            i += 1
+            char = None
+        elif c == "[":
+            end = pattern.find("]", i + 2)
+            i = len(pattern) if end == -1 else end + 1
+            char = None
+        elif c == "{":
+            end = pattern.find("}", i)
+            i = len(pattern) if end == -1 else end + 1
+            char = None
+        elif c in ".^$+?*)":
+            char = None
+            i += 1
+        else:
+            char = c
+            i += 1
+
+        if i < len(pattern) and pattern[i] in "?*{":
+            char = None
+        if char is None:
+            literals.append("".join(run))
+            run = []
+        else:
+            run.append(char)
+    literals.append("".join(run))
+    return [literal for literal in literals if len(literal) >= 3]
+
+
+def _search_file(path: Path, pattern: re.Pattern, context: int) -> Optional[dict]:
+    """Matching lines of a file with their context, read a line at a time."""
+    count = 0
+    matches = []
+    before = deque(maxlen=context)
+    # Reported matches still collecting lines of context after them
+    waiting = []
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            for number, line in enumerate(f):
+                line = line.rstrip("\n")
+                for match in waiting:
+                    match["after"].append(line)
+                waiting = [match for match in waiting if len(match["after"]) < context]
+
+                if pattern.search(line):
+                    count += 1
+                    if len(matches) < MAX_LINES_PER_FILE:
+                        match = {"line": number + 1, "text": line, "before": list(before), "after": []}
+                        matches.append(match)
+                        if context:
+                            waiting.append(match)
+                before.append(line)
+    except (OSError, UnicodeDecodeError):
+        return None
+
+    if not count:
+        return None
+    return {"matches": count, "lines": matches}
@@ -0,0 +1,124 @@
+"""Workspace file listing shared by the tree-wide tools."""
+
+import fnmatch
+import os
+from pathlib import Path
+from typing import Optional
+
+from .proc import run
+
+
+# Directories never descended into, whatever .gitignore says
+ALWAYS_IGNORED = {".git", ".optimus", "node_modules", "__pycache__"}
+
+# Bytes sniffed to tell binary files from text
+SNIFF_BYTES = 8192
+
+
+def list_files(
+    root: str = ".",
+    include: Optional[list[str]] = None,
+    exclude: Optional[list[str]] = None,
+) -> list[Path]:
+    """
+    List the files under ``root`` that are not ignored, sorted.
+
+    Inside a git work tree the listing comes from ``git ls-files`` (tracked and
+    untracked files, minus ignored ones); elsewhere the tree is walked and
+    ``root/.gitignore`` is applied. ``include``/``exclude`` are glob patterns
+    matched against the path relative to ``root`` or the file name.
+    """
+    root_path = Path(root)
+    if not root_path.is_dir():
+        raise FileNotFoundError(f"Directory not found: {root}")
+
+    relative = _git_files(root_path)
+    if relative is None:
+        relative = _walk_files(root_path)
+
+    files = []
+    for rel in relative:
+        if ALWAYS_IGNORED.intersection(rel.split("/")[:-1]):
+            continue
+        if include and not _matches(rel, include):
+            continue
+        if exclude and _matches(rel, exclude):
+            continue
+        files.append(root_path / rel)
+    files.sort()
+    return files
+
+
+def is_binary(path: Path) -> bool:
+    """Whether a file looks binary (has a NUL byte near the start)."""
+    with open(path, "rb") as f:
+        return b"\0" in f.read(SNIFF_BYTES)
+
+
+def _matches(rel: str, patterns: list[str]) -> bool:
+    name = rel.rsplit("/", 1)[-1]
+    return any(fnmatch.fnmatch(rel, p) or fnmatch.fnmatch(name, p) for p in patterns)
+
+
+def _git_files(root: Path) -> Optional[list[str]]:
+    """Non-ignored files relative to ``root`` per git, or None outside a work tree."""
+    try:
+        result = run(
+            ["git", "ls-files", "-z", "--cached", "--others", "--exclude-standard"],
+            cwd=str(root),
+        )
+    except OSError:
+        return None
+    if result.returncode != 0:
+        return None
+    # ls-files also lists tracked files that were deleted from the work tree
+    return [rel for rel in result.stdout.split("\0") if rel and (root / rel).is_file()]
+
+
+def _walk_files(root: Path) -> list[str]:
+    """Walk ``root`` applying its .gitignore (a common subset of the syntax)."""
+    rules = _read_gitignore(root / ".gitignore")
+    files = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        base = Path(dirpath).relative_to(root).as_posix()
+        base = "" if base == "." else base + "/"
+        dirnames[:] = [
+            d for d in dirnames
+            if d not in ALWAYS_IGNORED and not _ignored(base + d, True, rules)
+        ]
+        files.extend(
+            base + name for name in filenames if not _ignored(base + name, False, rules)
+        )
+    return files
+
+
+def _read_gitignore(path: Path) -> list[tuple[str, bool, bool, bool]]:
+    """Parse .gitignore into (pattern, negated, dir_only, anchored) rules."""
+    try:
+        lines = path.read_text(encoding="utf-8").splitlines()
+    except (OSError, UnicodeDecodeError):
+        return []
+
+    rules = []
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        negated = line.startswith("!")
+        line = line[1:] if negated else line
+        dir_only = line.endswith("/")
+        line = line.rstrip("/")
+        anchored = "/" in line
+        rules.append((line.lstrip("/").replace("**/", "*"), negated, dir_only, anchored))
+    return rules
+
+
+def _ignored(rel: str, is_dir: bool, rules: list[tuple[str, bool, bool, bool]]) -> bool:
+    ignored = False
+    name = rel.rsplit("/", 1)[-1]
+    for pattern, negated, dir_only, anchored in rules:
+        if dir_only and not is_dir:
+            continue
+        if fnmatch.fnmatch(rel if anchored else name, pattern):
+            ignored = not negated
+    return ignored
@@ -2,16 +2,19 @@
 
 import json
 import asyncio
+from contextlib import asynccontextmanager
 from pathlib import Path
 from typing import Optional
 
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect, Request
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect, Request, HTTPException
 from fastapi.responses import HTMLResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from dotenv import load_dotenv
 
-from .tools import execute_tool, get_tool_names
+from .compiler import compile_plan, ready_steps, resolve_params
+from .session_store import load_session
+from .tools import aexecute_tool, get_tool_names, output_sink, plan_scope
 
 load_dotenv()
 
@@ -62,6 +65,17 @@ async def list_tools():
     return {"tools": get_tool_names()}
 
 
+@app.get("/api/sessions/{session_id}")
+async def get_session(session_id: str):
+    """Get a session log, including events journaled since its last snapshot."""
+    if "/" in session_id or "\\" in session_id or session_id.startswith("."):
+        raise HTTPException(status_code=400, detail="Invalid session id")
+    session = load_session(session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Session not found")
+    return session
+
+
 @app.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
     """WebSocket for real-time plan execution."""
@@ -72,7 +86,8 @@ async def websocket_endpoint(websocket: WebSocket):
             action = data.get("action")
             
             if action == "execute_plan":
-                await execute_plan_ws(websocket, data.get("plan"))
+                async with plan_scope():
+                    await execute_plan_ws(websocket, data.get("plan"))
             elif action == "approve":
                 manager.approval_result = data.get("choice", "approve")
                 if manager.pending_approval:
@@ -82,6 +97,39 @@ async def websocket_endpoint(websocket: WebSocket):
         manager.disconnect(websocket)
 
 
+@asynccontextmanager
+async def stream_output(websocket: WebSocket, step_num: int):
+    """
+    Forward the output lines of a step's commands as ``step_output`` events.
+    
+    Lines may come from worker threads, so they are queued onto the event
+    loop and sent in order by a single task.
+    """
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+    
+    def sink(stream: str, line: str):
+        message = {"type": "step_output", "step": step_num, "stream": stream, "line": line}
+        loop.call_soon_threadsafe(queue.put_nowait, message)
+    
+    async def send():
+        while (message := await queue.get()) is not None:
+            try:
+                await websocket.send_json(message)
+            except Exception:
+                pass  # Keep draining; the step result reports the outcome
+    
+    sender = asyncio.create_task(send())
+    token = output_sink.set(sink)
+    try:
+        yield
+    finally:
+        output_sink.reset(token)
+        # Sent after any lines still being scheduled from worker threads
+        loop.call_soon_threadsafe(queue.put_nowait, None)
+        await sender
+
+
 async def execute_plan_ws(websocket: WebSocket, plan_data: dict):
     """Execute a plan with WebSocket-based approval."""
     try:
@@ -93,6 +141,16 @@ async def execute_plan_ws(websocket: WebSocket, plan_data: dict):
             })
             return
         
+        # Check every step's tool and params before running anything
+        try:
+            compiled = compile_plan(plan_data)
+        except ValueError as e:
+            await websocket.send_json({
+                "type": "error",
+                "message": f"Invalid plan: {e}"
+            })
+            return
+        
         name = plan_data.get("name", "Unnamed Plan")
         steps = plan_data["steps"]
         
@@ -103,24 +161,32 @@ async def execute_plan_ws(websocket: WebSocket, plan_data: dict):
         })
         
         results = {"succeeded": 0, "failed": 0, "skipped": 0}
+        outputs = {}  # Step results by index, for resolving $refs
+        state = ["PENDING"] * len(steps)
         approve_all = False
         
-        for i, step in enumerate(steps):
+        # Steps run one at a time, in dependency order; like the CLI, steps
+        # whose hard dependencies failed or were skipped are skipped too
+        while True:
+            ready, blocked = ready_steps(compiled, state)
+            for i, failed in blocked:
+                state[i] = "SKIPPED"
+                await websocket.send_json({
+                    "type": "step_skipped",
+                    "step": i + 1,
+                    "reason": f"Dependency not completed: {', '.join(failed)}"
+                })
+                results["skipped"] += 1
+            if not ready:
+                break
+            
+            i = ready[0]
+            step = steps[i]
             step_num = i + 1
             tool = step.get("tool")
             params = step.get("params", {})
             description = step.get("description", f"Execute {tool}")
             
-            # Validate tool
-            if tool not in get_tool_names():
-                await websocket.send_json({
-                    "type": "step_error",
-                    "step": step_num,
-                    "message": f"Unknown tool: {tool}"
-                })
-                results["failed"] += 1
-                continue
-            
             # Send step for approval
             await websocket.send_json({
                 "type": "step_pending",
@@ -147,6 +213,7 @@ async def execute_plan_ws(websocket: WebSocket, plan_data: dict):
                     })
                     break
                 elif choice == "skip":
+                    state[i] = "SKIPPED"
                     await websocket.send_json({
                         "type": "step_skipped",
                         "step": step_num
@@ -163,7 +230,12 @@ async def execute_plan_ws(websocket: WebSocket, plan_data: dict):
             })
             
             try:
-                result = execute_tool(tool, params)
+                compiled_step = compiled.steps[i]
+                resolved = resolve_params(compiled, compiled_step, outputs)
+                async with stream_output(websocket, step_num):
+                    result = await aexecute_tool(tool, resolved, async_func=compiled_step.afunc)
+                outputs[i] = result
+                state[i] = "COMPLETED"
                 await websocket.send_json({
                     "type": "step_success",
                     "step": step_num,
@@ -171,6 +243,7 @@ async def execute_plan_ws(websocket: WebSocket, plan_data: dict):
                 })
                 results["succeeded"] += 1
             except Exception as e:
+                state[i] = "FAILED"
                 await websocket.send_json({
                     "type": "step_error",
                     "step": step_num,
@@ -0,0 +1,312 @@
+"""Per-plan git worktrees, so concurrent plans don't share a working tree.
+
+Worktrees live in the repository's git dir (``optimus-worktrees/wt-<n>``) and
+are reused between runs: a free slot is reset to the base commit and checked
+out on a branch named after the session. When the plan finishes the branch
+is merged back (fast-forward, rebasing first if the base moved), pushed, or
+kept, and the slot is returned to the pool.
+"""
+
+import shutil
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Optional
+
+from .compiler import tool_schema
+from .tools.proc import run
+
+try:
+    import fcntl
+except ImportError:  # Windows: slots are only locked within the process
+    fcntl = None
+
+
+DEFAULT_POOL_SIZE = 4
+
+BRANCH_PREFIX = "optimus/"
+
+# What to do with a plan's branch when it finishes
+MERGE_MODES = ("merge", "push", "keep")
+
+# Params holding a path (or a working directory) that is rebased into the
+# worktree, whether the step sets them or relies on the tool's default
+PATH_PARAMS = ("path", "cwd", "root", "source_dir", "target_dir", "stream_to")
+
+# Params defaulted to the worktree when the tool's default is not a path (None)
+DIR_PARAMS = ("cwd", "root")
+
+# Lists of paths relative to the step's cwd (already rebased): only absolute
+# entries inside the repository are rebased
+PATH_LIST_PARAMS = ("paths",)
+
+# Lists of objects (write_files files, api_batch requests, deploy_many
+# targets) and the path keys rebased in each
+NESTED_PATH_PARAMS = {
+    "files": ("path",),
+    "requests": ("stream_to",),
+    "targets": ("source_dir", "target_dir"),
+}
+
+# Identity used to commit a plan's leftover changes when git has none configured
+FALLBACK_IDENTITY = ["-c", "user.name=Optimus", "-c", "user.email=optimus@localhost"]
+
+
+def _git(args: list[str], cwd) -> str:
+    result = run(["git"] + args, str(cwd))
+    if result.returncode != 0:
+        raise RuntimeError(f"Git error: {result.stderr.strip()}")
+    return result.stdout.strip()
+
+
+@dataclass
+class Worktree:
+    """A pool slot checked out on a plan's branch."""
+
+    repo: Path
+    path: Path
+    # Where the caller's working directory maps to inside the worktree
+    root: Path
+    branch: str
+    base: str
+    base_branch: Optional[str]
+    lock: object = field(repr=False)
+
+    def rebase_params(self, tool: str, params: dict) -> dict:
+        """Point a step's path params at the worktree instead of the repository."""
+        params = dict(params)
+        schema = tool_schema(tool)
+        for name in PATH_PARAMS:
+            if name not in params and name in schema.params:
+                # Defaults are relative to the caller's directory too
+                default = schema.defaults.get(name)
+                if isinstance(default, str):
+                    params[name] = self.rebase_path(default)
+                elif name in DIR_PARAMS:
+                    params[name] = str(self.root)
+            elif isinstance(params.get(name), str):
+                params[name] = self.rebase_path(params[name])
+        for name in PATH_LIST_PARAMS:
+            if isinstance(params.get(name), list):
+                params[name] = [
+                    self.rebase_path(value) if isinstance(value, str) and Path(value).is_absolute() else value
+                    for value in params[name]
+                ]
+        for name, keys in NESTED_PATH_PARAMS.items():
+            if isinstance(params.get(name), list):
+                params[name] = _rebase_entries(self, params[name], keys)
+        # write_files also takes a path -> content map
+        if tool == "write_files" and isinstance(params.get("files"), dict):
+            params["files"] = {self.rebase_path(path): content for path, content in params["files"].items()}
+        return params
+
+    def rebase_path(self, value: str) -> str:
+        path = Path(value)
+        if not path.is_absolute():
+            return str(self.root / path)
+        resolved = path.resolve()
+        # Results of earlier steps (e.g. a $ref'd "path") already point here
+        if resolved.is_relative_to(self.path.resolve()):
+            return value
+        try:
+            return str(self.path / resolved.relative_to(self.repo.resolve()))
+        except ValueError:
+            return value  # Outside the repository
+
+    def info(self) -> dict:
+        return {
+            "path": str(self.path),
+            "branch": self.branch,
+            "base": self.base,
+            "base_branch": self.base_branch,
+        }
+
+
+def _rebase_entries(worktree: Worktree, entries: list, keys: tuple[str, ...]) -> list:
+    rebased = []
+    for entry in entries:
+        if isinstance(entry, dict):
+            entry = {
+                **entry,
+                **{key: worktree.rebase_path(entry[key]) for key in keys if isinstance(entry.get(key), str)},
+            }
+        rebased.append(entry)
+    return rebased
+
+
+class WorktreePool:
+    """Reusable worktrees of one repository."""
+
+    def __init__(self, repo: Path, size: int = DEFAULT_POOL_SIZE):
+        self.repo = repo
+        self.size = max(1, size)
+        self.dir = Path(_git(["rev-parse", "--path-format=absolute", "--git-common-dir"], repo)) / "optimus-worktrees"
+        self._lock = threading.Lock()
+        self._in_use: set[int] = set()
+        # Serializes merges into the repository's branches
+        self._merge_lock = threading.Lock()
+
+    def acquire(self, session_id: str, cwd: str = ".", timeout: float = None) -> Worktree:
+        """Check out a free slot on the session's branch, waiting for one if all are busy."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            slot, lock = self._claim()
+            if slot is not None:
+                break
+            if deadline is not None and time.monotonic() > deadline:
+                raise TimeoutError(f"No free worktree in {self.dir}")
+            time.sleep(0.2)
+
+        try:
+            return self._prepare(slot, lock, session_id, cwd)
+        except BaseException:
+            self._unclaim(slot, lock)
+            raise
+
+    def release(self, worktree: Worktree, mode: str = "merge") -> dict:
+        """
+        Finish with a worktree: merge, push or keep its branch, then free the slot.
+
+        Returns a summary for the session meta.
+        """
+        slot = int(worktree.path.name.split("-")[1])
+        try:
+            return self._finish_branch(worktree, mode)
+        finally:
+            self._unclaim(slot, worktree.lock)
+
+    def _claim(self) -> tuple[Optional[int], object]:
+        self.dir.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            for slot in range(self.size):
+                if slot in self._in_use:
+                    continue
+                lock = open(self.dir / f"wt-{slot}.lock", "a")
+                if fcntl is not None:
+                    try:
+                        # Held while the slot is in use; released if the process dies
+                        fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    except OSError:
+                        lock.close()
+                        continue
+                self._in_use.add(slot)
+                return slot, lock
+        return None, None
+
+    def _unclaim(self, slot: int, lock):
+        with self._lock:
+            self._in_use.discard(slot)
+            lock.close()
+
+    def _prepare(self, slot: int, lock, session_id: str, cwd: str) -> Worktree:
+        path = self.dir / f"wt-{slot}"
+        base = _git(["rev-parse", "HEAD"], self.repo)
+        try:
+            base_branch = _git(["symbolic-ref", "--quiet", "--short", "HEAD"], self.repo)
+        except RuntimeError:
+            base_branch = None  # Detached HEAD: nothing to merge back into
+
+        if not (path / ".git").exists():
+            if path.exists():
+                shutil.rmtree(path)
+            _git(["worktree", "prune"], self.repo)
+            _git(["worktree", "add", "--detach", str(path), base], self.repo)
+        else:
+            # Uncommitted work left by a run that died before releasing the
+            # slot goes to a branch of its own rather than being reset away
+            rescued = _commit_pending(path, f"Uncommitted changes left in {path.name}")
+            if rescued:
+                _git(["branch", f"{BRANCH_PREFIX}rescued/{path.name}-{int(time.time())}", rescued], path)
+            # Reset the reused slot; ignored files (build caches) are kept
+            _git(["checkout", "--force", "--detach", base], path)
+            _git(["clean", "-fd"], path)
+
+        branch = BRANCH_PREFIX + session_id
+        if _git(["branch", "--list", branch], path):
+            # Resuming: continue from what the session already committed
+            _git(["checkout", "--force", branch], path)
+        else:
+            _git(["checkout", "-b", branch, base], path)
+
+        relative = Path(cwd).resolve().relative_to(self.repo)
+        return Worktree(self.repo, path, path / relative, branch, base, base_branch, lock)
+
+    def _finish_branch(self, worktree: Worktree, mode: str) -> dict:
+        summary = {**worktree.info(), "mode": mode}
+        path = worktree.path
+        # Files the plan wrote without committing are committed on its branch,
+        # so resetting the slot for the next run cannot discard them
+        if _commit_pending(path, f"Uncommitted changes from {worktree.branch}"):
+            summary["autocommitted"] = True
+        commits = int(_git(["rev-list", "--count", f"{worktree.base}..{worktree.branch}"], path))
+        summary["commits"] = commits
+
+        if commits == 0 and mode != "keep":
+            self._drop_branch(worktree)
+            summary["result"] = "no changes"
+            return summary
+
+        if mode == "push":
+            _git(["push", "origin", worktree.branch], path)
+            summary["result"] = f"pushed {worktree.branch}"
+        elif mode == "merge" and worktree.base_branch:
+            with self._merge_lock:
+                merged = self._merge(worktree)
+            if merged:
+                self._drop_branch(worktree)
+                summary["result"] = f"merged into {worktree.base_branch}"
+            else:
+                summary["result"] = f"kept {worktree.branch} (could not fast-forward)"
+        else:
+            summary["result"] = f"kept {worktree.branch}"
+
+        _git(["checkout", "--force", "--detach"], path)
+        return summary
+
+    def _merge(self, worktree: Worktree) -> bool:
+        """Fast-forward the base branch to the plan's branch, rebasing if it moved."""
+        target = _git(["rev-parse", worktree.base_branch], self.repo)
+        if target != worktree.base:
+            # Another plan merged first: replay this plan's commits on top
+            if run(["git", "rebase", target], str(worktree.path)).returncode != 0:
+                run(["git", "rebase", "--abort"], str(worktree.path))
+                return False
+
+        try:
+            current = _git(["symbolic-ref", "--quiet", "--short", "HEAD"], self.repo)
+        except RuntimeError:
+            current = None
+        if current == worktree.base_branch:
+            # Checked out in the repository: updates its working tree too
+            args = ["merge", "--ff-only", "--quiet", worktree.branch]
+        else:
+            args = ["fetch", "--quiet", ".", f"{worktree.branch}:{worktree.base_branch}"]
+        return run(["git"] + args, str(self.repo)).returncode == 0
+
+    def _drop_branch(self, worktree: Worktree):
+        _git(["checkout", "--force", "--detach"], worktree.path)
+        _git(["branch", "-D", worktree.branch], worktree.path)
+
+
+def _commit_pending(path: Path, message: str) -> Optional[str]:
+    """Commit all uncommitted changes (minus ignored files) in a worktree; returns the commit."""
+    if not _git(["status", "--porcelain", "--untracked-files=all"], path):
+        return None
+    _git(["add", "--all"], path)
+    identity = [] if run(["git", "var", "GIT_COMMITTER_IDENT"], str(path)).returncode == 0 else FALLBACK_IDENTITY
+    _git(identity + ["commit", "--quiet", "--no-verify", "-m", message], path)
+    return _git(["rev-parse", "HEAD"], path)
+
+
+_pools: dict[Path, WorktreePool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(cwd: str = ".", size: int = DEFAULT_POOL_SIZE) -> WorktreePool:
+    """The shared worktree pool of the repository containing ``cwd``."""
+    repo = Path(_git(["rev-parse", "--show-toplevel"], cwd)).resolve()
+    with _pools_lock:
+        if repo not in _pools:
+            _pools[repo] = WorktreePool(repo, size)
+        return _pools[repo]
@@ -0,0 +1,27 @@
+import os
+import subprocess
+import sys
+import tempfile
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Keep caches out of the working tree; read when the tool modules are imported
+os.environ.setdefault("OPTIMUS_CACHE_DIR", tempfile.mkdtemp(prefix="optimus-test-cache-"))
+
+
+@pytest.fixture
+def git_repo(tmp_path, monkeypatch):
+    """An empty repository with one commit on ``main``, as the working directory."""
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    for args in (
+        ["init", "-q", "-b", "main"],
+        ["config", "user.name", "Test"],
+        ["config", "user.email", "test@example.com"],
+        ["commit", "-q", "--allow-empty", "-m", "init"],
+    ):
+        subprocess.run(["git"] + args, cwd=repo, check=True)
+    monkeypatch.chdir(repo)
+    return repo
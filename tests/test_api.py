@@ -0,0 +1,147 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from src.tools import http_cache
+from src.tools.api import api_batch, api_request
+
+
+class Handler(BaseHTTPRequestHandler):
+    hits = {}
+    in_flight = 0
+    max_in_flight = 0
+    lock = threading.Lock()
+
+    def do_GET(self):
+        with Handler.lock:
+            Handler.hits[self.path] = Handler.hits.get(self.path, 0) + 1
+            Handler.in_flight += 1
+            Handler.max_in_flight = max(Handler.max_in_flight, Handler.in_flight)
+        try:
+            self.respond()
+        finally:
+            with Handler.lock:
+                Handler.in_flight -= 1
+
+    def respond(self):
+        if self.path.startswith("/slow"):
+            time.sleep(0.2)
+        if self.path == "/throttled" and Handler.hits[self.path] == 1:
+            self.send_response(429)
+            self.send_header("Retry-After", "1")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        if self.path == "/etag" and self.headers.get("If-None-Match") == '"v1"':
+            self.send_response(304)
+            self.send_header("ETag", '"v1"')
+            self.end_headers()
+            return
+
+        body = json.dumps({"ok": True, "path": self.path}).encode() if "echo" in self.path else b'{"ok": true}'
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        if self.path == "/etag":
+            self.send_header("ETag", '"v1"')
+            self.send_header("Cache-Control", "max-age=0")
+        elif self.path == "/fresh":
+            self.send_header("Cache-Control", "max-age=60")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server(tmp_path, monkeypatch):
+    monkeypatch.setattr(http_cache.HTTP_CACHE, "cache_dir", tmp_path / "http")
+    Handler.hits = {}
+    Handler.max_in_flight = 0
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_zero_hedge_delay_hedges_immediately(server):
+    result = api_request("GET", f"{server}/slow", cache=False, hedge=True, hedge_delay=0)
+
+    assert result["status"] == 200
+    assert result["hedge"]["delay_s"] == 0
+    assert result["hedge"]["fired"] is True
+
+
+def test_default_hedge_delay_does_not_fire_for_fast_responses(server):
+    result = api_request("GET", f"{server}/fast", cache=False, hedge=True)
+
+    assert result["hedge"]["fired"] is False
+    assert Handler.hits["/fast"] == 1
+
+
+def test_etag_revalidation(server):
+    first = api_request("GET", f"{server}/etag")
+    second = api_request("GET", f"{server}/etag")
+
+    assert first["cache"] == "miss" and second["cache"] == "revalidated"
+    assert second["status"] == 200 and second["content"] == {"ok": True}
+    # The stale entry was checked with the server, which answered 304
+    assert Handler.hits["/etag"] == 2
+
+
+def test_fresh_entries_skip_the_request(server):
+    assert api_request("GET", f"{server}/fresh")["cache"] == "miss"
+    hit = api_request("GET", f"{server}/fresh")
+
+    assert hit["cache"] == "hit" and hit["content"] == {"ok": True}
+    assert Handler.hits["/fresh"] == 1
+
+
+def test_cache_bypassed(server):
+    assert "cache" not in api_request("GET", f"{server}/fresh", cache=False)
+    assert "cache" not in api_request("GET", f"{server}/fresh", cache=False)
+    assert Handler.hits["/fresh"] == 2
+
+
+def test_batch_results_keep_request_order(server):
+    # The slow request finishes last but stays first
+    paths = ["/slow/echo", "/echo/1", "/echo/2"]
+    result = api_batch([{"url": f"{server}{path}"} for path in paths], cache=False)
+
+    assert result["failed"] == 0
+    assert [row["status"] for row in result["results"]] == [200, 200, 200]
+    assert [row["content"]["path"] for row in result["results"]] == paths
+    assert result["results"][0]["elapsed_s"] >= 0.2
+
+
+def test_batch_limits_requests_in_flight(server):
+    requests = [{"url": f"{server}/slow/{n}"} for n in range(6)]
+    result = api_batch(requests, max_concurrency=2, cache=False)
+
+    assert result["failed"] == 0
+    assert Handler.max_in_flight == 2
+
+
+def test_batch_waits_for_retry_after(server):
+    started = time.perf_counter()
+    result = api_batch([{"url": f"{server}/throttled"}], cache=False)
+
+    row = result["results"][0]
+    assert row["status"] == 200 and row["attempts"] == 2
+    assert time.perf_counter() - started >= 1
+    assert Handler.hits["/throttled"] == 2
+
+
+def test_malformed_request_fails_only_its_row(server):
+    result = api_batch([{"url": f"{server}/echo/ok"}, {"url": f"{server}/echo/bad", "headers": ["not", "a", "dict"]}])
+
+    assert result["failed"] == 1
+    assert result["results"][0]["content"] == {"ok": True, "path": "/echo/ok"}
+    assert result["results"][1]["error"] == "RequestException"
+    assert result["results"][1]["attempts"] == 0
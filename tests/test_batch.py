@@ -0,0 +1,36 @@
+import json
+
+import pytest
+
+from src.batch import load_jobs
+
+
+def write_lines(path, *lines):
+    path.write_text("\n".join(lines) + "\n")
+    return str(path)
+
+
+def test_load_jobs_jsonl(tmp_path):
+    source = write_lines(
+        tmp_path / "jobs.jsonl",
+        json.dumps("Build the site"),
+        "",
+        json.dumps({"plan": {"name": "Deploy", "steps": []}, "auto_approve": True}),
+    )
+    jobs = load_jobs(source)
+
+    assert [job["name"] for job in jobs] == ["Build the site", "Deploy"]
+    assert jobs[1]["auto_approve"] is True
+    assert all(job["session_id"] for job in jobs)
+
+
+@pytest.mark.parametrize("line, message", [
+    ("[1, 2]", "Line 2: expected an objective string or an object"),
+    ('{"plan": "steps.json"}', "Line 2: 'plan' must be an object"),
+    ('{"name": "x"}', "Line 2: expected 'objective' or 'plan'"),
+    ("{not json", "Line 2: invalid JSON"),
+])
+def test_load_jobs_rejects_bad_lines(tmp_path, line, message):
+    source = write_lines(tmp_path / "jobs.jsonl", json.dumps("ok"), line)
+    with pytest.raises(ValueError, match=message):
+        load_jobs(source)
@@ -0,0 +1,65 @@
+import sys
+
+import pytest
+
+from src.tools import deploy as deploy_module
+from src.tools.build_cache import BuildCache
+from src.tools.deploy import build_site
+
+
+BUILD_SCRIPT = """
+from pathlib import Path
+
+Path("out").mkdir(exist_ok=True)
+Path("out/app.txt").write_text(Path("src/app.txt").read_text().upper())
+with open("builds.log", "a") as log:
+    log.write("built\\n")
+"""
+
+
+@pytest.fixture
+def site(tmp_path, monkeypatch):
+    monkeypatch.setattr(deploy_module, "BUILD_CACHE", BuildCache(tmp_path / "cache"))
+    root = tmp_path / "site"
+    (root / "src").mkdir(parents=True)
+    (root / "src" / "app.txt").write_text("hello")
+    (root / "build.py").write_text(BUILD_SCRIPT)
+    return root
+
+
+def build(root):
+    return build_site(f'"{sys.executable}" build.py', str(root), inputs=["src", "build.py"], output_dir="out")
+
+
+def builds(root):
+    return (root / "builds.log").read_text().count("built")
+
+
+def test_cache_hit_restores_outputs(site):
+    assert build(site)["cached"] is False
+
+    # Unchanged output: left as is
+    reused = build(site)
+    assert reused["cached"] is True and "reused out" in reused["message"]
+
+    # Deleted or edited output: copied back from the cache
+    (site / "out" / "app.txt").write_text("tampered")
+    restored = build(site)
+    assert restored["cached"] is True and "restored out" in restored["message"]
+    assert (site / "out" / "app.txt").read_text() == "HELLO"
+    assert builds(site) == 1
+
+
+def test_changed_input_invalidates_cache(site):
+    build(site)
+    (site / "src" / "app.txt").write_text("changed")
+
+    result = build(site)
+
+    assert result["cached"] is False
+    assert (site / "out" / "app.txt").read_text() == "CHANGED"
+    assert builds(site) == 2
+    # The earlier input is still a hit
+    (site / "src" / "app.txt").write_text("hello")
+    assert build(site)["cached"] is True
+    assert (site / "out" / "app.txt").read_text() == "HELLO"
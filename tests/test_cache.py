@@ -0,0 +1,59 @@
+import os
+
+from src.tools.cache import ResultCache
+from src.tools.registry import CACHEABLE_TOOLS, NETWORK_TOOLS, TOOLS, execute_tool
+
+
+def test_read_file_cache_invalidated_by_edit(tmp_path):
+    cache = ResultCache(tmp_path / "results")
+    target = tmp_path / "notes.txt"
+    target.write_text("one")
+
+    assert execute_tool("read_file", {"path": str(target)}, cache)["content"] == "one"
+    assert execute_tool("read_file", {"path": str(target)}, cache)["content"] == "one"
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    target.write_text("two!")
+    assert execute_tool("read_file", {"path": str(target)}, cache)["content"] == "two!"
+    assert cache.misses == 2
+
+
+def test_strict_cache_catches_mtime_preserving_edit(tmp_path):
+    cache = ResultCache(tmp_path / "results", strict=True)
+    target = tmp_path / "notes.txt"
+    target.write_text("one")
+    stat = target.stat()
+    execute_tool("read_file", {"path": str(target)}, cache)
+
+    target.write_text("two")
+    os.utime(target, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    assert execute_tool("read_file", {"path": str(target)}, cache)["content"] == "two"
+    assert cache.hits == 0
+
+
+def test_expired_entries_are_ignored(tmp_path):
+    cache = ResultCache(tmp_path / "results", max_age=60)
+    target = tmp_path / "notes.txt"
+    target.write_text("one")
+    key = cache.key("read_file", {"path": str(target)}, [str(target)])
+    cache.put(key, "read_file", {"content": "stale"})
+    os.utime(cache.cache_dir / f"{key}.json", (0, 0))
+
+    assert cache.get(key) is None
+
+
+def test_network_tools_bypass_result_cache(tmp_path, monkeypatch):
+    cache = ResultCache(tmp_path / "results")
+    calls = []
+    monkeypatch.setitem(CACHEABLE_TOOLS, "api_request", lambda params: [])
+    monkeypatch.setitem(TOOLS, "api_request", lambda **params: calls.append(params) or {"status": 200})
+
+    for _ in range(2):
+        execute_tool("api_request", {"method": "GET", "url": "http://example.invalid"}, cache)
+
+    assert len(calls) == 2
+    assert not cache.cache_dir.exists()
+
+
+def test_no_network_tool_is_cacheable():
+    assert not NETWORK_TOOLS & set(CACHEABLE_TOOLS)
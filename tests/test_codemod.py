@@ -0,0 +1,30 @@
+from src.tools.codemod import PROCESS_POOL_MIN_FILES, replace_in_tree
+
+
+def make_tree(root, count):
+    for i in range(count):
+        (root / f"f{i}.py").write_text(f"old_name = {i}\n")
+
+
+def test_replace_in_tree_in_process(tmp_path):
+    make_tree(tmp_path, 3)
+    result = replace_in_tree([{"search": "old_name", "replace": "new_name"}], str(tmp_path))
+
+    assert "3 of 3 file(s)" in result["message"]
+    assert (tmp_path / "f0.py").read_text() == "new_name = 0\n"
+
+
+def test_replace_in_tree_process_pool(tmp_path):
+    make_tree(tmp_path, PROCESS_POOL_MIN_FILES + 1)
+    result = replace_in_tree([{"search": "old_name", "replace": "new_name"}], str(tmp_path), max_workers=2)
+
+    assert f"{PROCESS_POOL_MIN_FILES + 1} of {PROCESS_POOL_MIN_FILES + 1} file(s)" in result["message"]
+    assert (tmp_path / f"f{PROCESS_POOL_MIN_FILES}.py").read_text() == f"new_name = {PROCESS_POOL_MIN_FILES}\n"
+
+
+def test_replace_in_tree_dry_run(tmp_path):
+    make_tree(tmp_path, 1)
+    result = replace_in_tree([{"search": "old_name", "replace": "new_name"}], str(tmp_path), dry_run=True)
+
+    assert result["message"].startswith("Would change 1")
+    assert (tmp_path / "f0.py").read_text() == "old_name = 0\n"
@@ -0,0 +1,141 @@
+import asyncio
+import subprocess
+import threading
+
+import pytest
+
+from src.tools import deploy as deploy_module
+from src.tools import manifest
+from src.tools.deploy import deploy, deploy_many, deploy_many_async
+from src.tools.proc import output_sink
+
+
+@pytest.fixture(autouse=True)
+def manifest_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(manifest, "MANIFEST_DIR", tmp_path / "manifests")
+
+
+def make_site(root):
+    (root / "assets").mkdir(parents=True)
+    (root / "index.html").write_text("<h1>hi</h1>")
+    (root / "assets" / "app.js").write_text("console.log(1)")
+    return root
+
+
+def test_local_deploy_copies_only_changes(tmp_path):
+    source = make_site(tmp_path / "dist")
+    target = tmp_path / "www"
+
+    first = deploy("local", str(source), target_dir=str(target))
+    assert first["files_transferred"] == 2
+    assert (target / "assets" / "app.js").read_text() == "console.log(1)"
+
+    (source / "index.html").write_text("<h1>changed</h1>")
+    (source / "assets" / "app.js").unlink()
+    second = deploy("local", str(source), target_dir=str(target))
+    assert second["changes"] == {"changed": ["index.html"], "deleted": ["assets/app.js"]}
+    assert not (target / "assets").exists()
+
+
+def fake_vercel(monkeypatch):
+    calls = []
+
+    def fake_run(args, **kwargs):
+        calls.append(args)
+        return subprocess.CompletedProcess(args, 0, stdout="Deploying...\nhttps://site.vercel.app\n", stderr="")
+
+    monkeypatch.setattr(deploy_module, "run", fake_run)
+    return calls
+
+
+def test_skipped_deploy_returns_last_result(tmp_path, monkeypatch):
+    source = make_site(tmp_path / "dist")
+    calls = fake_vercel(monkeypatch)
+
+    first = deploy("vercel", str(source), project_name="site", skip_unchanged=True)
+    second = deploy("vercel", str(source), project_name="site", skip_unchanged=True)
+
+    assert len(calls) == 1
+    assert second["skipped"] is True
+    assert second["files_skipped"] == 2
+    assert "skipped" in second["message"]
+    assert second["url"] == first["url"] == "https://site.vercel.app"
+    assert second["provider"] == "vercel"
+
+    deploy("vercel", str(source), project_name="site", force=True, skip_unchanged=True)
+    assert len(calls) == 2
+
+
+def test_remote_deploy_runs_unless_skipping_is_requested(tmp_path, monkeypatch):
+    source = make_site(tmp_path / "dist")
+    calls = fake_vercel(monkeypatch)
+
+    deploy("vercel", str(source), project_name="site")
+    second = deploy("vercel", str(source), project_name="site")
+
+    assert len(calls) == 2
+    assert "skipped" not in second
+    assert second["files_transferred"] == 0 and second["files_skipped"] == 2
+
+
+def test_deploy_options_are_part_of_the_target(tmp_path, monkeypatch):
+    source = make_site(tmp_path / "dist")
+    calls = fake_vercel(monkeypatch)
+
+    deploy("vercel", str(source), project_name="site", skip_unchanged=True)
+    # Other provider config: not the deploy recorded above
+    other = deploy("vercel", str(source), project_name="site", skip_unchanged=True, prod=True)
+    again = deploy("vercel", str(source), project_name="site", skip_unchanged=True, prod=True)
+
+    assert len(calls) == 2
+    assert "skipped" not in other
+    assert again["skipped"] is True
+
+
+@pytest.mark.parametrize("use_async", [False, True])
+def test_deploy_many_reports_failures_per_target(tmp_path, use_async):
+    source = make_site(tmp_path / "dist")
+    targets = [
+        {"provider": "local", "target_dir": str(tmp_path / "www1")},
+        # Inside the source directory: rejected
+        {"name": "bad", "provider": "local", "target_dir": str(source / "nested")},
+        {"provider": "local", "target_dir": str(tmp_path / "www2")},
+    ]
+    lines = []
+    token = output_sink.set(lambda stream, line: lines.append((stream, line)))
+    try:
+        if use_async:
+            result = asyncio.run(deploy_many_async(targets, str(source), max_parallel=3))
+        else:
+            result = deploy_many(targets, str(source), max_parallel=3)
+    finally:
+        output_sink.reset(token)
+
+    assert result["failed"] == ["bad"]
+    assert "overlap" in result["results"]["bad"]["error"]
+    assert result["message"] == "Deployed 2 of 3 targets"
+    for name in (f"local:{tmp_path / 'www1'}", f"local:{tmp_path / 'www2'}"):
+        assert result["results"][name]["files_transferred"] == 2
+    assert (tmp_path / "www1" / "index.html").exists() and (tmp_path / "www2" / "index.html").exists()
+    assert ("stderr", f"[bad] failed: {result['results']['bad']['error']}") in lines
+
+    with pytest.raises(RuntimeError, match="1 of 3 targets"):
+        deploy_many(targets, str(source), allow_partial=False)
+
+
+def test_deploy_many_runs_targets_concurrently(tmp_path, monkeypatch):
+    source = make_site(tmp_path / "dist")
+    # Each deploy waits for the other: run one at a time, both would time out
+    barrier = threading.Barrier(2, timeout=5)
+
+    def fake_run(args, **kwargs):
+        barrier.wait()
+        return subprocess.CompletedProcess(args, 0, stdout=f"https://{args[-1]}.vercel.app\n", stderr="")
+
+    monkeypatch.setattr(deploy_module, "run", fake_run)
+    targets = [{"provider": "vercel", "project_name": name} for name in ("one", "two")]
+
+    result = deploy_many(targets, str(source), max_parallel=2)
+
+    assert result["failed"] == []
+    assert result["results"]["vercel:two"]["url"] == "https://two.vercel.app"
@@ -0,0 +1,71 @@
+import os
+import time
+
+import httpx
+import pytest
+
+from src.tools import download
+from src.tools.download import prune_downloads, read_body
+
+
+@pytest.fixture(autouse=True)
+def download_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(download, "DOWNLOAD_DIR", tmp_path / "downloads")
+    return tmp_path / "downloads"
+
+
+def response(body: bytes, content_type="text/plain"):
+    return httpx.Response(
+        200,
+        headers={"content-type": content_type},
+        stream=httpx.ByteStream(body),
+        request=httpx.Request("GET", "https://example.com/data.txt"),
+    )
+
+
+def test_small_body_stays_in_memory(download_dir):
+    body, file = read_body(response(b"hello"), threshold=100)
+    assert body == b"hello" and file is None
+    assert not download_dir.exists()
+
+
+def test_large_body_spills_to_disk(download_dir):
+    data = b"x" * 1000
+    body, file = read_body(response(data), threshold=100, preview=4)
+
+    assert body is None
+    assert file["size"] == 1000 and file["preview"] == "xxxx"
+    assert file["path"].endswith(".txt")
+    with open(file["path"], "rb") as f:
+        assert f.read() == data
+    assert [p.name for p in download_dir.iterdir()] == [os.path.basename(file["path"])]
+
+
+def write_file(directory, name, size, age):
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / name
+    path.write_bytes(b"x" * size)
+    mtime = time.time() - age
+    os.utime(path, (mtime, mtime))
+    return path
+
+
+def test_prune_downloads_by_age_and_size(download_dir):
+    expired = write_file(download_dir, "expired", 10, age=2 * 86400)
+    old = write_file(download_dir, "old", 60, age=7200)
+    recent = write_file(download_dir, "recent", 60, age=10)
+    fresh = write_file(download_dir, "fresh", 10, age=1800)
+
+    removed = prune_downloads(max_age=86400, max_bytes=100, min_age=3600)
+
+    assert removed == 2
+    assert not expired.exists() and not old.exists()
+    assert recent.exists() and fresh.exists()
+
+
+def test_spilling_prunes_download_dir(download_dir, monkeypatch):
+    monkeypatch.setattr(download, "_spills", 0)
+    stale = write_file(download_dir, ".abandoned.part", 10, age=download.DOWNLOAD_MAX_AGE + 60)
+
+    read_body(response(b"y" * 200), threshold=100)
+    assert not stale.exists()
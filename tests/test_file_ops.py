@@ -0,0 +1,130 @@
+import base64
+
+import pytest
+
+from src.tools.file_ops import CHUNK_SIZE, PartialWriteError, edit_file, edit_stage, read_file, write_files
+
+
+def test_read_file_ranges(tmp_path):
+    target = tmp_path / "data.txt"
+    target.write_text("line 1\nline 2\nline 3\n")
+
+    assert read_file(str(target))["content"] == "line 1\nline 2\nline 3\n"
+    assert read_file(str(target), offset=7, length=6)["content"] == "line 2"
+    assert read_file(str(target), head=1)["content"] == "line 1\n"
+    assert read_file(str(target), tail=1)["content"] == "line 3\n"
+
+    past_end = read_file(str(target), offset=100)
+    assert past_end["content"] == "" and past_end["bytes"] == 0
+
+
+def test_read_file_range_skips_split_characters(tmp_path):
+    target = tmp_path / "utf8.txt"
+    target.write_text("é" * 4, encoding="utf-8")
+
+    # Offset 1 lands inside the first two-byte character
+    assert read_file(str(target), offset=1)["content"] == "é" * 3
+
+
+def test_read_file_binary(tmp_path):
+    target = tmp_path / "data.bin"
+    target.write_bytes(bytes(range(16)))
+
+    result = read_file(str(target), offset=4, length=4, binary=True)
+    assert base64.b64decode(result["content"]) == bytes([4, 5, 6, 7])
+
+
+def test_edit_stages_carry_matches_across_chunks():
+    literal = edit_stage(0, {"search": "needle", "replace": "pin"})
+    out = "".join(literal.feed(chunk) for chunk in ["hay ne", "ed", "le hay nee", "dle"])
+    out += literal.feed("", final=True)
+    assert out == "hay pin hay pin"
+    assert literal.count == 2
+
+    regex = edit_stage(1, {"search": r"^x=\d+$", "replace": "x=0", "regex": True})
+    out = "".join(regex.feed(chunk) for chunk in ["a\nx=1", "23\nb\nx=", "4"])
+    out += regex.feed("", final=True)
+    assert out == "a\nx=0\nb\nx=0"
+    assert regex.count == 2
+
+
+def test_edit_file_across_chunk_boundary(tmp_path):
+    target = tmp_path / "big.txt"
+    # "needle" straddles the first chunk boundary, and a two-byte character
+    # straddles the second
+    head = "a" * (CHUNK_SIZE - 3) + "needle\n"
+    middle = "b" * (2 * CHUNK_SIZE - len(head.encode("utf-8")) - 1) + "é needle\n"
+    target.write_text(head + middle + "needle", encoding="utf-8")
+
+    result = edit_file(str(target), edits=[
+        {"search": "needle", "replace": "pin"},
+        {"search": r"^b+é", "replace": "B", "regex": True},
+    ])
+
+    assert result["counts"] == [3, 1]
+    assert target.read_text(encoding="utf-8") == "a" * (CHUNK_SIZE - 3) + "pin\nB pin\npin"
+
+
+def test_edit_file_failure_leaves_file_untouched(tmp_path):
+    target = tmp_path / "notes.txt"
+    target.write_text("one two")
+
+    with pytest.raises(ValueError, match="matched nothing"):
+        edit_file(str(target), edits=[{"search": "one", "replace": "1"}, {"search": "three", "replace": "3"}])
+
+    assert target.read_text() == "one two"
+    assert [p.name for p in tmp_path.iterdir()] == ["notes.txt"]
+
+
+def test_write_files_skips_unchanged(tmp_path):
+    files = {str(tmp_path / "a" / "one.txt"): "1", str(tmp_path / "b" / "two.txt"): "22"}
+
+    first = write_files(files)
+    assert (first["written"], first["unchanged"], first["bytes"]) == (2, 0, 3)
+
+    (tmp_path / "b" / "two.txt").write_text("changed")
+    second = write_files(files)
+    assert (second["written"], second["unchanged"]) == (1, 1)
+    assert [row[1] for row in second["files"]] == ["unchanged", "written"]
+    assert write_files(files, skip_unchanged=False)["written"] == 2
+
+
+def test_write_files_rejects_bad_entries(tmp_path):
+    path = str(tmp_path / "a.txt")
+    with pytest.raises(ValueError, match="listed more than once"):
+        write_files([{"path": path, "content": "1"}, {"path": path, "content": "2"}])
+    with pytest.raises(ValueError, match="string 'path' and 'content'"):
+        write_files([{"path": path, "content": {"not": "text"}}])
+    with pytest.raises(ValueError, match="'path' and 'content'"):
+        write_files([{"path": path}])
+    assert not (tmp_path / "a.txt").exists()
+
+
+def test_write_files_fsync_is_atomic(tmp_path):
+    target = tmp_path / "a.txt"
+    target.write_text("old")
+    target.chmod(0o640)
+
+    write_files({str(target): "new"}, fsync=True)
+
+    assert target.read_text() == "new"
+    assert target.stat().st_mode & 0o777 == 0o640
+    assert [p.name for p in tmp_path.iterdir()] == ["a.txt"]
+
+
+def test_write_files_partial_failure_reports_rows(tmp_path):
+    # A directory where a file should go fails that file's write only
+    (tmp_path / "taken").mkdir()
+    files = [
+        {"path": str(tmp_path / "ok.txt"), "content": "ok"},
+        {"path": str(tmp_path / "taken"), "content": "x"},
+    ]
+
+    with pytest.raises(PartialWriteError, match="Failed to write 1 of 2") as raised:
+        write_files(files)
+
+    assert (tmp_path / "ok.txt").read_text() == "ok"
+    result = raised.value.result
+    assert (result["written"], result["failed"]) == (1, 1)
+    assert result["files"][0] == [str(tmp_path / "ok.txt"), "written", 2]
+    assert result["files"][1][1] == "error" and len(result["files"][1]) == 4
@@ -0,0 +1,56 @@
+import subprocess
+
+from src.tools.git import _parse_status, git_status
+
+
+OID = "a" * 40
+
+
+def test_parse_porcelain_v2():
+    output = "\0".join([
+        f"# branch.oid {OID}",
+        "# branch.head main",
+        "# branch.upstream origin/main",
+        "# branch.ab +2 -1",
+        f"1 M. N... 100644 100644 100644 {OID} {OID} staged file.txt",
+        f"1 .M N... 100644 100644 100644 {OID} {OID} src/app.py",
+        f"1 MM N... 100644 100644 100644 {OID} {OID} both.py",
+        f"2 R. N... 100644 100644 100644 {OID} {OID} R100 new name.py",
+        "old name.py",
+        f"u UU N... 100644 100644 100644 100644 {OID} {OID} {OID} conflict.py",
+        "? notes/todo.md",
+        "",
+    ])
+
+    status = _parse_status(output)
+
+    assert (status["branch"], status["commit"], status["upstream"]) == ("main", OID, "origin/main")
+    assert (status["ahead"], status["behind"]) == (2, 1)
+    assert status["staged"] == [
+        {"path": "staged file.txt", "status": "M"},
+        {"path": "both.py", "status": "M"},
+        {"path": "new name.py", "from": "old name.py", "status": "R"},
+    ]
+    assert status["unstaged"] == [{"path": "src/app.py", "status": "M"}, {"path": "both.py", "status": "M"}]
+    assert status["conflicted"] == [{"path": "conflict.py", "status": "UU"}]
+    assert status["untracked"] == ["notes/todo.md"]
+    assert status["clean"] is False
+
+
+def test_parse_initial_commit():
+    status = _parse_status("# branch.oid (initial)\0# branch.head main\0")
+    assert status["commit"] is None and status["upstream"] is None
+    assert status["clean"] is True
+
+
+def test_git_status_in_repo(git_repo):
+    (git_repo / "a.txt").write_text("a")
+    subprocess.run(["git", "add", "a.txt"], cwd=git_repo, check=True)
+    (git_repo / "b.txt").write_text("b")
+
+    status = git_status(str(git_repo))
+
+    assert status["branch"] == "main"
+    assert status["staged"] == [{"path": "a.txt", "status": "A"}]
+    assert status["untracked"] == ["b.txt"]
+    assert status["message"] == "2 change(s) on main"
@@ -0,0 +1,77 @@
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from src.tools import http_client
+from src.tools.http_client import get_async_client, get_client, plan_scope
+
+
+class Handler(BaseHTTPRequestHandler):
+    # Keep-alive, so a pooled client sends every request over one connection
+    protocol_version = "HTTP/1.1"
+    ports = []
+
+    def do_GET(self):
+        Handler.ports.append(self.client_address[1])
+        self.send_response(200)
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"ok")
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    Handler.ports = []
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.fixture(autouse=True)
+def fresh_clients(monkeypatch):
+    monkeypatch.setattr(http_client, "_client", None)
+    monkeypatch.setattr(http_client, "_scopes", 0)
+
+
+def test_client_is_reused_and_closed_by_last_scope(server):
+    with plan_scope():
+        client = get_client()
+        with plan_scope():
+            assert get_client() is client
+            client.get(server)
+        # An inner (concurrent) plan ending leaves the client open
+        assert not client.is_closed
+        client.get(server)
+        assert get_client() is client
+
+    assert client.is_closed
+    assert len(set(Handler.ports)) == 1  # Both requests shared one connection
+    # Outside a plan, the next use builds a new client
+    replacement = get_client()
+    assert replacement is not client
+    replacement.close()
+
+
+def test_async_client_is_reused_and_closed_by_scope(server):
+    async def run():
+        async with plan_scope():
+            client = get_async_client()
+            await client.get(server)
+            await client.get(server)
+            assert get_async_client() is client
+            # The sync client is kept open by the same scope
+            sync_client = get_client()
+        return client, sync_client
+
+    client, sync_client = asyncio.run(run())
+
+    assert client.is_closed and sync_client.is_closed
+    assert len(set(Handler.ports)) == 1
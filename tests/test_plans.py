@@ -0,0 +1,203 @@
+import asyncio
+import json
+import subprocess
+from dataclasses import replace
+
+import pytest
+
+from src.agent import Agent
+from src.compiler import compile_plan, ready_steps, resolve_params
+from src import web
+from src.session_store import load_session
+from src.tools.registry import TOOLS
+
+
+def plan_with_failure():
+    return {
+        "name": "Refs and failures",
+        "steps": [
+            {"tool": "write_file", "params": {"path": "a.txt", "content": "hi"}},
+            {"tool": "read_file", "params": {"path": {"$ref": "steps.1.result.path"}}},
+            {"tool": "write_file", "params": {"path": "b.txt", "content": {"$ref": "steps.2.result.content"}}},
+            {"id": "bad", "tool": "read_file", "params": {"path": "missing.txt"}, "depends_on": []},
+            {"id": "after_bad", "tool": "write_file", "params": {"path": "c.txt", "content": "x"}, "depends_on": ["bad"]},
+            {"tool": "write_file", "params": {"path": "d.txt", "content": "x"}, "depends_on": ["after_bad"]},
+            {"tool": "write_file", "params": {"path": "e.txt", "content": "x"}, "depends_on": ["3"]},
+        ],
+    }
+
+
+def test_ready_steps_skips_dependents_of_failures():
+    compiled = compile_plan(plan_with_failure())
+    state = ["COMPLETED"] * 3 + ["FAILED"] + ["PENDING"] * 3
+
+    ready, skipped = ready_steps(compiled, state)
+
+    assert ready == [6]
+    assert skipped == [(4, ["bad"]), (5, ["after_bad"])]
+    assert state[4] == "PENDING"  # Not modified
+
+
+def test_forward_dependency_runs_first():
+    compiled = compile_plan({"steps": [
+        {"tool": "write_file", "params": {"path": "a", "content": ""}, "depends_on": [2]},
+        {"tool": "write_file", "params": {"path": "b", "content": ""}, "depends_on": []},
+    ]})
+    assert ready_steps(compiled, ["PENDING", "PENDING"]) == ([1], [])
+
+
+def test_resolve_params_follows_paths():
+    compiled = compile_plan({"steps": [
+        {"tool": "read_file", "params": {"path": "a"}},
+        {"tool": "write_files", "params": {"files": [{"path": "b", "content": {"$ref": "steps.1.result.lines.1"}}]}},
+    ]})
+    params = resolve_params(compiled, compiled.steps[1], {0: {"lines": ["x", "y"]}})
+    assert params == {"files": [{"path": "b", "content": "y"}]}
+
+    with pytest.raises(ValueError, match="no 'lines'"):
+        resolve_params(compiled, compiled.steps[1], {0: {}})
+
+
+def test_invalid_refs_are_rejected():
+    with pytest.raises(ValueError, match="earlier step"):
+        compile_plan({"steps": [
+            {"tool": "read_file", "params": {"path": {"$ref": "steps.1.result.path"}}},
+        ]})
+
+
+def test_agent_skips_dependents_of_failed_steps(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    results = Agent(auto_approve=True, use_cache=False).execute_plan(plan_with_failure())
+
+    statuses = {row["step"]: row["status"] for row in results["step_results"]}
+    assert statuses == {1: "success", 2: "success", 3: "success", 4: "error", 5: "skipped", 6: "skipped", 7: "success"}
+    assert (tmp_path / "b.txt").read_text() == "hi"
+    assert not (tmp_path / "c.txt").exists()
+
+
+class FakeWebSocket:
+    """Records messages and approves every step."""
+
+    def __init__(self):
+        self.messages = []
+
+    async def send_json(self, message):
+        self.messages.append(message)
+        if message["type"] == "step_pending" and message["needs_approval"]:
+            asyncio.get_running_loop().call_soon(self.approve)
+
+    @staticmethod
+    def approve():
+        web.manager.approval_result = "approve_all"
+        web.manager.pending_approval.set()
+
+
+def test_web_executor_skips_dependents_of_failed_steps(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    websocket = FakeWebSocket()
+    asyncio.run(web.execute_plan_ws(websocket, plan_with_failure()))
+
+    events = {}
+    for message in websocket.messages:
+        if message["type"] in ("step_success", "step_error", "step_skipped"):
+            events[message["step"]] = message["type"]
+    assert events == {
+        1: "step_success", 2: "step_success", 3: "step_success", 4: "step_error",
+        5: "step_skipped", 6: "step_skipped", 7: "step_success",
+    }
+    assert websocket.messages[-1] == {"type": "plan_complete", "results": {"succeeded": 4, "failed": 1, "skipped": 2}}
+    assert (tmp_path / "b.txt").read_text() == "hi"
+
+
+def test_compiled_params_are_isolated():
+    plan = {"steps": [{"tool": "write_files", "params": {"files": [{"path": "a", "content": "x"}]}}]}
+    compiled = compile_plan(plan)
+
+    plan["steps"][0]["params"]["files"][0]["content"] = "changed"
+    params = resolve_params(compiled, compiled.steps[0], {})
+    params["files"][0]["path"] = "mutated"
+
+    assert resolve_params(compiled, compiled.steps[0], {}) == {"files": [{"path": "a", "content": "x"}]}
+
+
+def test_steps_dispatch_through_their_compiled_function(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    plan = {"steps": [{"tool": "write_file", "params": {"path": "a.txt", "content": "x"}}]}
+    compiled = compile_plan(plan)
+    calls = []
+
+    def write_file(**params):
+        calls.append(params)
+        return {"message": "written"}
+
+    # The step is bound to its function once, at compile time
+    assert compiled.steps[0].func is TOOLS["write_file"]
+    bound = replace(compiled, steps=(replace(compiled.steps[0], func=write_file),))
+    monkeypatch.setattr("src.agent.compile_plan", lambda plan: bound)
+
+    results = Agent(auto_approve=True, use_cache=False).execute_plan(plan)
+
+    assert results["succeeded"] == 1
+    assert calls == [{"path": "a.txt", "content": "x"}]
+    assert not (tmp_path / "a.txt").exists()
+
+
+DAG = {
+    "name": "Async parity",
+    "steps": [
+        {"tool": "write_file", "params": {"path": "a.txt", "content": "alpha"}},
+        {"tool": "write_file", "params": {"path": "b.txt", "content": "beta"}, "depends_on": []},
+        {"tool": "read_file", "params": {"path": "a.txt"}, "depends_on": [1]},
+        {"tool": "write_file", "params": {"path": "c.txt", "content": {"$ref": "steps.3.result.content"}}, "depends_on": [2]},
+        {"tool": "read_file", "params": {"path": "missing.txt"}, "depends_on": []},
+        {"tool": "write_file", "params": {"path": "d.txt", "content": "x"}, "depends_on": [5]},
+        {"tool": "read_file", "params": {"path": "input.txt"}, "depends_on": []},
+    ],
+}
+
+
+def run_plan(agent, use_async, session_id):
+    if use_async:
+        return asyncio.run(agent.aexecute_plan(DAG, session_id=session_id))
+    return agent.execute_plan(DAG, session_id=session_id)
+
+
+def test_async_plan_matches_sync(tmp_path, monkeypatch):
+    runs = {}
+    for use_async in (False, True):
+        root = tmp_path / ("async" if use_async else "sync")
+        root.mkdir()
+        (root / "input.txt").write_text("input")
+        monkeypatch.chdir(root)
+        agent = Agent(auto_approve=True)
+        # Run twice: the second run's reads come from the result cache
+        results = [run_plan(agent, use_async, f"run-{n}") for n in range(2)]
+        sessions = [load_session(f"run-{n}") for n in range(2)]
+        assert (root / "c.txt").read_text() == "alpha"
+        assert not (root / "d.txt").exists()
+        # Compare what was journaled, minus the run's own id, time and directory
+        runs[use_async] = json.loads(json.dumps(
+            [{key: value for key, value in session.items() if key not in ("id", "timestamp")} for session in sessions]
+            + results
+        ).replace(str(root), "<root>"))
+
+    assert runs[True] == runs[False]
+    first, second = runs[False][:2]
+    assert [step["status"] for step in first["steps"]] == ["COMPLETED"] * 4 + ["ERROR", "SKIPPED", "COMPLETED"]
+    assert first["meta"]["cache"]["hits"] == 0
+    assert second["meta"]["cache"]["hits"] == 1
+
+
+@pytest.mark.parametrize("use_async", [False, True])
+def test_plan_runs_in_worktree(git_repo, use_async):
+    (git_repo / "input.txt").write_text("input")
+    subprocess.run(["git", "add", "input.txt"], cwd=git_repo, check=True)
+    subprocess.run(["git", "commit", "-q", "-m", "input"], cwd=git_repo, check=True)
+    results = run_plan(Agent(auto_approve=True, use_cache=False, worktree="merge"), use_async, "wt")
+
+    assert (results["succeeded"], results["failed"], results["skipped"]) == (5, 1, 1)
+    assert results["step_results"][2]["result"]["path"].startswith(str(git_repo / ".git" / "optimus-worktrees"))
+    # Not merged back: a step failed, so the branch is kept
+    meta = load_session("wt")["meta"]["worktree"]
+    assert meta["result"] == "kept optimus/wt"
+    assert not (git_repo / "c.txt").exists()
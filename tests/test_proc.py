@@ -0,0 +1,67 @@
+import asyncio
+import sys
+
+import pytest
+
+from src.tools import proc
+from src.tools.proc import arun, output_sink, run
+
+
+# Prints a line, then waits (up to 5s) for the sink to have seen it
+WAIT_FOR_SINK = """
+import os, sys, time
+
+print("first", flush=True)
+deadline = time.monotonic() + 5
+while not os.path.exists(sys.argv[1]):
+    if time.monotonic() > deadline:
+        sys.exit("sink never saw the first line")
+    time.sleep(0.01)
+print("second")
+print("oops", file=sys.stderr)
+"""
+
+MANY_LINES = "for n in range(20): print(n)"
+
+
+def run_command(args, use_async):
+    if use_async:
+        return asyncio.run(arun(args, stream=True))
+    return run(args, stream=True)
+
+
+@pytest.mark.parametrize("use_async", [False, True])
+def test_output_is_streamed_live(tmp_path, use_async):
+    seen = tmp_path / "seen"
+    lines = []
+
+    def sink(stream, line):
+        lines.append((stream, line))
+        if line == "first":
+            seen.touch()
+
+    token = output_sink.set(sink)
+    try:
+        result = run_command([sys.executable, "-c", WAIT_FOR_SINK, str(seen)], use_async)
+    finally:
+        output_sink.reset(token)
+
+    assert result.returncode == 0, result.stderr
+    assert lines[0] == ("stdout", "first")
+    assert sorted(lines) == [("stderr", "oops"), ("stdout", "first"), ("stdout", "second")]
+    assert result.stdout == "first\nsecond\n" and result.stderr == "oops\n"
+
+
+@pytest.mark.parametrize("use_async", [False, True])
+def test_streamed_output_keeps_tail(monkeypatch, use_async):
+    monkeypatch.setattr(proc, "TAIL_LINES", 5)
+    lines = []
+    token = output_sink.set(lambda stream, line: lines.append(line))
+    try:
+        result = run_command([sys.executable, "-c", MANY_LINES], use_async)
+    finally:
+        output_sink.reset(token)
+
+    # Every line reaches the sink; only the last TAIL_LINES are returned
+    assert lines == [str(n) for n in range(20)]
+    assert result.stdout == "".join(f"{n}\n" for n in range(15, 20))
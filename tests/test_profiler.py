@@ -0,0 +1,107 @@
+import asyncio
+import time
+import tracemalloc
+
+import pytest
+
+from src.agent import Agent
+from src.profiler import measure, timed
+from src.session_store import load_session
+
+
+PLAN = {
+    "name": "Profiled",
+    "steps": [
+        {"tool": "write_file", "params": {"path": "a.txt", "content": "x" * 1000}},
+        {"tool": "read_file", "params": {"path": "a.txt"}},
+    ],
+}
+
+
+def test_measure_records_step_figures():
+    into = {}
+    tracemalloc.start()
+    try:
+        with measure(into):
+            buffer = bytearray(1_000_000)
+            del buffer
+    finally:
+        tracemalloc.stop()
+
+    assert into["wall_s"] >= 0 and into["cpu_s"] >= 0
+    assert into["peak_mem_bytes"] >= 1_000_000
+    assert "peak_mem_shared" not in into
+
+
+def test_measure_without_thread_figures():
+    into = {}
+    with measure(into, per_thread=False):
+        pass
+
+    assert "wall_s" in into
+    assert not {"cpu_s", "read_bytes", "write_bytes", "peak_mem_bytes"} & into.keys()
+
+
+def test_overlapping_measures_keep_each_others_peaks():
+    outer, inner = {}, {}
+    tracemalloc.start()
+    try:
+        with measure(outer):
+            buffer = bytearray(1_000_000)
+            del buffer
+            # Starting another measurement must not reset the outer peak
+            with measure(inner):
+                pass
+    finally:
+        tracemalloc.stop()
+
+    assert outer["peak_mem_bytes"] >= 1_000_000
+    assert outer["peak_mem_shared"] and inner["peak_mem_shared"]
+
+
+def test_timed_accumulates():
+    into = {}
+    for _ in range(2):
+        with timed(into, "save_s"):
+            time.sleep(0.01)
+
+    assert into["save_s"] >= 0.02
+
+
+@pytest.mark.parametrize("use_async", [False, True])
+def test_profiled_plan_measures_tool_thread(tmp_path, monkeypatch, use_async):
+    monkeypatch.chdir(tmp_path)
+    agent = Agent(auto_approve=True, use_cache=False, profile=True)
+
+    if use_async:
+        asyncio.run(agent.aexecute_plan(PLAN, session_id="profiled"))
+    else:
+        agent.execute_plan(PLAN, session_id="profiled")
+
+    for step in load_session("profiled")["steps"]:
+        # Sync tools are measured on the thread running them, even on the async path
+        assert {"wall_s", "cpu_s", "peak_mem_bytes"} <= step["profile"].keys()
+    assert not tracemalloc.is_tracing()
+
+
+@pytest.mark.parametrize("use_async", [False, True])
+def test_interrupted_plan_stops_tracing(tmp_path, monkeypatch, use_async):
+    monkeypatch.chdir(tmp_path)
+
+    def interrupt(self, run):
+        assert tracemalloc.is_tracing()
+        raise KeyboardInterrupt
+
+    async def ainterrupt(self, run):
+        interrupt(self, run)
+
+    monkeypatch.setattr(Agent, "_run_steps", interrupt)
+    monkeypatch.setattr(Agent, "_arun_steps", ainterrupt)
+    agent = Agent(auto_approve=True, use_cache=False, profile=True)
+
+    with pytest.raises(KeyboardInterrupt):
+        if use_async:
+            asyncio.run(agent.aexecute_plan(PLAN))
+        else:
+            agent.execute_plan(PLAN)
+    assert not tracemalloc.is_tracing()
@@ -0,0 +1,46 @@
+import asyncio
+
+import pytest
+
+from src.agent import Agent
+from src.session_store import load_session
+
+
+PLAN = {
+    "name": "Resumable",
+    "steps": [
+        {"tool": "write_file", "params": {"path": "a.txt", "content": "first"}},
+        {"tool": "read_file", "params": {"path": "input.txt"}, "depends_on": [1]},
+        {"tool": "write_file", "params": {"path": "b.txt", "content": {"$ref": "steps.2.result.content"}}},
+        {"tool": "read_file", "params": {"path": {"$ref": "steps.1.result.path"}}, "depends_on": []},
+    ],
+}
+
+
+@pytest.mark.parametrize("use_async", [False, True])
+def test_resume_reruns_only_unfinished_steps(tmp_path, monkeypatch, use_async):
+    monkeypatch.chdir(tmp_path)
+    agent = Agent(auto_approve=True, use_cache=False)
+
+    first = agent.execute_plan(PLAN, session_id="resume-me")
+    assert (first["succeeded"], first["failed"], first["skipped"]) == (2, 1, 1)
+    statuses = [step["status"] for step in load_session("resume-me")["steps"]]
+    assert statuses == ["COMPLETED", "ERROR", "SKIPPED", "COMPLETED"]
+
+    # A completed step is not run again: its file keeps this edit
+    (tmp_path / "a.txt").write_text("edited")
+    (tmp_path / "input.txt").write_text("input")
+
+    resumed = asyncio.run(agent.aresume("resume-me")) if use_async else agent.resume("resume-me")
+
+    assert (resumed["succeeded"], resumed["failed"], resumed["skipped"]) == (2, 0, 0)
+    assert [row["step"] for row in resumed["step_results"]] == [2, 3]
+    assert (tmp_path / "a.txt").read_text() == "edited"
+    assert (tmp_path / "b.txt").read_text() == "input"
+    assert load_session("resume-me")["status"] == "COMPLETED"
+
+
+def test_resume_unknown_session(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    with pytest.raises(FileNotFoundError):
+        Agent(auto_approve=True).resume("nope")
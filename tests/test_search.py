@@ -0,0 +1,58 @@
+import pytest
+
+from src.tools import search
+from src.tools.search import search_files
+
+
+@pytest.fixture(autouse=True)
+def index_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(search, "INDEX_DIR", tmp_path / "index")
+
+
+@pytest.fixture
+def tree(tmp_path):
+    root = tmp_path / "tree"
+    root.mkdir()
+    (root / "a.py").write_text("import os\n\ndef handler():\n    return os.getcwd()\n")
+    (root / "b.py").write_text("x = 1\n")
+    (root / "image.bin").write_bytes(b"\0\1handler")
+    return root
+
+
+def paths(result):
+    return sorted(r["path"].rsplit("/", 1)[-1] for r in result["results"])
+
+
+def test_search_with_context(tree):
+    result = search_files("handler", str(tree), context=1)
+
+    assert paths(result) == ["a.py"]
+    line = result["results"][0]["lines"][0]
+    assert line == {"line": 3, "text": "def handler():", "before": [""], "after": ["    return os.getcwd()"]}
+    assert result["files_skipped"] == 1 and result["skipped"][0].endswith("image.bin")
+
+
+def test_index_follows_edits(tree):
+    assert paths(search_files("handler", str(tree))) == ["a.py"]
+
+    (tree / "b.py").write_text("handler = None\n")
+    (tree / "a.py").unlink()
+    assert paths(search_files("handler", str(tree))) == ["b.py"]
+
+
+def test_regex_and_short_queries(tree):
+    assert paths(search_files(r"def \w+\(", str(tree), regex=True)) == ["a.py"]
+    # Too short for trigrams: every indexed file is a candidate
+    assert paths(search_files("x", str(tree))) == ["b.py"]
+
+
+@pytest.mark.parametrize("query", ["x", "needle"])
+def test_large_files_are_searched_whatever_the_query(tree, monkeypatch, query):
+    monkeypatch.setattr(search, "MAX_INDEX_BYTES", 64)
+    (tree / "big.log").write_text("filler line\n" * 20 + "x needle\n")
+
+    result = search_files(query, str(tree))
+
+    assert "big.log" in paths(result)
+    match = next(r for r in result["results"] if r["path"].endswith("big.log"))
+    assert match["lines"][0]["line"] == 21
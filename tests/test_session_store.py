@@ -0,0 +1,53 @@
+import json
+from pathlib import Path
+
+from src.session_store import SessionJournal, journal_path, load_session, read_journal, snapshot_path
+
+
+def new_session(session_id="s1"):
+    return {"id": session_id, "status": "RUNNING", "steps": [{"status": "PENDING"}, {"status": "PENDING"}]}
+
+
+def test_journal_replays_over_snapshot(tmp_path):
+    journal = SessionJournal(new_session(), tmp_path)
+    journal.update_step(0, status="COMPLETED", output={"message": "ok"})
+    journal.update_session(status="FAILED")
+
+    # The snapshot is still the initial one; readers see the journaled events
+    assert json.loads(snapshot_path("s1", tmp_path).read_text())["status"] == "RUNNING"
+    session = load_session("s1", tmp_path)
+    assert session["status"] == "FAILED"
+    assert session["steps"][0] == {"status": "COMPLETED", "output": {"message": "ok"}}
+
+
+def test_torn_last_line_is_ignored(tmp_path):
+    journal = SessionJournal(new_session(), tmp_path)
+    journal.update_step(0, status="COMPLETED")
+    with open(journal_path("s1", tmp_path), "a", encoding="utf-8") as f:
+        f.write('{"op": "step", "index": 1, "fie')
+
+    assert len(read_journal("s1", tmp_path)) == 1
+    assert load_session("s1", tmp_path)["steps"][1]["status"] == "PENDING"
+
+
+def test_compaction_rewrites_snapshot_and_truncates_journal(tmp_path):
+    journal = SessionJournal(new_session(), tmp_path, compact_every=3)
+    for i in range(3):
+        journal.update_step(0, status="RUNNING", attempt=i)
+
+    assert not journal_path("s1", tmp_path).exists()
+    assert json.loads(snapshot_path("s1", tmp_path).read_text())["steps"][0]["attempt"] == 2
+
+    journal.update_step(1, status="COMPLETED")
+    journal.close()
+    assert not journal_path("s1", tmp_path).exists()
+    assert load_session("s1", tmp_path)["steps"][1]["status"] == "COMPLETED"
+
+
+def test_snapshot_accepts_what_the_journal_does(tmp_path):
+    journal = SessionJournal(new_session(), tmp_path)
+    journal.update_step(0, status="COMPLETED", output={"path": Path("out.txt")})
+    journal.close()
+
+    assert load_session("s1", tmp_path)["steps"][0]["output"] == {"path": "out.txt"}
+    assert not journal_path("s1", tmp_path).exists()
@@ -0,0 +1,120 @@
+import subprocess
+
+from src.worktrees import WorktreePool
+
+
+def git(repo, *args):
+    return subprocess.run(["git", *args], cwd=repo, check=True, capture_output=True, text=True).stdout.strip()
+
+
+def test_merge_commits_uncommitted_changes(git_repo):
+    pool = WorktreePool(git_repo, size=1)
+    worktree = pool.acquire("s1")
+    (worktree.root / "out.txt").write_text("hi")
+
+    summary = pool.release(worktree, "merge")
+
+    assert summary["autocommitted"] is True
+    assert summary["result"] == "merged into main"
+    assert (git_repo / "out.txt").read_text() == "hi"
+    assert "optimus/s1" not in git(git_repo, "branch", "--list")
+
+
+def test_no_changes_drops_branch(git_repo):
+    pool = WorktreePool(git_repo, size=1)
+    summary = pool.release(pool.acquire("s1"), "merge")
+
+    assert summary["result"] == "no changes"
+    assert git(git_repo, "branch", "--list", "optimus/s1") == ""
+
+
+def test_keep_preserves_branch_and_work(git_repo):
+    pool = WorktreePool(git_repo, size=1)
+    worktree = pool.acquire("s1")
+    (worktree.root / "kept.txt").write_text("k")
+
+    summary = pool.release(worktree, "keep")
+
+    assert summary["result"] == "kept optimus/s1"
+    assert git(git_repo, "show", "optimus/s1:kept.txt") == "k"
+    assert not (git_repo / "kept.txt").exists()
+
+    # Reusing the slot does not lose the kept branch
+    pool.release(pool.acquire("s2"), "merge")
+    assert git(git_repo, "show", "optimus/s1:kept.txt") == "k"
+
+
+def test_merge_rebases_when_base_moved(git_repo):
+    pool = WorktreePool(git_repo, size=2)
+    first = pool.acquire("s1")
+    second = pool.acquire("s2")
+    (first.root / "a.txt").write_text("a")
+    (second.root / "b.txt").write_text("b")
+
+    assert pool.release(first, "merge")["result"] == "merged into main"
+    assert pool.release(second, "merge")["result"] == "merged into main"
+    assert (git_repo / "a.txt").exists() and (git_repo / "b.txt").exists()
+
+
+def test_abandoned_slot_is_rescued(git_repo):
+    pool = WorktreePool(git_repo, size=1)
+    worktree = pool.acquire("s1")
+    (worktree.path / "lost.txt").write_text("x")
+    # Simulate a run that died without releasing its slot
+    pool._unclaim(0, worktree.lock)
+
+    pool.release(pool.acquire("s2"), "merge")
+
+    rescued = git(git_repo, "branch", "--list", "optimus/rescued/*").split()
+    assert len(rescued) == 1
+    assert git(git_repo, "show", f"{rescued[0]}:lost.txt") == "x"
+
+
+def test_rebase_params_defaults(git_repo):
+    pool = WorktreePool(git_repo, size=1)
+    worktree = pool.acquire("s1")
+    try:
+        assert worktree.rebase_params("deploy", {"provider": "local"})["source_dir"] == str(worktree.root / "dist")
+        assert worktree.rebase_params("build_site", {"command": "x"})["cwd"] == str(worktree.root)
+        assert worktree.rebase_params("read_file", {"path": "a.txt"})["path"] == str(worktree.root / "a.txt")
+    finally:
+        pool.release(worktree, "keep")
+
+
+def test_rebase_path_leaves_worktree_paths_alone(git_repo):
+    pool = WorktreePool(git_repo, size=1)
+    worktree = pool.acquire("s1")
+    try:
+        inside = str(worktree.root / "a.txt")
+        assert worktree.rebase_path(inside) == inside
+        assert worktree.rebase_path(str(git_repo / "a.txt")) == inside
+        assert worktree.rebase_path("/tmp/elsewhere.txt") == "/tmp/elsewhere.txt"
+    finally:
+        pool.release(worktree, "keep")
+
+
+def test_rebase_nested_and_list_params(git_repo):
+    pool = WorktreePool(git_repo, size=1)
+    worktree = pool.acquire("s1")
+    try:
+        root = worktree.root
+        assert worktree.rebase_params("api_request", {"method": "GET", "url": "u", "stream_to": "out.bin"})["stream_to"] == str(root / "out.bin")
+        assert worktree.rebase_params("git_diff", {"paths": ["rel.txt", str(git_repo / "abs.txt")]})["paths"] == ["rel.txt", str(root / "abs.txt")]
+        targets = worktree.rebase_params("deploy_many", {"targets": [{"provider": "local", "target_dir": "www"}]})["targets"]
+        assert targets == [{"provider": "local", "target_dir": str(root / "www")}]
+        assert worktree.rebase_params("write_files", {"files": {"a": "x"}})["files"] == {str(root / "a"): "x"}
+    finally:
+        pool.release(worktree, "keep")
+
+
+def test_ref_to_earlier_result_path_in_worktree(git_repo):
+    from src.agent import Agent
+
+    plan = {"steps": [
+        {"tool": "write_file", "params": {"path": "a.txt", "content": "hi"}},
+        {"tool": "read_file", "params": {"path": {"$ref": "steps.1.result.path"}}},
+    ]}
+    results = Agent(auto_approve=True, use_cache=False, worktree="keep").execute_plan(plan, session_id="ref")
+
+    assert results["failed"] == 0
+    assert results["step_results"][1]["result"]["content"] == "hi"
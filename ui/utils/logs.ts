@@ -21,14 +21,50 @@ export interface Session {
 }
 
 const LOGS_DIR = path.join(process.cwd(), '..', 'logs', 'sessions');
+const JOURNAL_SUFFIX = '.journal.jsonl';
+
+// Apply events appended by the agent since the last snapshot (see src/session_store.py).
+// A torn trailing line from an interrupted write is ignored.
+function applyJournal(data: any, id: string): any {
+    const journalPath = path.join(LOGS_DIR, `${id}${JOURNAL_SUFFIX}`);
+    if (!fs.existsSync(journalPath)) return data;
+    let content: string;
+    try {
+        content = fs.readFileSync(journalPath, 'utf-8');
+    } catch (e) {
+        return data;
+    }
+    const lines = content.split('\n');
+    lines.pop(); // Incomplete (or empty) final line
+    for (const line of lines) {
+        let event: any;
+        try {
+            event = JSON.parse(line);
+        } catch (e) {
+            break;
+        }
+        if (event.op === 'step') {
+            const step = data.steps?.[event.index];
+            if (step) Object.assign(step, event.fields);
+        } else if (event.op === 'session') {
+            Object.assign(data, event.fields);
+        }
+    }
+    return data;
+}
+
+function readSession(file: string): any {
+    const content = fs.readFileSync(path.join(LOGS_DIR, file), 'utf-8');
+    const data = JSON.parse(content);
+    return applyJournal(data, data.id || file.replace('.json', ''));
+}
 
 export function getSessions(): Session[] {
     if (!fs.existsSync(LOGS_DIR)) return [];
     const files = fs.readdirSync(LOGS_DIR).filter(f => f.endsWith('.json'));
     const sessions = files.map(file => {
         try {
-            const content = fs.readFileSync(path.join(LOGS_DIR, file), 'utf-8');
-            const data = JSON.parse(content);
+            const data = readSession(file);
             // Ensure basic fields exist
             return {
                 id: data.id || file.replace('.json', ''),
@@ -52,8 +88,7 @@ export function getSession(id: string): Session | null {
     const filePath = path.join(LOGS_DIR, `${id}.json`);
     if (!fs.existsSync(filePath)) return null;
     try {
-        const content = fs.readFileSync(filePath, 'utf-8');
-        return JSON.parse(content);
+        return readSession(`${id}.json`);
     } catch (e) {
         return null;
     }